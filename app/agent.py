@@ -0,0 +1,77 @@
+# app/agent.py
+# Режим агента: сбор метрик и анализ трафика без API и бота, с отправкой данных
+# на центральный сервер (settings.agent_server). Запуск: python -m app.agent
+import asyncio
+import socket
+from typing import Any, Dict
+
+from app.config import settings
+from app.utils import logger, flush_dos_data
+from app.services import metrics_collector, network_analyzer
+from app.services.agent import AgentClient
+from app.services.metrics_collector import (
+    analyze_metrics, flush_metrics_history, get_latest_docker_metrics_sync,
+    get_latest_processes_sync, get_latest_system_metrics_sync,
+)
+
+SNAPSHOT_INTERVAL = settings.agent_snapshot_interval  # Как часто отправляется снимок метрик (сек)
+
+
+def build_snapshot() -> Dict[str, Any]:
+    """
+    Снимок для центрального сервера. Контейнеры — словарь по id, чтобы
+    в разницу между снимками попадали только изменившиеся контейнеры.
+    """
+    return {
+        "system": get_latest_system_metrics_sync(),
+        "containers": {container["id"]: container for container in get_latest_docker_metrics_sync()},
+        "processes": get_latest_processes_sync(),
+        "dos": network_analyzer.pipeline_stats(limit=5),
+    }
+
+
+async def push_snapshots(client: AgentClient) -> None:
+    while True:
+        await asyncio.sleep(SNAPSHOT_INTERVAL)
+        try:
+            client.put("snapshot", build_snapshot())
+        except Exception as e:
+            logger.error(f"Ошибка при формировании снимка агента: {e}")
+
+
+async def run_agent() -> None:
+    if not settings.agent_server:
+        raise SystemExit("Не задан agent_server (адрес центрального сервера host:port)")
+    name = settings.agent_name or socket.gethostname()
+    client = AgentClient(
+        settings.agent_server,
+        name,
+        token=settings.fleet_token,
+        spool_path=settings.agent_spool_file,
+        spool_max_bytes=settings.agent_spool_max_bytes,
+        batch_interval=settings.agent_batch_interval,
+    )
+    # Новые и завершённые инциденты уходят на сервер вместе со снимками, уведомления
+    # отправляет только центральный сервер (иначе бот был бы на каждом хосте)
+    network_analyzer.incident_listeners.append(lambda incidents: client.put("incidents", incidents))
+    network_analyzer.notifications_enabled = False
+    metrics_collector.notifications_enabled = False
+    logger.info(f"Агент {name} запущен, сервер {settings.agent_server}")
+
+    try:
+        await asyncio.gather(
+            analyze_metrics(),
+            network_analyzer.analyze_network(),
+            push_snapshots(client),
+            client.run(),
+        )
+    finally:
+        await flush_dos_data()
+        flush_metrics_history()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(run_agent())
+    except KeyboardInterrupt:
+        logger.info("Агент остановлен")
@@ -1,13 +1,94 @@
-from fastapi import APIRouter
-from app.utils.data_handler import load_dos_data
+import json
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+
+from app.utils.data_handler import load_dos_data, query_dos_data, load_dos_rollups
+from app.services.network_analyzer import pipeline_stats
 
 router = APIRouter()
 
+STREAM_PAGE_SIZE = 1000  # Записей за одно чтение из базы при потоковой выгрузке
+
 @router.get("/get-dos")
-async def get_dos_attacks():
-    data = await load_dos_data()
-    return data
+async def get_dos_attacks(
+    response: Response,
+    since: Optional[float] = Query(None, description="Начало инцидента не раньше (unix time)"),
+    until: Optional[float] = Query(None, description="Начало инцидента раньше (unix time)"),
+    ip: Optional[str] = Query(None, description="IP-адрес источника или подсеть, например 203.0.113.0/24"),
+    attack_type: Optional[str] = Query(None, alias="type", description="Тип атаки, например SYN Flood"),
+    order: str = Query("asc", pattern="^(asc|desc)$", description="Сортировка по времени начала"),
+    limit: Optional[int] = Query(None, ge=1, le=10000, description="Размер страницы"),
+    cursor: Optional[str] = Query(None, description="Курсор из заголовка X-Next-Cursor"),
+    format: str = Query("json", pattern="^(json|ndjson)$", description="ndjson — потоковая выгрузка"),
+):
+    """
+    История завершённых инцидентов. Без параметров возвращает весь массив, как раньше.
+    При заданном limit курсор следующей страницы передаётся в заголовке X-Next-Cursor.
+    С format=ndjson записи выгружаются потоком по одной на строку, страницами
+    по STREAM_PAGE_SIZE, поэтому память не зависит от размера истории.
+    """
+    filters = {
+        "since": since,
+        "until": until,
+        "source": ip,
+        "attack_type": attack_type,
+        "descending": order == "desc",
+    }
+
+    if format == "ndjson":
+        async def stream():
+            page_cursor = cursor
+            remaining = limit
+            while True:
+                page_size = STREAM_PAGE_SIZE if remaining is None else min(STREAM_PAGE_SIZE, remaining)
+                incidents, page_cursor = await query_dos_data(**filters, limit=page_size, cursor=page_cursor)
+                if incidents:
+                    yield "".join(json.dumps(incident, ensure_ascii=False) + "\n" for incident in incidents)
+                if remaining is not None:
+                    remaining -= len(incidents)
+                if page_cursor is None or remaining == 0:
+                    break
+
+        try:
+            # Проверяем параметры до начала ответа, чтобы вернуть 400, а не оборванный поток
+            await query_dos_data(**filters, limit=1, cursor=cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    if not any(value is not None for value in (since, until, ip, attack_type, limit, cursor)) and order == "asc":
+        return await load_dos_data()
+
+    try:
+        incidents, next_cursor = await query_dos_data(**filters, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return incidents
+
+@router.get("/rollups")
+async def get_dos_rollups(
+    period: str = Query("hour", pattern="^(hour|day)$", description="Размер интервала сводки"),
+    since: Optional[float] = Query(None, description="Начало интервала не раньше (unix time)"),
+    until: Optional[float] = Query(None, description="Начало интервала раньше (unix time)"),
+    attack_type: Optional[str] = Query(None, alias="type", description="Тип атаки"),
+    prefix: Optional[str] = Query(None, description="Подсеть источников, например 203.0.113.0/24"),
+):
+    """
+    Почасовые или посуточные сводки по типу атаки и подсети источников:
+    число инцидентов, пакетов, пиковая скорость и суммарная длительность.
+    Для графиков за длинные периоды вместо полной истории.
+    """
+    return await load_dos_rollups(period=period, since=since, until=until, attack_type=attack_type, prefix=prefix)
+
+# Счётчики захвата, задержки обработки и признаки перегрузки детектора
+@router.get("/stats")
+async def get_dos_stats(top: int = 10):
+    return pipeline_stats(top)
 
 
 # Экспортируем роутер
-__all__ = ["router"]
\ No newline at end of file
+__all__ = ["router"]
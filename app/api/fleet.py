@@ -0,0 +1,31 @@
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from app.services.fleet import fleet
+
+router = APIRouter()
+
+# Эндпоинт для получения сводки по всем хостам с агентами
+@router.get("/hosts")
+async def get_fleet_hosts():
+    return fleet.hosts_view()
+
+# Эндпоинт для получения последнего снимка одного хоста
+@router.get("/hosts/{host}")
+async def get_fleet_host(host: str):
+    view = fleet.host_view(host)
+    if view is None:
+        raise HTTPException(status_code=404, detail=f"Хост {host} не подключался")
+    return view
+
+# Эндпоинт для получения последних инцидентов всего парка
+@router.get("/incidents")
+async def get_fleet_incidents(
+    host: Optional[str] = Query(None, description="Только инциденты этого хоста"),
+    limit: int = Query(100, ge=1, le=10000, description="Максимум инцидентов"),
+):
+    return fleet.incidents_view(host, limit)
+
+
+# Экспортируем роутер
+__all__ = ["router"]
@@ -1,13 +1,19 @@
-from fastapi import APIRouter, HTTPException
-from app.services.metrics_collector import get_latest_docker_metrics_sync
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from app.services.metrics_collector import get_latest_docker_metrics_sync, refresh_metrics
 from app.utils import logger
 
 router = APIRouter()
 
 # Эндпоинт для получения метрик сервера
 @router.get("/docker")
-async def get_docker_metrics():
+async def get_docker_metrics(
+    max_age: Optional[float] = Query(None, ge=0, description="Собрать заново, если данные старше N секунд"),
+):
     try:
+        if max_age is not None:
+            await refresh_metrics(("containers",), max_age)
         metrics = get_latest_docker_metrics_sync()
         return metrics
     except Exception as e:
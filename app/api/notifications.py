@@ -1,3 +1,5 @@
+from typing import Dict
+
 from fastapi import APIRouter, Query
 from pydantic import BaseModel
 
@@ -11,11 +13,14 @@ class AlertSettings(BaseModel):
     condition: bool
     percent: int = 0
 
+class StorageAlertSettings(AlertSettings):
+    mounts: Dict[str, int] = {}
+
 class NotificationSettings(BaseModel):
     container_stopped: AlertSettings
     ram: AlertSettings
     cpu: AlertSettings
-    storage: AlertSettings
+    storage: StorageAlertSettings
     dos: AlertSettings
 
 @router.get("/get-settings")
@@ -1,6 +1,9 @@
 # app/api/server.py
-from fastapi import APIRouter, HTTPException
-from app.services.metrics_collector import get_latest_system_metrics_sync  # Импортируем сервис для сбора метрик
+import time
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from app.services.metrics_collector import get_latest_system_metrics_sync, get_latest_processes_sync, get_metrics_history, refresh_metrics, SYSTEM_COLLECTORS  # Импортируем сервис для сбора метрик
 from app.utils import logger
 
 # Создаем роутер
@@ -8,14 +11,46 @@ router = APIRouter()
 
 # Эндпоинт для получения метрик сервера
 @router.get("/metrics")
-async def get_server_metrics():
+async def get_server_metrics(
+    max_age: Optional[float] = Query(None, ge=0, description="Собрать заново, если данные старше N секунд"),
+):
     try:
+        if max_age is not None:
+            await refresh_metrics(SYSTEM_COLLECTORS, max_age)
         metrics = get_latest_system_metrics_sync()
         return metrics
     except Exception as e:
         # В случае ошибки возвращаем HTTP 500
         raise HTTPException(status_code=500, detail=str(e))
 
+# Эндпоинт для получения истории метрик
+@router.get("/metrics/history")
+async def get_server_metrics_history(
+    series: Optional[str] = Query(None, description="Ряды через запятую, например cpu,memory,container.web.cpu"),
+    since: Optional[float] = Query(None, description="Начало интервала (unix time), по умолчанию час назад"),
+    until: Optional[float] = Query(None, description="Конец интервала (unix time), по умолчанию сейчас"),
+    step: Optional[int] = Query(None, description="Шаг уровня хранения: 10, 60 или 600 сек (по умолчанию подбирается по интервалу)"),
+):
+    until = until if until is not None else time.time()
+    since = since if since is not None else until - 3600
+    names = [name.strip() for name in series.split(",") if name.strip()] if series else None
+    try:
+        return get_metrics_history(names, since, until, step)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Эндпоинт для получения самых загруженных процессов хоста
+@router.get("/processes")
+async def get_server_processes(
+    max_age: Optional[float] = Query(None, ge=0, description="Собрать заново, если данные старше N секунд"),
+):
+    try:
+        if max_age is not None:
+            await refresh_metrics(("processes",), max_age)
+        return get_latest_processes_sync()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 # Эндпоинт для проверки здоровья сервера
 @router.get("/health")
 async def health_check():
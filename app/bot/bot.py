@@ -1,5 +1,6 @@
 import asyncio
 from datetime import datetime
+from typing import Any, Dict, List, Optional
 
 from telegram import Bot, Update, BotCommand
 from telegram.error import TelegramError
@@ -94,8 +95,11 @@ async def notify_dos_attack(incidents: []) -> None:
             time_start = datetime.fromtimestamp(incident["timeStart"]).strftime("%d.%m.%Y %H:%M:%S")
 
             # Формируем строку message
+            # Инциденты, присланные агентами, подписываются именем хоста
+            host = f"Сервер: {incident['host']}\n" if incident.get("host") else ""
             message = message + (
                 f"------------------------\n"
+                f"{host}"
                 f"Тип атаки: {incident['type']}\n"
                 f"IP-адрес: {incident['sourceIp']}\n"
                 f"Количество пакетов: {incident['count']}\n"
@@ -115,28 +119,50 @@ async def notify_container_stopped(container_name: str) -> None:
         message = f"🚨 Контейнер остановлен: {container_name}"
         await send_alert(message)
 
-async def notify_ram_usage(usage_percent: float) -> None:
+def format_processes(processes: Optional[List[Dict[str, Any]]]) -> str:
+    """
+    Список самых загруженных процессов для уведомления (пустая строка, если списка нет).
+    """
+    if not processes:
+        return ""
+    lines = "\n".join(
+        f"{process['pid']} {process['name']}: CPU {process['cpuPercent']}%, RAM {round(process['memory'])} МБ"
+        for process in processes
+    )
+    return f"\n\nТоп процессов:\n{lines}"
+
+async def notify_ram_usage(usage_percent: float, processes: Optional[List[Dict[str, Any]]] = None) -> None:
     """
     Отправляет уведомление о превышении использования RAM.
+    processes — процессы, занимающие больше всего памяти.
     """
     if settings.notifications.ram.condition and usage_percent >= settings.notifications.ram.percent:
-        message = f"⚠️ Превышение использования RAM: {round(usage_percent)}%"
+        message = f"⚠️ Превышение использования RAM: {round(usage_percent)}%" + format_processes(processes)
         await send_alert(message)
 
-async def notify_cpu_usage(usage_percent: float) -> None:
+async def notify_cpu_usage(usage_percent: float, processes: Optional[List[Dict[str, Any]]] = None) -> None:
     """
     Отправляет уведомление о высокой нагрузке CPU.
+    processes — процессы с наибольшей нагрузкой на CPU.
     """
     if settings.notifications.cpu.condition and usage_percent >= settings.notifications.cpu.percent:
-        message = f"⚠️ Высокая нагрузка CPU: {round(usage_percent)}%"
+        message = f"⚠️ Высокая нагрузка CPU: {round(usage_percent)}%" + format_processes(processes)
         await send_alert(message)
 
-async def notify_storage_usage(usage_percent: float) -> None:
+def storage_threshold(mountpoint: Optional[str] = None) -> int:
+    """
+    Порог заполнения для точки монтирования: собственный, если задан, иначе общий.
+    """
+    storage = settings.notifications.storage
+    return storage.mounts.get(mountpoint, storage.percent) if mountpoint else storage.percent
+
+async def notify_storage_usage(usage_percent: float, mountpoint: Optional[str] = None) -> None:
     """
-    Отправляет уведомление о заполнении хранилища.
+    Отправляет уведомление о заполнении хранилища (всего диска или точки монтирования).
     """
-    if settings.notifications.storage.condition and usage_percent >= settings.notifications.storage.percent:
-        message = f"⚠️ Хранилище заполнено: {round(usage_percent)}%"
+    if settings.notifications.storage.condition and usage_percent >= storage_threshold(mountpoint):
+        target = f" {mountpoint}" if mountpoint else ""
+        message = f"⚠️ Хранилище{target} заполнено: {round(usage_percent)}%"
         await send_alert(message)
 
 async def notify_test_message() -> None:
@@ -1,4 +1,5 @@
 from collections import defaultdict
+from typing import Dict
 
 from pydantic_settings import BaseSettings
 from pydantic import BaseModel, Field
@@ -17,6 +18,12 @@ class AlertSettings(BaseModel):
     condition: bool = Field(default=False)  # Включено или выключено
     percent: int = Field(default=0)  # Пороговое значение (если применимо)
 
+class StorageAlertSettings(AlertSettings):
+    """
+    Настройки уведомлений о заполнении хранилища.
+    """
+    mounts: Dict[str, int] = Field(default_factory=dict)  # Пороги для отдельных точек монтирования, например {"/var/lib/docker": 90}
+
 class NotificationSettings(BaseModel):
     """
     Модель для хранения всех настроек уведомлений.
@@ -25,9 +32,28 @@ class NotificationSettings(BaseModel):
     container_stopped: AlertSettings = Field(default_factory=AlertSettings)
     ram: AlertSettings = Field(default_factory=AlertSettings)
     cpu: AlertSettings = Field(default_factory=AlertSettings)
-    storage: AlertSettings = Field(default_factory=AlertSettings)
+    storage: StorageAlertSettings = Field(default_factory=StorageAlertSettings)
     dos: AlertSettings = Field(default_factory=AlertSettings)
 
+class CollectorSettings(BaseModel):
+    """
+    Модель для настроек расписания одного сборщика метрик.
+    """
+    interval: float = Field(default=10)  # Интервал сбора (сек)
+    timeout: float = Field(default=10)  # Максимальная длительность одного сбора (сек)
+    jitter: float = Field(default=0)  # Случайная задержка запуска до N сек, чтобы сборщики не совпадали
+    overrun: str = Field(default="skip")  # Если прошлый сбор ещё идёт: skip (пропустить) или queue (запустить сразу после него)
+
+class CollectorsSettings(BaseModel):
+    """
+    Модель для хранения расписаний всех сборщиков метрик.
+    """
+    system: CollectorSettings = Field(default_factory=lambda: CollectorSettings(interval=5, timeout=2))
+    containers: CollectorSettings = Field(default_factory=lambda: CollectorSettings(interval=10, timeout=15))
+    disks: CollectorSettings = Field(default_factory=lambda: CollectorSettings(interval=30, timeout=10, jitter=2))
+    network: CollectorSettings = Field(default_factory=lambda: CollectorSettings(interval=5, timeout=2))
+    processes: CollectorSettings = Field(default_factory=lambda: CollectorSettings(interval=15, timeout=10, jitter=1))
+
 class Settings(BaseSettings):
     # Настройки сервера
     host: str = "127.0.0.1"  # Хост по умолчанию
@@ -43,7 +69,53 @@ class Settings(BaseSettings):
     threshold_udp: int = 400 # UDP-запросов в секунду с одного IP = атака
     attack_expiry_time: int = 10 # Время с последнего пакета когда атака считается завершенной
     interface: str = "eth0" # Сетевой интерфейс
+    capture_backend: str = "scapy" # Захват пакетов: scapy (полный разбор), raw (AF_PACKET + BPF), batch (raw + NumPy) или fanout (несколько процессов)
+    batch_size: int = 4096 # Размер пачки пакетов в режиме batch
+    batch_max_latency: float = 0.05 # Максимальная задержка обработки пачки в режиме batch (сек)
+    capture_workers: int = 0 # Количество процессов захвата в режиме fanout (0 = по числу ядер)
+    capture_flush_interval: float = 0.2 # Как часто процессы захвата отправляют дельты счётчиков (сек)
+    event_ring_size: int = 65536 # Ёмкость кольца событий между потоком захвата и циклом asyncio
+    capture_trigger_pps: int = 0 # Входящих пакетов/сек на интерфейсе, с которых анализируется каждый пакет (0 = всегда каждый)
+    capture_sample_rate: int = 16 # Ниже порога capture_trigger_pps анализируется каждый N-й пакет с весом N (режимы scapy и raw)
+    capture_heightened_hold: int = 30 # Сколько секунд анализировать каждый пакет после спада трафика
     whitelist_ip: list[str] = Field(default_factory=lambda: ["1.1.1.1", "8.8.8.8", "10.0.0.0/8"])  # Белый список IP
+    subnet_aggregation: bool = False # Искать распределённые флуды по подсетям (новые инциденты и уведомления по подсетям)
+    subnet_prefixes_v4: list[int] = Field(default_factory=lambda: [24, 16]) # Уровни агрегации IPv4
+    subnet_prefixes_v6: list[int] = Field(default_factory=lambda: [64, 48]) # Уровни агрегации IPv6
+    subnet_threshold_factor: float = 10.0 # Множитель порога для уровней, не указанных ниже: порог подсети = порог для одного IP * множитель
+    subnet_threshold_factors_v4: dict[int, float] = Field(default_factory=lambda: {24: 10.0, 16: 100.0}) # Множитель порога по длине IPv4-префикса
+    subnet_threshold_factors_v6: dict[int, float] = Field(default_factory=lambda: {64: 10.0, 48: 100.0}) # Множитель порога по длине IPv6-префикса
+    rate_window: int = 5 # Окно (сек) скользящего подсчёта скорости пакетов с одного IP
+    counter_mode: str = "exact" # Подсчёт пакетов по IP: exact (словарь) или sketch (фиксированная память)
+    sketch_width: int = 4096 # Ширина Count-Min Sketch (точность оценок)
+    sketch_depth: int = 4 # Глубина Count-Min Sketch (вероятность ошибки e^-depth)
+    sketch_top_k: int = 100 # Сколько самых активных источников отслеживать в режиме sketch
+    incident_retention_days: int = 0 # Сколько дней хранить отдельные инциденты (0 = без ограничения)
+    incident_retention_max_rows: int = 0 # Максимум отдельных инцидентов в истории (0 = без ограничения)
+    incident_retention_max_mb: int = 0 # Предел занятого места в базе инцидентов, МБ (0 = без ограничения)
+    incident_hourly_rollup_days: int = 365 # Сколько дней хранить почасовые сводки (посуточные хранятся всегда)
+    incident_compaction_interval: int = 300 # Как часто обновлять сводки и применять политику хранения (сек)
+
+    # Настройки сбора метрик
+    docker_collection_mode: str = "poll" # Метрики контейнеров: poll (опрос раз в цикл) или stream (подписки на статистику и события Docker)
+    docker_stats_workers: int = 16 # Сколько контейнеров опрашивать параллельно
+    docker_stats_timeout: float = 5.0 # Максимальное ожидание статистики одного контейнера (сек)
+    host_proc_path: str = "/host/proc" # procfs хоста (если каталога нет, используется /proc контейнера)
+    metrics_history_dir: str = "" # Каталог для сохранения истории метрик через mmap, например ../logs/metrics (пусто = только в памяти)
+    metrics_history_max_series: int = 256 # Максимум рядов в истории метрик (системные + по 4 на контейнер)
+    collectors: CollectorsSettings = Field(default_factory=CollectorsSettings) # Расписание сборщиков: интервал, таймаут, jitter и политика пропуска
+    process_top_n: int = 10 # Сколько самых загруженных процессов (по CPU и по памяти) показывать и прикладывать к уведомлениям
+
+    # Настройки режима агента (python -m app.agent) и приёма данных от агентов
+    agent_server: str = "" # Адрес центрального сервера host:port, куда агент отправляет данные
+    agent_name: str = "" # Имя хоста в общем списке (пусто = hostname)
+    agent_snapshot_interval: float = 10 # Как часто агент отправляет снимок метрик (сек)
+    agent_batch_interval: float = 1.0 # Максимальная задержка отправки пачки (сек)
+    agent_spool_file: str = "../logs/agent_spool.ndjson" # Локальная очередь на время отсутствия связи с сервером
+    agent_spool_max_bytes: int = 64 * 1024 * 1024 # Предел очереди: сверх него снимки отбрасываются, инциденты сохраняются
+    fleet_listen_host: str = "127.0.0.1" # Адрес приёма данных от агентов (для приёма из сети — 0.0.0.0, только вместе с fleet_token)
+    fleet_listen_port: int = 0 # Порт приёма данных от агентов (0 = приём выключен)
+    fleet_token: str = "" # Общий секрет агентов и центрального сервера; без него приём возможен только на loopback
 
     # Настройки уведомлений
     notifications: NotificationSettings = Field(default_factory=NotificationSettings)
@@ -3,14 +3,17 @@ import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.utils import logger
+from app.utils import logger, flush_dos_data
 from config.settings import settings
 from app.api.server import router as server_router
 from app.api.metrics import router as metrics_router
 from app.api.dos import router as dos_router
 from app.api.notifications import router as notifications_router
+from app.api.fleet import router as fleet_router
 from app.services.network_analyzer import analyze_network
-from app.services.metrics_collector import analyze_metrics
+from app.services.metrics_collector import analyze_metrics, flush_metrics_history
+from app.services.incident_history import compact_incident_history
+from app.services.fleet import serve_fleet
 from app.bot import start_bot
 import asyncio
 
@@ -43,6 +46,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Разрешить все методы
     allow_headers=["*"],  # Разрешить все заголовки
+    expose_headers=["X-Next-Cursor"],  # Курсор следующей страницы /dos/get-dos
 )
 
 # Подключаем роутеры
@@ -50,10 +54,12 @@ app.include_router(server_router, prefix="/server", tags=["server"])
 app.include_router(metrics_router, prefix="/metrics", tags=["metrics"])
 app.include_router(dos_router, prefix="/dos", tags=["dos"])
 app.include_router(notifications_router, prefix="/notifications", tags=["notifications"])
+app.include_router(fleet_router, prefix="/fleet", tags=["fleet"])
 
 async def run_background_tasks():
     """
-    Запускает фоновые задачи (бот, анализ сети и сбор метрик).
+    Запускает фоновые задачи (бот, анализ сети, сбор метрик, обслуживание истории инцидентов
+    и приём данных от агентов).
     """
     try:
         logger.info("Запуск фоновых задач...")
@@ -64,8 +70,14 @@ async def run_background_tasks():
         # Запуск анализа сети и сбора метрик параллельно
         network_task = asyncio.create_task(analyze_network())
         metrics_task = asyncio.create_task(analyze_metrics())
+        history_task = asyncio.create_task(compact_incident_history())
+        tasks = [bot_task, network_task, metrics_task, history_task]
 
-        await asyncio.gather(bot_task, network_task, metrics_task)
+        # Приём данных от агентов других серверов
+        if settings.fleet_listen_port:
+            tasks.append(asyncio.create_task(serve_fleet()))
+
+        await asyncio.gather(*tasks)
     except Exception as e:
         logger.error(f"Ошибка в фоновых задачах: {e}")
         raise
@@ -79,6 +91,8 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Завершение работы приложения")
+    await flush_dos_data()
+    flush_metrics_history()
 
 # Запуск приложения
 if __name__ == "__main__":
@@ -0,0 +1,205 @@
+# app/services/agent.py
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..utils import logger
+from ..utils.delta import diff, normalize
+
+PROTOCOL_VERSION = 1
+BATCH_MAX_ITEMS = 500  # Максимум элементов в одной пачке
+MAX_IN_FLIGHT = 16  # Пачек без подтверждения, после которых отправка ждёт ответа сервера
+HANDSHAKE_TIMEOUT = 10  # Ожидание ответа сервера на приветствие (сек)
+RECONNECT_MIN_DELAY = 1  # Первая пауза перед переподключением (сек), дальше удваивается
+RECONNECT_MAX_DELAY = 30
+
+
+def encode(message: Dict[str, Any]) -> bytes:
+    """Одна строка NDJSON без лишних пробелов."""
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False).encode() + b"\n"
+
+
+def parse_address(address: str) -> Tuple[str, int]:
+    host, _, port = address.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(f"Некорректный адрес сервера (ожидается host:port): {address}")
+    return host.strip("[]"), int(port)
+
+
+class Spool:
+    """
+    Очередь элементов на диске на время отсутствия связи: NDJSON, элемент
+    на строку. Сверх max_bytes новые снимки отбрасываются (для обзора важен
+    последний), инциденты записываются всегда.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.dropped = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def size(self) -> int:
+        return self.path.stat().st_size if self.path.exists() else 0
+
+    def append(self, items: List[Dict[str, Any]]) -> None:
+        if not items:
+            return
+        size = self.size()
+        with self.path.open("ab") as file:
+            for item in items:
+                line = encode(item)
+                if item["kind"] == "snapshot" and size + len(line) > self.max_bytes:
+                    if not self.dropped:
+                        logger.warning(f"Очередь агента {self.path} достигла {self.max_bytes} байт, снимки отбрасываются")
+                    self.dropped += 1
+                    continue
+                file.write(line)
+                size += len(line)
+
+    def read(self) -> List[Dict[str, Any]]:
+        if not self.path.exists():
+            return []
+        items = []
+        with self.path.open("rb") as file:
+            for line in file:
+                try:
+                    items.append(json.loads(line))
+                except ValueError:
+                    continue  # Строка, оборванная при аварийном завершении
+        return items
+
+    def clear(self) -> None:
+        self.path.unlink(missing_ok=True)
+        self.dropped = 0
+
+
+class AgentClient:
+    """
+    Отправка снимков метрик и инцидентов на центральный сервер по одному
+    постоянному TCP-соединению.
+
+    Элементы копятся и уходят пачками раз в batch_interval: строка NDJSON
+    {"type": "batch", "seq": N, "items": [...]}, сервер подтверждает каждую
+    пачку. Снимок передаётся как разница с предыдущим снимком этого
+    соединения (после подключения первый — полный), поэтому неизменившиеся
+    метрики и контейнеры не пересылаются.
+
+    Пока связи нет, элементы пишутся в Spool на диске; после подключения
+    очередь отправляется первой, в исходном порядке. Неподтверждённые пачки
+    при обрыве возвращаются в очередь, поэтому сервер может получить пачку
+    повторно — инциденты он отбрасывает по ключу, снимки идемпотентны.
+    """
+
+    def __init__(self, address: str, name: str, token: str = "", spool_path: str = "agent_spool.ndjson",
+                 spool_max_bytes: int = 64 * 1024 * 1024, batch_interval: float = 1.0):
+        self.host, self.port = parse_address(address)
+        self.name = name
+        self.token = token
+        self.spool = Spool(spool_path, spool_max_bytes)
+        self.batch_interval = batch_interval
+        self.pending: List[Dict[str, Any]] = []
+        self.unacked: Dict[int, List[Dict[str, Any]]] = {}  # Номер пачки -> исходные элементы
+        self.seq = 0
+        self.base: Optional[Dict[str, Any]] = None  # Последний отправленный снимок (база разниц)
+        self.connected = False
+        self.reconnect_delay = RECONNECT_MIN_DELAY
+        self.sent_bytes = 0
+        self.sent_batches = 0
+
+    def put(self, kind: str, data: Any, timestamp: Optional[float] = None) -> None:
+        """Ставит элемент (snapshot или incidents) в очередь отправки."""
+        item = {"kind": kind, "time": time.time() if timestamp is None else timestamp, "data": data}
+        if self.connected:
+            self.pending.append(item)
+        else:
+            self.spool.append([item])
+
+    def _encode_item(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        if item["kind"] != "snapshot":
+            return item
+        data = normalize(item["data"])
+        changes, removed = diff(self.base or {}, data)
+        message = {"kind": "snapshot", "time": item["time"], "set": changes}
+        if removed:
+            message["unset"] = removed
+        if self.base is None:
+            message["full"] = True
+        self.base = data
+        return message
+
+    def _requeue(self) -> None:
+        """Неподтверждённые и неотправленные элементы — в очередь на диске, по порядку."""
+        items = [item for seq in sorted(self.unacked) for item in self.unacked[seq]] + self.pending
+        self.unacked.clear()
+        self.pending = []
+        self.connected = False
+        self.spool.append(items)
+
+    async def _read_acks(self, reader: asyncio.StreamReader) -> None:
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            message = json.loads(line)
+            if message.get("type") == "ack":
+                for seq in [seq for seq in self.unacked if seq <= message["seq"]]:
+                    del self.unacked[seq]
+
+    async def _session(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        writer.write(encode({"type": "hello", "version": PROTOCOL_VERSION, "host": self.name, "token": self.token}))
+        await writer.drain()
+        reply = json.loads(await asyncio.wait_for(reader.readline(), HANDSHAKE_TIMEOUT) or b"null")
+        if not isinstance(reply, dict) or reply.get("type") != "welcome":
+            reason = reply.get("message") if isinstance(reply, dict) else "соединение закрыто"
+            raise ConnectionError(f"сервер отклонил подключение: {reason}")
+
+        logger.info(f"Агент {self.name} подключён к {self.host}:{self.port}")
+        self.reconnect_delay = RECONNECT_MIN_DELAY
+        self.base = None
+        # Новые элементы идут в pending ещё до чтения очереди с диска: иначе put,
+        # пришедший между read и clear, дописал бы файл и был бы удалён вместе с ним
+        self.connected = True
+        spooled = await asyncio.to_thread(self.spool.read)
+        if spooled:
+            logger.info(f"Отправка элементов, накопленных без связи: {len(spooled)}")
+        self.pending[:0] = spooled
+        await asyncio.to_thread(self.spool.clear)
+
+        acks = asyncio.create_task(self._read_acks(reader))
+        try:
+            while True:
+                while self.pending and len(self.unacked) < MAX_IN_FLIGHT:
+                    items = self.pending[:BATCH_MAX_ITEMS]
+                    del self.pending[:BATCH_MAX_ITEMS]
+                    self.seq += 1
+                    self.unacked[self.seq] = items
+                    data = encode({"type": "batch", "seq": self.seq, "items": [self._encode_item(item) for item in items]})
+                    writer.write(data)
+                    self.sent_bytes += len(data)
+                    self.sent_batches += 1
+                    await writer.drain()
+                done, _ = await asyncio.wait({acks}, timeout=self.batch_interval)
+                if done:
+                    acks.result()  # Ошибка чтения поднимается здесь
+                    raise ConnectionError("сервер закрыл соединение")
+        finally:
+            acks.cancel()
+            writer.close()
+
+    async def run(self) -> None:
+        """Подключается к серверу и переподключается при обрыве, пока не отменён."""
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+                await self._session(reader, writer)
+            except asyncio.CancelledError:
+                self._requeue()
+                raise
+            except (OSError, ValueError, asyncio.TimeoutError) as e:
+                logger.warning(f"Нет связи с сервером {self.host}:{self.port}: {e}, повтор через {self.reconnect_delay} сек")
+            self._requeue()
+            await asyncio.sleep(self.reconnect_delay)
+            self.reconnect_delay = min(self.reconnect_delay * 2, RECONNECT_MAX_DELAY)
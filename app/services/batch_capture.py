@@ -0,0 +1,231 @@
+# app/services/batch_capture.py
+import socket
+import struct
+import threading
+import time
+from typing import Callable, Iterator, Optional, Tuple
+
+import numpy as np
+
+from ..utils import logger
+from .raw_capture import (
+    open_raw_socket, CaptureCounters, ETH_HLEN, IPPROTO_TCP, IPPROTO_UDP, TCP_SYN, PACKET_OUTGOING, SNAPLEN,
+    SYN_FLOOD, HTTP_FLOOD, UDP_FLOOD,
+)
+
+# Служебные биты в массиве флагов (сами TCP-флаги занимают младший байт)
+FLAG_PAYLOAD = 0x100       # У TCP-пакета есть полезная нагрузка
+FLAG_HTTP_REQUEST = 0x200  # В нагрузке есть GET или POST
+
+# (тип атаки, время, IP источников как uint32, количество пакетов)
+BatchGroup = Tuple[str, float, np.ndarray, np.ndarray]
+
+unpack_ip = struct.Struct("!HHHBBHI").unpack_from  # от Total Length до Source Address
+unpack_port = struct.Struct("!H").unpack_from
+
+
+class PacketBatch:
+    """Предвыделенные массивы полей заголовков для пачки пакетов."""
+
+    __slots__ = ("size", "length", "src", "protocol", "flags", "dport", "timestamp")
+
+    def __init__(self, size: int = 4096):
+        self.size = size
+        self.length = 0
+        self.src = np.zeros(size, dtype=np.uint32)
+        self.protocol = np.zeros(size, dtype=np.uint8)
+        self.flags = np.zeros(size, dtype=np.uint16)
+        self.dport = np.zeros(size, dtype=np.uint16)
+        self.timestamp = np.zeros(size, dtype=np.float64)
+
+    def append_frame(self, frame: memoryview, length: int, now: float) -> bool:
+        """
+        Разбирает Ethernet/IPv4/TCP|UDP кадр прямо в массивы.
+        Возвращает True, если пакет добавлен.
+        """
+        if length < ETH_HLEN + 20 or frame[12] != 0x08 or frame[13] != 0x00:
+            return False
+
+        total_length, _, frag, _, protocol, _, src = unpack_ip(frame, ETH_HLEN + 2)
+        if frag & 0x1FFF:
+            return False
+
+        l4 = ETH_HLEN + (frame[ETH_HLEN] & 0x0F) * 4
+        end = min(length, ETH_HLEN + total_length)
+
+        if protocol == IPPROTO_TCP:
+            if end < l4 + 20:
+                return False
+            flags = frame[l4 + 13]
+            payload_start = l4 + (frame[l4 + 12] >> 4) * 4
+            if end > payload_start:
+                payload = bytes(frame[payload_start:end])
+                flags |= FLAG_PAYLOAD
+                if b"GET" in payload or b"POST" in payload:
+                    flags |= FLAG_HTTP_REQUEST
+        elif protocol == IPPROTO_UDP:
+            if end < l4 + 8:
+                return False
+            flags = 0
+        else:
+            return False
+
+        index = self.length
+        self.src[index] = src
+        self.protocol[index] = protocol
+        self.flags[index] = flags
+        self.dport[index] = unpack_port(frame, l4 + 2)[0]
+        self.timestamp[index] = now
+        self.length = index + 1
+        return True
+
+    def full(self) -> bool:
+        return self.length >= self.size
+
+    def clear(self) -> None:
+        self.length = 0
+
+
+def int_to_ip(addr: int) -> str:
+    return socket.inet_ntoa(addr.to_bytes(4, "big"))
+
+
+def whitelist_tables(matcher):
+    """Готовит IPv4-таблицы PrefixMatcher для векторной проверки."""
+    return [(shift, np.array(networks, dtype=np.uint32)) for shift, networks in matcher.v4_networks()]
+
+
+def whitelist_mask(src: np.ndarray, tables) -> np.ndarray:
+    """Векторная проверка белого списка: по одному np.isin на каждую длину префикса."""
+    mask = np.zeros(src.shape, dtype=bool)
+    for shift, networks in tables:
+        if shift >= 32:
+            # Префикс /0 покрывает всё адресное пространство
+            mask[:] = True
+            break
+        mask |= np.isin(src >> np.uint32(shift), networks)
+    return mask
+
+
+def classify_batch(batch: PacketBatch, whitelist_tables=()) -> Iterator[BatchGroup]:
+    """
+    Повторяет логику classify_packet масками NumPy и группирует пакеты по
+    источнику через np.unique. Пачка режется по границам секунд, чтобы
+    счётчики скользящего окна попадали в правильные корзины.
+    """
+    n = batch.length
+    if not n:
+        return
+
+    src = batch.src[:n]
+    protocol = batch.protocol[:n]
+    flags = batch.flags[:n]
+    dport = batch.dport[:n]
+    timestamp = batch.timestamp[:n]
+
+    tcp = protocol == IPPROTO_TCP
+    syn = (flags & 0xFF) == TCP_SYN
+    http_port = (dport == 80) | (dport == 8080)
+    has_payload = (flags & FLAG_PAYLOAD) != 0
+    http_request = (flags & FLAG_HTTP_REQUEST) != 0
+
+    allowed = ~whitelist_mask(src, whitelist_tables)
+    masks = (
+        (HTTP_FLOOD, allowed & tcp & http_port & (http_request | (~has_payload & syn))),
+        (SYN_FLOOD, allowed & tcp & ~http_port & syn),
+        (UDP_FLOOD, allowed & (protocol == IPPROTO_UDP)),
+    )
+
+    seconds = timestamp.astype(np.int64)
+    bounds = np.flatnonzero(np.diff(seconds)) + 1
+    starts = np.concatenate(([0], bounds))
+    stops = np.concatenate((bounds, [n]))
+
+    for start, stop in zip(starts, stops):
+        now = float(timestamp[stop - 1])
+        for attack_type, mask in masks:
+            selected = src[start:stop][mask[start:stop]]
+            if selected.size:
+                sources, counts = np.unique(selected, return_counts=True)
+                yield attack_type, now, sources, counts
+
+
+class BatchSniffer:
+    """
+    Захват через AF_PACKET сокет с BPF-фильтром, заполняющий PacketBatch.
+    Пачка передаётся обработчику, когда она заполнена или когда с первого
+    пакета в ней прошло max_latency секунд.
+    """
+
+    def __init__(self, iface: str, prn: Callable[[PacketBatch], None], batch_size: int = 4096, max_latency: float = 0.05):
+        self.iface = iface
+        self.prn = prn
+        self.batch = PacketBatch(batch_size)
+        self.max_latency = max_latency
+        self.sock: Optional[socket.socket] = None
+        self.thread: Optional[threading.Thread] = None
+        self.running = False
+        self.counters = CaptureCounters()
+
+    def start(self) -> None:
+        self.sock = open_raw_socket(self.iface, timeout=self.max_latency)
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="batch-sniffer", daemon=True)
+        self.thread.start()
+
+    def _flush(self) -> None:
+        try:
+            self.prn(self.batch)
+        except Exception as e:
+            logger.error(f"Ошибка при обработке пачки пакетов: {e}")
+        self.batch.clear()
+
+    def _run(self) -> None:
+        buffer = bytearray(SNAPLEN)
+        frame = memoryview(buffer)
+        sock = self.sock
+        batch = self.batch
+        counters = self.counters
+        deadline = None
+
+        while self.running:
+            try:
+                length, address = sock.recvfrom_into(buffer)
+            except socket.timeout:
+                length = 0
+            except OSError as e:
+                if self.running:
+                    logger.error(f"Ошибка чтения raw-сокета: {e}")
+                break
+
+            now = time.time()
+            if length and address[2] != PACKET_OUTGOING:
+                counters.received += 1
+            else:
+                length = 0
+            if length and batch.append_frame(frame, length, now):
+                if deadline is None:
+                    deadline = now + self.max_latency
+                if batch.full():
+                    self._flush()
+                    deadline = None
+                    continue
+
+            if deadline is not None and now >= deadline:
+                self._flush()
+                deadline = None
+
+        if batch.length:
+            self._flush()
+
+    def capture_stats(self) -> dict:
+        """Счётчики захвата вместе с отброшенными ядром кадрами."""
+        self.counters.poll(self.sock)
+        return self.counters.as_dict()
+
+    def stop(self) -> None:
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=2)
+        if self.sock:
+            self.sock.close()
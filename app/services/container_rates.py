@@ -0,0 +1,155 @@
+# app/services/container_rates.py
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional
+
+
+def sample_time(stats: Dict[str, Any], default: float) -> float:
+    """Время образца из поля read (RFC 3339 с наносекундами), иначе default."""
+    read = stats.get("read")
+    if not read or read.startswith("0001-"):
+        return default
+    try:
+        # Дробную часть обрезаем до микросекунд, которые понимает datetime
+        base, _, fraction = read.rstrip("Z").partition(".")
+        moment = datetime.strptime(base, "%Y-%m-%dT%H:%M:%S").replace(tzinfo=timezone.utc)
+        return moment.timestamp() + (float("0." + fraction[:9]) if fraction else 0.0)
+    except ValueError:
+        return default
+
+
+def network_totals(stats: Dict[str, Any]):
+    rx_bytes = tx_bytes = rx_packets = tx_packets = 0
+    for metrics in (stats.get("networks") or {}).values():
+        rx_bytes += metrics.get("rx_bytes", 0)
+        tx_bytes += metrics.get("tx_bytes", 0)
+        rx_packets += metrics.get("rx_packets", 0)
+        tx_packets += metrics.get("tx_packets", 0)
+    return rx_bytes, tx_bytes, rx_packets, tx_packets
+
+
+def blkio_totals(stats: Dict[str, Any]):
+    """Прочитано и записано байт по всем устройствам (cgroup v1 — Read/Write, v2 — read/write)."""
+    read = write = 0
+    for entry in (stats.get("blkio_stats") or {}).get("io_service_bytes_recursive") or []:
+        op = entry.get("op", "").lower()
+        if op == "read":
+            read += entry.get("value", 0)
+        elif op == "write":
+            write += entry.get("value", 0)
+    return read, write
+
+
+def cpu_counters(cpu_stats: Dict[str, Any]):
+    return (
+        (cpu_stats.get("cpu_usage") or {}).get("total_usage", 0),
+        cpu_stats.get("system_cpu_usage", 0),
+    )
+
+
+def rate(current: int, previous: int, elapsed: float) -> float:
+    return round((current - previous) / elapsed, 1) if elapsed > 0 else 0.0
+
+
+class RateState:
+    """Предыдущий образец контейнера: накопительные счётчики и вычисленные скорости."""
+
+    __slots__ = (
+        "time", "cpu_total", "system_cpu", "rx_bytes", "tx_bytes",
+        "rx_packets", "tx_packets", "blk_read", "blk_write", "sample", "rates",
+    )
+
+    def __init__(self, now: float, stats: Dict[str, Any]):
+        self.time = now
+        self.cpu_total, self.system_cpu = cpu_counters(stats.get("cpu_stats") or {})
+        self.rx_bytes, self.tx_bytes, self.rx_packets, self.tx_packets = network_totals(stats)
+        self.blk_read, self.blk_write = blkio_totals(stats)
+        self.sample = stats
+        self.rates: Dict[str, Any] = {}
+
+
+class ContainerRates:
+    """
+    Инкрементальный расчёт скоростей по накопительным счётчикам Docker:
+    CPU% (доля system_cpu_usage с учётом online_cpus), rx/tx байт и пакетов
+    в секунду, чтение и запись блочных устройств в секунду.
+
+    Для каждого запущенного контейнера хранится один RateState. Если счётчик
+    уменьшился (контейнер перезапущен), скорости за этот интервал не считаются,
+    а образец становится новой точкой отсчёта. Состояния исчезнувших и
+    остановленных контейнеров удаляются в prune.
+
+    update вызывается из потоков docker_pool (запрос, не уложившийся в таймаут,
+    продолжает работать) и потоков подписок, prune — из цикла asyncio, поэтому
+    словарь состояний защищён блокировкой.
+    """
+
+    def __init__(self):
+        self.states: Dict[str, RateState] = {}
+        self.lock = threading.Lock()
+
+    def update(self, container_id: str, stats: Dict[str, Any], now: Optional[float] = None) -> Dict[str, Any]:
+        with self.lock:
+            return self._update(container_id, stats, now)
+
+    def _update(self, container_id: str, stats: Dict[str, Any], now: Optional[float]) -> Dict[str, Any]:
+        previous = self.states.get(container_id)
+        # Тот же образец (например, повторный запрос в режиме stream) — отдаём посчитанное
+        if previous is not None and previous.sample is stats:
+            return previous.rates
+
+        current = RateState(sample_time(stats, time.time() if now is None else now), stats)
+        cpu_stats = stats.get("cpu_stats") or {}
+        online_cpus = cpu_stats.get("online_cpus") or len((cpu_stats.get("cpu_usage") or {}).get("percpu_usage") or []) or 1
+
+        if previous is None:
+            # Первый образец: CPU% можно посчитать по precpu_stats, который Docker кладёт в ответ
+            base_cpu, base_system = cpu_counters(stats.get("precpu_stats") or {})
+            current.rates = {"cpuPercent": self._cpu_percent(current.cpu_total - base_cpu, current.system_cpu - base_system, online_cpus)}
+        elif self._reset(previous, current):
+            current.rates = {"cpuPercent": 0.0}
+        else:
+            elapsed = current.time - previous.time
+            current.rates = {
+                "cpuPercent": self._cpu_percent(current.cpu_total - previous.cpu_total, current.system_cpu - previous.system_cpu, online_cpus),
+                "network": {
+                    "rxBytesPerSec": rate(current.rx_bytes, previous.rx_bytes, elapsed),
+                    "txBytesPerSec": rate(current.tx_bytes, previous.tx_bytes, elapsed),
+                    "rxPacketsPerSec": rate(current.rx_packets, previous.rx_packets, elapsed),
+                    "txPacketsPerSec": rate(current.tx_packets, previous.tx_packets, elapsed),
+                },
+                "blockIO": {
+                    "readBytesPerSec": rate(current.blk_read, previous.blk_read, elapsed),
+                    "writeBytesPerSec": rate(current.blk_write, previous.blk_write, elapsed),
+                },
+            }
+
+        self.states[container_id] = current
+        return current.rates
+
+    @staticmethod
+    def _cpu_percent(cpu_delta: int, system_delta: int, online_cpus: int) -> float:
+        if cpu_delta <= 0 or system_delta <= 0:
+            return 0.0
+        return round(cpu_delta / system_delta * online_cpus * 100, 2)
+
+    @staticmethod
+    def _reset(previous: RateState, current: RateState) -> bool:
+        return (
+            current.cpu_total < previous.cpu_total
+            or current.rx_bytes < previous.rx_bytes
+            or current.tx_bytes < previous.tx_bytes
+            or current.rx_packets < previous.rx_packets
+            or current.tx_packets < previous.tx_packets
+            or current.blk_read < previous.blk_read
+            or current.blk_write < previous.blk_write
+            or current.time <= previous.time
+        )
+
+    def prune(self, running_ids: Iterable[str]) -> None:
+        """Удаляет состояния контейнеров, которых больше нет среди запущенных."""
+        running = set(running_ids)
+        with self.lock:
+            for container_id in [container_id for container_id in self.states if container_id not in running]:
+                del self.states[container_id]
@@ -0,0 +1,191 @@
+# app/services/disk_collector.py
+import os
+import re
+import select
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..utils import logger
+from .host_collector import PROC_ROOT, ProcFile
+
+MB = 1024 * 1024
+SECTOR_SIZE = 512  # В diskstats секторы всегда по 512 байт, независимо от устройства
+HOST_ROOT = "/host" if os.path.exists("/host") else "/"  # Корень файловой системы хоста, смонтированный в контейнер
+NETWORK_FILESYSTEMS = {"nfs", "nfs4", "cifs", "smb3", "zfs", "fuse.glusterfs", "ceph"}  # Хранилища без /dev/ в имени устройства
+SKIPPED_DEVICES = ("loop", "ram", "zram", "fd")  # Виртуальные устройства, не интересные для I/O
+
+
+def unescape_mount(value: str) -> str:
+    """В /proc/mounts пробелы, табуляции и обратные слэши записаны как \\040, \\011, \\134."""
+    return re.sub(r"\\([0-7]{3})", lambda match: chr(int(match.group(1), 8)), value)
+
+
+class MountPoint:
+    """Точка монтирования из таблицы монтирования хоста."""
+
+    __slots__ = ("device", "path", "fstype", "stat_path")
+
+    def __init__(self, device: str, path: str, fstype: str, host_root: str):
+        self.device = device
+        self.path = path
+        self.fstype = fstype
+        self.stat_path = os.path.join(host_root, path.lstrip("/")) if host_root != "/" else path
+
+
+class DiskCounters:
+    """Накопительные счётчики устройства из diskstats."""
+
+    __slots__ = ("reads", "read_sectors", "writes", "write_sectors", "io_ms")
+
+    def __init__(self, fields: List[bytes]):
+        self.reads = int(fields[3])
+        self.read_sectors = int(fields[5])
+        self.writes = int(fields[7])
+        self.write_sectors = int(fields[9])
+        self.io_ms = int(fields[12])  # Время, когда на устройстве была хотя бы одна операция
+
+
+def delta_rate(current: int, previous: int, elapsed: float) -> float:
+    # Счётчик уменьшился — устройство переподключено или счётчик переполнился
+    if current < previous or elapsed <= 0:
+        return 0.0
+    return round((current - previous) / elapsed, 1)
+
+
+class DiskCollector:
+    """
+    Заполнение точек монтирования и нагрузка на диски хоста.
+
+    Таблица монтирования читается из /proc/1/mounts (пространство имён init
+    хоста; /proc/mounts указывает на таблицу читающего процесса, то есть
+    контейнера) и разбирается заново только после изменения: файл остаётся
+    открытым, а ядро сообщает об изменении через poll (POLLPRI). Заполнение
+    каждой точки — statvfs через корень хоста; заполнение самого корня
+    отдаётся отдельно (поле disk снимка системных метрик).
+
+    IOPS, скорость чтения и записи и загрузка (utilization, доля времени с
+    операциями в очереди) считаются по приросту счётчиков /proc/diskstats
+    между вызовами collect; первый вызов возвращает нули.
+    """
+
+    def __init__(self, proc_root: str = PROC_ROOT, host_root: str = HOST_ROOT):
+        self.proc_root = proc_root
+        self.host_root = host_root
+        mounts_path = f"{proc_root}/1/mounts"
+        if not os.access(mounts_path, os.R_OK):
+            mounts_path = f"{proc_root}/mounts"
+        self.mounts_file = ProcFile(mounts_path, 65536)
+        self.diskstats = ProcFile(f"{proc_root}/diskstats", 16384)
+        self.poller = select.poll()
+        self.poller.register(self.mounts_file.fd, select.POLLPRI | select.POLLERR)
+        self.mounts: List[MountPoint] = []
+        self.mounts_loaded = False
+        self.previous: Dict[str, DiskCounters] = {}
+        self.previous_time: Optional[float] = None
+
+    def _mounts_changed(self) -> bool:
+        return not self.mounts_loaded or bool(self.poller.poll(0))
+
+    def read_mounts(self) -> List[MountPoint]:
+        if not self._mounts_changed():
+            return self.mounts
+        mounts: Dict[str, MountPoint] = {}
+        for line in self.mounts_file.read().decode(errors="replace").split("\n"):
+            fields = line.split()
+            if len(fields) < 3:
+                continue
+            device, path, fstype = unescape_mount(fields[0]), unescape_mount(fields[1]), fields[2]
+            if not device.startswith("/dev/") and fstype not in NETWORK_FILESYSTEMS:
+                continue  # proc, sysfs, tmpfs, overlay контейнеров и прочие виртуальные ФС
+            # Одно устройство может быть смонтировано несколько раз (bind) — оставляем самый короткий путь
+            known = mounts.get(device)
+            if known is None or len(path) < len(known.path):
+                mounts[device] = MountPoint(device, path, fstype, self.host_root)
+        self.mounts = sorted(mounts.values(), key=lambda mount: mount.path)
+        self.mounts_loaded = True
+        logger.info(f"Таблица монтирования загружена: {', '.join(mount.path for mount in self.mounts)}")
+        return self.mounts
+
+    def read_usage(self) -> List[Dict[str, Any]]:
+        usage = []
+        for mount in self.read_mounts():
+            try:
+                stat = os.statvfs(mount.stat_path)
+            except OSError:
+                continue  # Точка монтирования недоступна из контейнера
+            total = stat.f_blocks * stat.f_frsize
+            if total == 0:
+                continue
+            used = (stat.f_blocks - stat.f_bfree) * stat.f_frsize
+            available = stat.f_bavail * stat.f_frsize
+            usage.append({
+                "mountpoint": mount.path,
+                "device": mount.device,
+                "fstype": mount.fstype,
+                "usage": round(used / MB, 2),
+                "total": round(total / MB, 2),
+                # Как в df: доля от места, доступного обычным пользователям (без резерва root)
+                "percent": round(used / (used + available) * 100, 1) if used + available else 0.0,
+            })
+        return usage
+
+    def read_root_usage(self) -> Dict[str, float]:
+        """Заполнение корня хоста в МБ (used и total как у psutil.disk_usage)."""
+        try:
+            stat = os.statvfs(self.host_root)
+        except OSError as e:
+            logger.error(f"Не удалось получить заполнение {self.host_root}: {e}")
+            return {}
+        return {
+            "usage": round((stat.f_blocks - stat.f_bfree) * stat.f_frsize / MB, 2),
+            "total": round(stat.f_blocks * stat.f_frsize / MB, 2),
+        }
+
+    def read_io(self) -> Dict[str, Dict[str, float]]:
+        now = time.monotonic()
+        elapsed = now - self.previous_time if self.previous_time is not None else 0.0
+        current: Dict[str, DiskCounters] = {}
+        devices = {}
+        for line in self.diskstats.read().split(b"\n"):
+            fields = line.split()
+            if len(fields) < 14:
+                continue
+            name = fields[2].decode()
+            if name.startswith(SKIPPED_DEVICES):
+                continue
+            counters = DiskCounters(fields)
+            if not counters.reads and not counters.writes:
+                continue  # Устройство без единой операции (пустой привод, неиспользуемый раздел)
+            current[name] = counters
+            previous = self.previous.get(name)
+            if previous is None or not elapsed:
+                previous = counters
+            devices[name] = {
+                "readIops": delta_rate(counters.reads, previous.reads, elapsed),
+                "writeIops": delta_rate(counters.writes, previous.writes, elapsed),
+                "readBytesPerSec": delta_rate(counters.read_sectors * SECTOR_SIZE, previous.read_sectors * SECTOR_SIZE, elapsed),
+                "writeBytesPerSec": delta_rate(counters.write_sectors * SECTOR_SIZE, previous.write_sectors * SECTOR_SIZE, elapsed),
+                "utilPercent": min(100.0, round(delta_rate(counters.io_ms, previous.io_ms, elapsed) / 10, 1)),
+            }
+        self.previous = current
+        self.previous_time = now
+        return devices
+
+    def collect(self) -> Tuple[List[Dict[str, Any]], Dict[str, Dict[str, float]], Dict[str, float]]:
+        return self.read_usage(), self.read_io(), self.read_root_usage()
+
+    def close(self) -> None:
+        self.poller.unregister(self.mounts_file.fd)
+        self.mounts_file.close()
+        self.diskstats.close()
+
+
+_collector: Optional[DiskCollector] = None
+
+
+def get_disk_collector() -> DiskCollector:
+    """Общий экземпляр: таблица монтирования и счётчики diskstats хранятся в нём."""
+    global _collector
+    if _collector is None:
+        _collector = DiskCollector()
+    return _collector
@@ -0,0 +1,162 @@
+# app/services/docker_stream.py
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from ..utils import logger
+
+# События Docker, меняющие состояние контейнера
+RUNNING_ACTIONS = {"start", "restart", "unpause"}
+STOPPED_ACTIONS = {"die", "stop"}
+RECONNECT_DELAY = 5  # Пауза перед переподключением к потоку событий (сек)
+
+
+class ContainerRecord:
+    """Состояние контейнера в памяти: данные inventory и последний образец статистики."""
+
+    __slots__ = ("id", "name", "status", "state", "stats", "thread", "generation")
+
+    def __init__(self, container_id: str, name: str, status: str, state: Optional[Dict[str, Any]] = None):
+        self.id = container_id
+        self.name = name
+        self.status = status
+        self.state = state or {"Status": status}
+        self.stats: Optional[Dict[str, Any]] = None
+        self.thread: Optional[threading.Thread] = None
+        self.generation = 0  # Номер текущей подписки: прежние потоки по нему понимают, что заменены
+
+
+class DockerStreams:
+    """
+    Потоковый сбор метрик контейнеров. Вместо опроса каждые N секунд держит
+    одну подписку stats(stream=True) на каждый запущенный контейнер, а список
+    контейнеров ведёт по потоку событий Docker (start, die, destroy...).
+    Полный список запрашивается только при запуске и после переподключения
+    к потоку событий.
+
+    Подписки и поток событий работают в фоновых потоках и только обновляют
+    записи; on_change вызывается из потока событий при смене состояния
+    контейнера, чтобы уведомления срабатывали без ожидания следующего цикла.
+    """
+
+    def __init__(self, client, on_change: Optional[Callable[[ContainerRecord], None]] = None):
+        self.client = client
+        self.on_change = on_change
+        self.records: Dict[str, ContainerRecord] = {}
+        self.lock = threading.Lock()
+        self.thread: Optional[threading.Thread] = None
+        self.running = False
+
+    def start(self) -> None:
+        self.running = True
+        self.thread = threading.Thread(target=self._watch_events, name="docker-events", daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        # Потоки демонические: подписки завершаются на следующем образце или при выходе
+        self.running = False
+
+    def records_snapshot(self) -> List[ContainerRecord]:
+        with self.lock:
+            return list(self.records.values())
+
+    def _sync(self) -> None:
+        """Загружает полный список контейнеров и подписывается на запущенные."""
+        containers = self.client.api.containers(all=True)
+        seen = set()
+        for summary in containers:
+            container_id = summary["Id"]
+            seen.add(container_id)
+            name = (summary.get("Names") or [container_id[:12]])[0].lstrip("/")
+            self._update(container_id, name, summary.get("State", ""))
+        with self.lock:
+            for container_id in list(self.records):
+                if container_id not in seen:
+                    del self.records[container_id]
+        logger.info(f"Список контейнеров загружен: {len(containers)}")
+
+    def _update(self, container_id: str, name: str, status: str, resubscribe: bool = False) -> ContainerRecord:
+        with self.lock:
+            record = self.records.get(container_id)
+            if record is None:
+                record = ContainerRecord(container_id, name, status)
+                self.records[container_id] = record
+            record.name = name or record.name
+            record.status = status
+        if status == "running":
+            self._subscribe(record, resubscribe)
+        else:
+            record.stats = None
+            record.state = {"Status": status}
+        return record
+
+    def _subscribe(self, record: ContainerRecord, resubscribe: bool = False) -> None:
+        """
+        Запускает подписку на статистику. resubscribe — событие запуска: при
+        docker restart событие start может прийти, пока прежний поток ещё
+        дочитывает поток остановленного контейнера, поэтому подписка
+        создаётся заново, а прежний поток завершается, увидев новое поколение.
+        """
+        with self.lock:
+            if not resubscribe and record.thread is not None and record.thread.is_alive():
+                return
+            record.generation += 1
+            record.thread = threading.Thread(
+                target=self._stream_stats, args=(record, record.generation), name=f"docker-stats-{record.name}", daemon=True
+            )
+            record.thread.start()
+
+    def _stream_stats(self, record: ContainerRecord, generation: int) -> None:
+        """Читает образцы статистики контейнера, пока он запущен (Docker шлёт их раз в секунду)."""
+        try:
+            state = self.client.api.inspect_container(record.id).get("State", record.state)
+            if record.generation == generation:
+                record.state = state
+            for sample in self.client.api.stats(record.id, stream=True, decode=True):
+                if not self.running or record.status != "running" or record.generation != generation:
+                    break
+                record.stats = sample
+        except Exception as e:
+            if self.running and record.status == "running" and record.generation == generation:
+                logger.error(f"Подписка на статистику контейнера {record.name} прервана: {e}")
+
+    def _handle_event(self, event: Dict[str, Any]) -> None:
+        action = event.get("Action", event.get("status", ""))
+        actor = event.get("Actor", {})
+        container_id = actor.get("ID") or event.get("id")
+        if not container_id:
+            return
+        name = actor.get("Attributes", {}).get("name", "")
+
+        if action == "destroy":
+            with self.lock:
+                self.records.pop(container_id, None)
+            return
+        if action in RUNNING_ACTIONS:
+            record = self._update(container_id, name, "running", resubscribe=True)
+        elif action in STOPPED_ACTIONS:
+            record = self._update(container_id, name, "exited")
+        elif action == "pause":
+            record = self._update(container_id, name, "paused")
+        elif action == "create":
+            record = self._update(container_id, name, "created")
+        else:
+            return
+
+        logger.debug(f"Контейнер {record.name}: {action}")
+        if self.on_change is not None:
+            self.on_change(record)
+
+    def _watch_events(self) -> None:
+        while self.running:
+            try:
+                self._sync()
+                for event in self.client.events(decode=True, filters={"type": "container"}):
+                    if not self.running:
+                        break
+                    self._handle_event(event)
+            except Exception as e:
+                if self.running:
+                    logger.error(f"Поток событий Docker прерван, переподключение через {RECONNECT_DELAY} сек: {e}")
+            if self.running:
+                time.sleep(RECONNECT_DELAY)
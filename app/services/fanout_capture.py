@@ -0,0 +1,253 @@
+# app/services/fanout_capture.py
+import multiprocessing
+import os
+import queue
+import signal
+import socket
+import struct
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+
+from ..utils import logger
+from .raw_capture import open_raw_socket, parse_frame, classify_packet, read_packet_statistics, CaptureCounters, PACKET_OUTGOING, SNAPLEN
+
+# Константы PACKET_FANOUT из linux/if_packet.h
+SOL_PACKET = 263
+PACKET_FANOUT = 18
+PACKET_FANOUT_HASH = 0
+PACKET_FANOUT_FLAG_DEFRAG = 0x8000
+
+# Сообщения процессов захвата в очереди: (вид, номер процесса, данные)
+WORKER_READY = "ready"  # Сокет открыт и добавлен в fanout-группу
+WORKER_ERROR = "error"  # Ошибка, после которой процесс завершается (данные — текст ошибки)
+WORKER_DELTAS = "deltas"  # (дельты, received, kernel_packets, kernel_drops)
+STARTUP_TIMEOUT = 15  # Ожидание готовности процессов при запуске (сек)
+RESTART_DELAY = 5  # Пауза перед перезапуском завершившегося процесса (сек)
+
+# Дельты за интервал: {тип атаки: {IP: количество пакетов}}
+Deltas = Dict[str, Dict[str, int]]
+
+
+def join_fanout(sock: socket.socket, group_id: int) -> None:
+    """
+    Добавляет сокет в fanout-группу. Ядро распределяет кадры между сокетами
+    группы по хэшу потока, так что пакеты одного соединения всегда попадают
+    в один и тот же процесс.
+
+    Хэш берётся от потока, а не от адреса источника: пакеты одного IP с разных
+    портов расходятся по нескольким процессам. Поэтому процессы передают
+    только дельты, а скорость и пороги считаются по их сумме в основном процессе.
+    """
+    mode = PACKET_FANOUT_HASH | PACKET_FANOUT_FLAG_DEFRAG
+    sock.setsockopt(SOL_PACKET, PACKET_FANOUT, struct.pack("I", (group_id & 0xFFFF) | (mode << 16)))
+
+
+def capture_worker(index: int, interface: str, group_id: int, whitelist, out_queue, stop_event, flush_interval: float) -> None:
+    """
+    Процесс захвата: читает свою долю кадров из fanout-группы, ведёт локальные
+    счётчики по IP и раз в flush_interval отправляет накопленные дельты
+    вместе с приращениями счётчиков сокета (received, kernel_packets, kernel_drops).
+    О готовности и об ошибках сокета процесс сообщает в ту же очередь.
+    """
+    # Остановкой управляет основной процесс
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    try:
+        sock = open_raw_socket(interface)
+        join_fanout(sock, group_id)
+    except OSError as e:
+        out_queue.put((WORKER_ERROR, index, f"не удалось открыть сокет на {interface}: {e}"))
+        return
+    out_queue.put((WORKER_READY, index, None))
+
+    buffer = bytearray(SNAPLEN)
+    frame = memoryview(buffer)
+    deltas: Deltas = defaultdict(lambda: defaultdict(int))
+    received = 0
+    next_flush = time.monotonic() + flush_interval
+
+    # stop_event разделяется между процессами и защищён общей блокировкой, поэтому
+    # проверяется только при сбросе дельт (не реже таймаута сокета), а не на каждом пакете
+    try:
+        while True:
+            try:
+                length, address = sock.recvfrom_into(buffer)
+            except socket.timeout:
+                length = 0
+            except OSError as e:
+                # Например, интерфейс пропал: основной процесс перезапустит захват
+                out_queue.put((WORKER_ERROR, index, f"ошибка чтения сокета: {e}"))
+                return
+
+            if length and address[2] != PACKET_OUTGOING:
+                received += 1
+                parsed = parse_frame(frame, length)
+                if parsed is not None:
+                    src_ip, protocol, flags, dport, payload = parsed
+                    if whitelist.match(src_ip) is None:
+                        attack_type = classify_packet(protocol, flags, dport, payload)
+                        if attack_type is not None:
+                            deltas[attack_type][src_ip] += 1
+
+            now = time.monotonic()
+            if now >= next_flush:
+                kernel_packets, kernel_drops = read_packet_statistics(sock)
+                if deltas or received or kernel_packets:
+                    out_queue.put((WORKER_DELTAS, index, (
+                        {attack_type: dict(counts) for attack_type, counts in deltas.items()},
+                        received, kernel_packets, kernel_drops,
+                    )))
+                    deltas.clear()
+                    received = 0
+                next_flush = now + flush_interval
+                if stop_event.is_set():
+                    break
+    finally:
+        sock.close()
+
+
+class FanoutSniffer:
+    """
+    Многопроцессный захват: N процессов в одной PACKET_FANOUT группе на интерфейсе.
+    Каждый процесс считает пакеты локально, а поток-агрегатор в основном
+    процессе передаёт полученные дельты в обработчик prn.
+
+    start ждёт от каждого процесса подтверждения, что сокет открыт; если не
+    запустился ни один, поднимается OSError (и create_sniffer переходит на
+    scapy). Завершившиеся процессы агрегатор перезапускает через RESTART_DELAY.
+    """
+
+    def __init__(self, iface: str, prn: Callable[[Deltas], None], whitelist, workers: int = 0, flush_interval: float = 0.2):
+        self.iface = iface
+        self.prn = prn
+        self.whitelist = whitelist
+        self.workers = workers or os.cpu_count() or 1
+        self.flush_interval = flush_interval
+        # forkserver, а не fork: основной процесс многопоточный (пулы Docker, asyncio.to_thread,
+        # потоки захвата), и fork мог бы унести в процесс захвата чужие захваченные блокировки.
+        # Процессы создаются из однопоточного сервера, модули захвата загружены в нём заранее.
+        self.context = multiprocessing.get_context("forkserver")
+        self.context.set_forkserver_preload([__name__])
+        self.queue = self.context.Queue(maxsize=self.workers * 64)
+        self.stop_event = self.context.Event()
+        self.group_id = os.getpid() & 0xFFFF
+        self.processes: List[Optional[multiprocessing.Process]] = [None] * self.workers
+        self.restart_at: List[Optional[float]] = [None] * self.workers  # Когда перезапустить завершившийся процесс
+        self.ready = set()  # Номера процессов, открывших сокет
+        self.restarts = 0
+        self.thread: Optional[threading.Thread] = None
+        self.running = False
+        self.counters = CaptureCounters()  # Сумма по всем процессам захвата
+
+    def start(self) -> None:
+        # Проверяем доступность raw-сокетов в основном процессе, чтобы ошибка
+        # прав доступа сразу привела к переключению на другой способ захвата
+        open_raw_socket(self.iface).close()
+
+        for index in range(self.workers):
+            self._spawn(index)
+
+        # Ждём подтверждения от каждого процесса (дельты уже готовых обрабатываем сразу)
+        failed = set()
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while len(self.ready) + len(failed) < self.workers and time.monotonic() < deadline:
+            try:
+                message = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                failed.update(
+                    index for index, process in enumerate(self.processes)
+                    if not process.is_alive() and index not in self.ready
+                )
+                continue
+            if message[0] == WORKER_ERROR:
+                failed.add(message[1])
+            self._handle(message)
+
+        if not self.ready:
+            self.stop()
+            raise OSError(f"ни один процесс захвата не запустился на {self.iface}")
+        if len(self.ready) < self.workers:
+            logger.error(f"Запущено {len(self.ready)} из {self.workers} процессов захвата, остальные будут перезапущены")
+
+        self.running = True
+        self.thread = threading.Thread(target=self._aggregate, name="fanout-aggregator", daemon=True)
+        self.thread.start()
+        logger.info(f"Запущено {len(self.ready)} процессов захвата на {self.iface} (PACKET_FANOUT)")
+
+    def _spawn(self, index: int) -> None:
+        process = self.context.Process(
+            target=capture_worker,
+            args=(index, self.iface, self.group_id, self.whitelist, self.queue, self.stop_event, self.flush_interval),
+            name=f"capture-worker-{index}",
+            daemon=True,
+        )
+        process.start()
+        self.processes[index] = process
+
+    def _handle(self, message) -> None:
+        kind, index, data = message
+        if kind == WORKER_READY:
+            self.ready.add(index)
+            return
+        if kind == WORKER_ERROR:
+            self.ready.discard(index)
+            logger.error(f"Процесс захвата capture-worker-{index}: {data}")
+            return
+
+        deltas, received, kernel_packets, kernel_drops = data
+        self.counters.received += received
+        self.counters.kernel_packets += kernel_packets
+        self.counters.kernel_drops += kernel_drops
+        if not deltas:
+            return
+        try:
+            self.prn(deltas)
+        except Exception as e:
+            logger.error(f"Ошибка при обработке дельт от процесса захвата: {e}")
+
+    def _check_workers(self, now: float) -> None:
+        """Перезапускает завершившиеся процессы захвата (не чаще раза в RESTART_DELAY)."""
+        for index, process in enumerate(self.processes):
+            if process.is_alive():
+                continue
+            if self.restart_at[index] is None:
+                self.ready.discard(index)
+                self.restart_at[index] = now + RESTART_DELAY
+                logger.error(
+                    f"Процесс захвата {process.name} завершился (код {process.exitcode}), "
+                    f"его доля трафика не учитывается, перезапуск через {RESTART_DELAY} сек"
+                )
+            elif now >= self.restart_at[index]:
+                self.restart_at[index] = None
+                self.restarts += 1
+                self._spawn(index)
+
+    def _aggregate(self) -> None:
+        next_check = time.monotonic()
+        while self.running:
+            try:
+                self._handle(self.queue.get(timeout=0.5))
+            except queue.Empty:
+                pass
+            except (EOFError, OSError):
+                break
+            now = time.monotonic()
+            if now >= next_check and self.running:
+                self._check_workers(now)
+                next_check = now + 1
+
+    def capture_stats(self) -> dict:
+        """Счётчики захвата, присланные процессами (с задержкой до flush_interval)."""
+        return self.counters.as_dict()
+
+    def stop(self) -> None:
+        self.running = False
+        self.stop_event.set()
+        for process in filter(None, self.processes):
+            process.join(timeout=2)
+            if process.is_alive():
+                process.terminate()
+        if self.thread:
+            self.thread.join(timeout=2)
@@ -0,0 +1,262 @@
+# app/services/fleet.py
+import asyncio
+import hmac
+import ipaddress
+import json
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.bot import notify_dos_attack
+from app.config import settings
+from ..utils import logger
+from ..utils.delta import apply
+from .agent import PROTOCOL_VERSION, encode
+from .metrics_collector import metrics_history
+
+FLEET_LISTEN_HOST = settings.fleet_listen_host  # Адрес приёма данных от агентов
+FLEET_LISTEN_PORT = settings.fleet_listen_port  # Порт приёма (0 = выключен)
+HELLO_TIMEOUT = 10  # Ожидание приветствия от агента (сек)
+LINE_LIMIT = 16 * 1024 * 1024  # Максимальный размер одной пачки (байт)
+HOST_INCIDENTS = 1000  # Сколько последних инцидентов хранить по каждому хосту
+
+
+def is_loopback(host: str) -> bool:
+    """Адрес приёма доступен только с этой машины."""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def percent(part: Optional[float], total: Optional[float]) -> Optional[float]:
+    return round(part / total * 100, 1) if part is not None and total else None
+
+
+class FleetHost:
+    """Состояние хоста с агентом: последний снимок, последние инциденты и счётчики приёма."""
+
+    __slots__ = (
+        "name", "address", "connections", "connected_at", "last_seen", "snapshot",
+        "snapshot_time", "incidents", "incident_keys", "batches", "items", "bytes",
+    )
+
+    def __init__(self, name: str):
+        self.name = name
+        self.address: Optional[str] = None
+        self.connections = 0
+        self.connected_at: Optional[float] = None
+        self.last_seen: Optional[float] = None
+        self.snapshot: Dict[str, Any] = {}
+        self.snapshot_time: Optional[float] = None
+        self.incidents: deque = deque(maxlen=HOST_INCIDENTS)
+        self.incident_keys: set = set()
+        self.batches = 0
+        self.items = 0
+        self.bytes = 0
+
+    def add_incidents(self, incidents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Добавляет инциденты, пропуская уже полученные (повтор пачки после обрыва)."""
+        added = []
+        for incident in incidents:
+            key = (incident.get("sourceIp"), incident.get("type"), incident.get("timeStart"), incident.get("status"))
+            if key in self.incident_keys:
+                continue
+            if len(self.incidents) == self.incidents.maxlen:
+                old = self.incidents[0]
+                self.incident_keys.discard((old.get("sourceIp"), old.get("type"), old.get("timeStart"), old.get("status")))
+            incident = dict(incident, host=self.name)
+            self.incidents.append(incident)
+            self.incident_keys.add(key)
+            added.append(incident)
+        return added
+
+    def summary(self, now: float) -> Dict[str, Any]:
+        system = self.snapshot.get("system", {})
+        memory = system.get("memory", {})
+        disk = system.get("disk", {})
+        containers = self.snapshot.get("containers", {}).values()
+        return {
+            "host": self.name,
+            "connected": self.connections > 0,
+            "address": self.address,
+            "lastSeen": self.last_seen,
+            "staleness": round(now - self.last_seen, 1) if self.last_seen else None,
+            "snapshotTime": self.snapshot_time,
+            "cpuPercent": system.get("cpuPercent"),
+            "memoryPercent": percent(memory.get("usage"), memory.get("total")),
+            "diskPercent": percent(disk.get("usage"), disk.get("total")),
+            "containers": {
+                "running": sum(1 for container in containers if container.get("state") == "running"),
+                "total": len(containers),
+            },
+            "activeIncidents": self.snapshot.get("dos", {}).get("activeIncidents", 0),
+            "received": {"batches": self.batches, "items": self.items, "bytes": self.bytes},
+        }
+
+
+class FleetServer:
+    """
+    Приём данных от агентов (см. AgentClient): asyncio TCP-сервер, каждое
+    соединение обслуживается своей сопрограммой, поэтому агенты принимаются
+    параллельно. Разницы снимков применяются к последнему снимку хоста,
+    инциденты складываются в кольцо хоста и передаются в on_incidents
+    (уведомления), значения снимков — в history (ряды host.<имя>.*).
+    """
+
+    def __init__(self, token: str = "", on_incidents: Optional[Callable[[List[Dict[str, Any]]], Awaitable[None]]] = None, history=None):
+        self.token = token
+        self.on_incidents = on_incidents
+        self.history = history
+        self.hosts: Dict[str, FleetHost] = {}
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.connections: Dict[asyncio.Task, asyncio.StreamWriter] = {}  # Обработчик соединения -> его поток записи
+
+    async def start(self, host: str, port: int) -> None:
+        self.server = await asyncio.start_server(self._handle, host, port, limit=LINE_LIMIT)
+
+    async def close(self) -> None:
+        if self.server is not None:
+            self.server.close()
+            # Открытые соединения агентов закрываются явно: обработчики дочитывают и завершаются
+            for writer in self.connections.values():
+                writer.close()
+            await asyncio.gather(*self.connections, return_exceptions=True)
+            await self.server.wait_closed()
+            self.server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        peer = writer.get_extra_info("peername")
+        address = f"{peer[0]}:{peer[1]}" if peer else None
+        host = None
+        self.connections[asyncio.current_task()] = writer
+        try:
+            hello = json.loads(await asyncio.wait_for(reader.readline(), HELLO_TIMEOUT) or b"null")
+            if not isinstance(hello, dict) or hello.get("type") != "hello" or not hello.get("host"):
+                raise ValueError("ожидалось приветствие агента")
+            if hello.get("version") != PROTOCOL_VERSION:
+                raise ValueError(f"неподдерживаемая версия протокола {hello.get('version')}")
+            if self.token and not hmac.compare_digest(str(hello.get("token", "")).encode(), self.token.encode()):
+                writer.write(encode({"type": "error", "message": "неверный токен"}))
+                await writer.drain()
+                logger.warning(f"Агент {hello['host']} ({address}) отклонён: неверный токен")
+                return
+
+            host = self.hosts.get(hello["host"])
+            if host is None:
+                host = self.hosts[hello["host"]] = FleetHost(hello["host"])
+            host.connections += 1
+            host.address = address
+            host.connected_at = host.last_seen = time.time()
+            writer.write(encode({"type": "welcome"}))
+            await writer.drain()
+            logger.info(f"Агент {host.name} подключён ({address})")
+
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                message = json.loads(line)
+                if message.get("type") != "batch":
+                    continue
+                host.batches += 1
+                host.bytes += len(line)
+                host.last_seen = time.time()
+                await self._ingest(host, message["items"])
+                writer.write(encode({"type": "ack", "seq": message["seq"]}))
+                await writer.drain()
+        except (OSError, ValueError, KeyError, TypeError, AttributeError,
+                asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError) as e:
+            # Некорректная пачка (например, data не список инцидентов) — обрываем соединение
+            logger.warning(f"Соединение с агентом {host.name if host else address} прервано: {e}")
+        finally:
+            if host is not None:
+                host.connections -= 1
+                logger.info(f"Агент {host.name} отключён")
+            self.connections.pop(asyncio.current_task(), None)
+            writer.close()
+
+    async def _ingest(self, host: FleetHost, items: List[Dict[str, Any]]) -> None:
+        incidents = []
+        for item in items:
+            host.items += 1
+            if item["kind"] == "snapshot":
+                if item.get("full"):
+                    host.snapshot = {}
+                apply(host.snapshot, item.get("set", {}), item.get("unset", []))
+                host.snapshot_time = item["time"]
+                self._record(host, item["time"])
+            elif item["kind"] == "incidents":
+                incidents.extend(host.add_incidents(item["data"]))
+        if incidents and self.on_incidents is not None:
+            try:
+                await self.on_incidents(incidents)
+            except Exception as e:
+                logger.error(f"Ошибка при отправке уведомления об инцидентах {host.name}: {e}")
+
+    def _record(self, host: FleetHost, timestamp: float) -> None:
+        if self.history is None:
+            return
+        summary = host.summary(timestamp)
+        self.history.record(timestamp, {
+            f"host.{host.name}.cpu": summary["cpuPercent"],
+            f"host.{host.name}.memory": summary["memoryPercent"],
+            f"host.{host.name}.disk": summary["diskPercent"],
+        })
+
+    def hosts_view(self) -> Dict[str, Any]:
+        """Сводка по всем хостам и итоги по парку."""
+        now = time.time()
+        hosts = [host.summary(now) for host in sorted(self.hosts.values(), key=lambda host: host.name)]
+        return {
+            "hosts": hosts,
+            "totals": {
+                "hosts": len(hosts),
+                "connected": sum(1 for host in hosts if host["connected"]),
+                "containersRunning": sum(host["containers"]["running"] for host in hosts),
+                "activeIncidents": sum(host["activeIncidents"] for host in hosts),
+            },
+        }
+
+    def host_view(self, name: str) -> Optional[Dict[str, Any]]:
+        """Последний снимок хоста целиком и его последние инциденты."""
+        host = self.hosts.get(name)
+        if host is None:
+            return None
+        snapshot = dict(host.snapshot)
+        snapshot["containers"] = list(host.snapshot.get("containers", {}).values())
+        return dict(host.summary(time.time()), snapshot=snapshot, incidents=list(host.incidents))
+
+    def incidents_view(self, host: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Последние инциденты всего парка (или одного хоста), новые первыми."""
+        hosts = [self.hosts[host]] if host in self.hosts else ([] if host else self.hosts.values())
+        incidents = [incident for fleet_host in hosts for incident in fleet_host.incidents]
+        incidents.sort(key=lambda incident: incident.get("timeStart", 0), reverse=True)
+        return incidents[:limit]
+
+
+# Приём данных от агентов: инциденты уходят в общего бота, метрики — в общую историю
+fleet = FleetServer(settings.fleet_token, notify_dos_attack, metrics_history)
+
+async def serve_fleet() -> None:
+    """
+    Принимает подключения агентов на FLEET_LISTEN_PORT, пока не отменён.
+    Без fleet_token приём из сети не запускается: любой, кто достучится до
+    порта, мог бы зарегистрировать хост под чужим именем и слать инциденты в бота.
+    """
+    if not settings.fleet_token and not is_loopback(FLEET_LISTEN_HOST):
+        logger.error(
+            f"Приём данных от агентов на {FLEET_LISTEN_HOST}:{FLEET_LISTEN_PORT} не запущен: "
+            f"задайте fleet_token или слушайте только 127.0.0.1"
+        )
+        return
+    try:
+        await fleet.start(FLEET_LISTEN_HOST, FLEET_LISTEN_PORT)
+        logger.info(f"Приём данных от агентов на {FLEET_LISTEN_HOST}:{FLEET_LISTEN_PORT}")
+        await fleet.server.serve_forever()
+    except asyncio.CancelledError:
+        logger.info("Приём данных от агентов остановлен")
+    finally:
+        await fleet.close()
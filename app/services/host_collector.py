@@ -0,0 +1,141 @@
+# app/services/host_collector.py
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+
+MB = 1024 * 1024
+
+
+def resolve_proc_root(path: str) -> str:
+    """procfs хоста (смонтирован в /host/proc), а если его нет — собственный /proc."""
+    return path if os.path.isdir(path) else "/proc"
+
+
+PROC_ROOT = resolve_proc_root(settings.host_proc_path)  # Каталог procfs, из которого читаются метрики
+
+
+class ProcFile:
+    """
+    Файл procfs, открытый один раз. read() перечитывает его целиком через
+    pread с нулевого смещения: ядро заново формирует содержимое, а открытие
+    файла и выделение нового буфера в каждом цикле не нужны.
+    """
+
+    __slots__ = ("path", "fd", "size")
+
+    def __init__(self, path: str, size: int = 4096):
+        self.path = path
+        self.fd = os.open(path, os.O_RDONLY)
+        self.size = size
+
+    def read(self) -> bytes:
+        while True:
+            data = os.pread(self.fd, self.size, 0)
+            if len(data) < self.size:
+                return data
+            # Содержимое не поместилось — увеличиваем буфер и читаем заново
+            self.size *= 2
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def cpu_times(fields: List[bytes]) -> Tuple[int, int]:
+    """(всего, простой) из строки cpu в /proc/stat; guest уже входит в user."""
+    values = [int(value) for value in fields[1:9]]
+    idle = values[3] + values[4]  # idle + iowait
+    return sum(values), idle
+
+
+def cpu_percent(current: Tuple[int, int], previous: Tuple[int, int]) -> float:
+    total = current[0] - previous[0]
+    idle = current[1] - previous[1]
+    if total <= 0:
+        return 0.0
+    return round((total - idle) / total * 100, 1)
+
+
+class HostCollector:
+    """
+    Системные метрики хоста из procfs без psutil: stat, meminfo, loadavg и uptime.
+    CPU% считается по разнице счётчиков между вызовами collect, без ожидания;
+    первый вызов возвращает среднюю загрузку с момента загрузки системы.
+    """
+
+    def __init__(self, proc_root: str = PROC_ROOT):
+        self.proc_root = proc_root
+        self.stat = ProcFile(f"{proc_root}/stat", 16384)
+        self.meminfo = ProcFile(f"{proc_root}/meminfo", 8192)
+        self.loadavg = ProcFile(f"{proc_root}/loadavg", 256)
+        self.uptime = ProcFile(f"{proc_root}/uptime", 256)
+        self.previous: Dict[bytes, Tuple[int, int]] = {}
+
+    def read_cpu(self) -> Tuple[float, List[float]]:
+        total_percent = 0.0
+        cores = []
+        for line in self.stat.read().split(b"\n"):
+            if not line.startswith(b"cpu"):
+                break  # Строки cpu идут в начале файла
+            fields = line.split()
+            name = fields[0]
+            current = cpu_times(fields)
+            percent = cpu_percent(current, self.previous.get(name, (0, 0)))
+            self.previous[name] = current
+            if name == b"cpu":
+                total_percent = percent
+            else:
+                cores.append(percent)
+        return total_percent, cores
+
+    def read_memory(self) -> Dict[str, float]:
+        values: Dict[bytes, int] = {}
+        for line in self.meminfo.read().split(b"\n"):
+            key, _, rest = line.partition(b":")
+            if rest:
+                values[key] = int(rest.split()[0]) * 1024
+        total = values.get(b"MemTotal", 0)
+        available = values.get(b"MemAvailable", values.get(b"MemFree", 0))
+        cached = values.get(b"Cached", 0) + values.get(b"SReclaimable", 0)
+        return {
+            "usage": round((total - available) / MB, 2),
+            "total": round(total / MB, 2),
+            "available": round(available / MB, 2),
+            "free": round(values.get(b"MemFree", 0) / MB, 2),
+            "cached": round(cached / MB, 2),
+            "buffers": round(values.get(b"Buffers", 0) / MB, 2),
+            "swapUsage": round((values.get(b"SwapTotal", 0) - values.get(b"SwapFree", 0)) / MB, 2),
+            "swapTotal": round(values.get(b"SwapTotal", 0) / MB, 2),
+        }
+
+    def read_loadavg(self) -> Dict[str, float]:
+        one, five, fifteen = self.loadavg.read().split()[:3]
+        return {"1m": float(one), "5m": float(five), "15m": float(fifteen)}
+
+    def read_uptime(self) -> float:
+        return float(self.uptime.read().split()[0])
+
+    def collect(self) -> Dict[str, Any]:
+        cpu, cores = self.read_cpu()
+        return {
+            "cpuPercent": cpu,
+            "cpuCores": cores,
+            "loadAverage": self.read_loadavg(),
+            "memory": self.read_memory(),
+            "uptime": self.read_uptime(),
+        }
+
+    def close(self) -> None:
+        for file in (self.stat, self.meminfo, self.loadavg, self.uptime):
+            file.close()
+
+
+_collector: Optional[HostCollector] = None
+
+
+def get_host_collector() -> HostCollector:
+    """Общий экземпляр: состояние CPU между циклами хранится в нём."""
+    global _collector
+    if _collector is None:
+        _collector = HostCollector()
+    return _collector
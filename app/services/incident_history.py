@@ -0,0 +1,32 @@
+# app/services/incident_history.py
+import asyncio
+
+from app.config import settings
+from app.utils import logger
+from app.utils.data_handler import compact_dos_data
+
+# Конфигурация
+DAY = 86400
+RETENTION_MAX_AGE = settings.incident_retention_days * DAY or None  # Максимальный возраст отдельных инцидентов (сек)
+RETENTION_MAX_ROWS = settings.incident_retention_max_rows or None  # Максимум отдельных инцидентов
+RETENTION_MAX_BYTES = settings.incident_retention_max_mb * 1024 * 1024 or None  # Предел занятого места в базе (байт)
+HOURLY_ROLLUP_MAX_AGE = settings.incident_hourly_rollup_days * DAY or None  # Возраст почасовых сводок (сек)
+COMPACTION_INTERVAL = settings.incident_compaction_interval  # Интервал обслуживания истории (сек)
+
+async def compact_incident_history() -> None:
+    """
+    Фоновое обслуживание истории инцидентов: пополняет почасовые и посуточные
+    сводки и удаляет отдельные инциденты по политике хранения.
+    """
+    logger.info("Обслуживание истории инцидентов запущено")
+    try:
+        while True:
+            try:
+                rolled_up, deleted = await compact_dos_data(RETENTION_MAX_AGE, RETENTION_MAX_ROWS, HOURLY_ROLLUP_MAX_AGE, RETENTION_MAX_BYTES)
+                if rolled_up or deleted:
+                    logger.info(f"История инцидентов: добавлено в сводки {rolled_up}, удалено по сроку хранения {deleted}")
+            except Exception as e:
+                logger.error(f"Ошибка при обслуживании истории инцидентов: {e}")
+            await asyncio.sleep(COMPACTION_INTERVAL)
+    except asyncio.CancelledError:
+        logger.info("Обслуживание истории инцидентов остановлено")
@@ -0,0 +1,105 @@
+# app/services/incident_table.py
+import heapq
+import itertools
+from typing import Any, Dict, List, Optional, Tuple
+
+# Ключ инцидента: (sourceIp, type)
+IncidentKey = Tuple[str, str]
+
+
+class Incident:
+    """Запись активного инцидента. Поля совпадают с ключами сохраняемого словаря."""
+
+    __slots__ = (
+        "sourceIp", "timeStart", "timeLastPacket", "notification", "status",
+        "type", "count", "rate", "peakRate", "countError",
+    )
+
+    def __init__(self, source_ip: str, attack_type: str, time_start: float, count: int, rate: float, count_error: int = 0):
+        self.sourceIp = source_ip
+        self.timeStart = time_start
+        self.timeLastPacket = time_start
+        self.notification = False
+        self.status = True
+        self.type = attack_type
+        self.count = count
+        self.rate = rate
+        self.peakRate = rate
+        self.countError = count_error
+
+    def as_dict(self) -> Dict[str, Any]:
+        data = {
+            "sourceIp": self.sourceIp,
+            "timeStart": self.timeStart,
+            "timeLastPacket": self.timeLastPacket,
+            "notification": self.notification,
+            "status": self.status,
+            "type": self.type,
+            "count": self.count,
+            "rate": self.rate,
+            "peakRate": self.peakRate,
+        }
+        # В режиме скетчей счётчик — оценка сверху, сохраняем её погрешность
+        if self.countError:
+            data["countError"] = self.countError
+        return data
+
+    def __repr__(self) -> str:
+        return repr(self.as_dict())
+
+
+class IncidentTable:
+    """
+    Активные инциденты в словаре по ключу (sourceIp, type) и куча сроков истечения.
+
+    Продление инцидента новым пакетом кучу не трогает: когда запись всплывает
+    на вершину, проверяется фактический timeLastPacket и при необходимости
+    она перекладывается с новым сроком. Поэтому каждый тик обрабатывает
+    только истёкшие инциденты и новые, ещё не отправленные в уведомлении.
+    """
+
+    def __init__(self, expiry_time: float):
+        self.expiry_time = expiry_time
+        self.active: Dict[IncidentKey, Incident] = {}
+        self.heap: List[Tuple[float, int, IncidentKey]] = []
+        self.pending: List[Incident] = []
+        self.sequence = itertools.count()
+
+    def get(self, source_ip: str, attack_type: str) -> Optional[Incident]:
+        return self.active.get((source_ip, attack_type))
+
+    def add(self, incident: Incident) -> None:
+        key = (incident.sourceIp, incident.type)
+        self.active[key] = incident
+        self.pending.append(incident)
+        heapq.heappush(self.heap, (incident.timeLastPacket + self.expiry_time, next(self.sequence), key))
+
+    def pop_expired(self, now: float) -> List[Incident]:
+        """Снимает инциденты, у которых с последнего пакета прошло expiry_time."""
+        expired = []
+        heap = self.heap
+        while heap and heap[0][0] <= now:
+            _, _, key = heapq.heappop(heap)
+            incident = self.active.get(key)
+            if incident is None:
+                continue
+            deadline = incident.timeLastPacket + self.expiry_time
+            if deadline > now:
+                # Инцидент продлевался — переносим срок
+                heapq.heappush(heap, (deadline, next(self.sequence), key))
+                continue
+            del self.active[key]
+            expired.append(incident)
+        return expired
+
+    def pop_pending(self) -> List[Incident]:
+        """Возвращает новые инциденты, о которых ещё не уведомляли."""
+        pending = self.pending
+        self.pending = []
+        return pending
+
+    def __len__(self) -> int:
+        return len(self.active)
+
+    def __iter__(self):
+        return iter(list(self.active.values()))
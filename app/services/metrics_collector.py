@@ -1,27 +1,64 @@
 import asyncio
-import os
+import functools
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
 import logging
 import docker
-import psutil
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 from ..config.settings import settings
 from app.bot import notify_ram_usage, notify_cpu_usage, notify_storage_usage, notify_container_stopped
 from ..utils import logger
+from ..utils.timeseries import MetricHistory
+from .docker_stream import DockerStreams
+from .container_rates import ContainerRates
+from .host_collector import get_host_collector
+from .process_collector import get_process_collector
+from .disk_collector import get_disk_collector
+from .net_collector import get_network_collector
+from .scheduler import CollectorScheduler, ScheduledCollector
 
-# Интервал анализа (в секундах)
+# Интервал анализа: проверка порогов и запись истории по последним данным сборщиков (в секундах)
 ANALYSIS_INTERVAL = 10
+STATS_WORKERS = settings.docker_stats_workers  # Сколько контейнеров опрашивается одновременно
+STATS_TIMEOUT = settings.docker_stats_timeout  # Ожидание статистики одного контейнера (сек)
+COLLECTION_MODE = settings.docker_collection_mode  # poll или stream
+NETWORK_RATE_KEYS = ("rxBytesPerSec", "txBytesPerSec", "rxPacketsPerSec", "txPacketsPerSec")
+BLOCK_IO_RATE_KEYS = ("readBytesPerSec", "writeBytesPerSec")
 
-# Создаем клиент Docker
-client = docker.from_env()
+# Клиент Docker (пул соединений по числу потоков опроса) создаётся при первом сборе,
+# чтобы модуль импортировался без демона Docker (офлайн-прогон replay)
+client: Optional[docker.DockerClient] = None
 
-# Глобальные переменные для хранения актуальных метрик
-latest_system_metrics: Dict[str, Any] = {}
-latest_docker_metrics: List[Dict[str, Any]] = []
+def get_docker_client() -> docker.DockerClient:
+    global client
+    if client is None:
+        client = docker.from_env(max_pool_size=STATS_WORKERS)
+    return client
+
+# Вызовы docker-py блокирующие, поэтому выполняются в отдельном пуле потоков
+docker_pool = ThreadPoolExecutor(max_workers=STATS_WORKERS, thread_name_prefix="docker-stats")
+
+# Запросы статистики, ещё занимающие поток пула (id контейнера -> Future), и последние
+# полученные метрики: пока контейнер не ответил, новый запрос к нему не ставится,
+# а в ответе остаются прежние метрики с пометкой stale
+stats_in_flight: Dict[str, Future] = {}
+last_container_metrics: Dict[str, Dict[str, Any]] = {}
 
 # Список для отслеживания остановленных контейнеров
 stopped_notify: List[str] = []
+notifications_enabled = True  # Режим агента выключает уведомления: пороги проверяет центральный сервер
+
+# История системных метрик и метрик контейнеров (кольцевые буферы с уровнями 10 сек / 1 мин / 10 мин)
+metrics_history = MetricHistory(settings.metrics_history_dir or None, settings.metrics_history_max_series)
+SYSTEM_SERIES = ("cpu", "memory", "disk")  # Ряды, которые /server/metrics/history отдаёт по умолчанию
+
+# Предыдущие образцы контейнеров для расчёта CPU% и скоростей
+container_rates = ContainerRates()
+
+# Потоковые подписки (режим stream), создаются при запуске analyze_metrics
+docker_streams: Optional[DockerStreams] = None
+refresh_tasks = set()  # Обновления по событиям Docker: ссылки держим, пока задачи не завершатся
 
 def format_uptime(seconds: float) -> str:
     """Форматирует аптайм в стиль 'Up X hours' или 'Up X minutes'."""
@@ -38,77 +75,245 @@ def format_uptime(seconds: float) -> str:
         return f"Up {minutes} minutes"
     return f"Up {delta.seconds} seconds"
 
+def build_container_metrics(container_id: str, container_name: str, container_state: str, state: Dict[str, Any], stats: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Формирует метрики контейнера из раздела State ответа inspect и образца статистики.
+    Общая часть для опроса и для потоковых подписок.
+    """
+    status = state.get("Status", "").capitalize()
+
+    uptime = None
+    if status.lower() == "running":
+        started_at = state.get("StartedAt")
+        if started_at:
+            try:
+                start_time = datetime.strptime(started_at[:19], "%Y-%m-%dT%H:%M:%S")
+                uptime = (datetime.utcnow() - start_time).total_seconds()
+            except ValueError as e:
+                logger.error(f"Ошибка при парсинге времени запуска для контейнера {container_name}: {e}")
+
+    rates = {}
+    if container_state == "running" and stats:
+        rates = container_rates.update(container_id, stats)
+        cpu_percent = rates["cpuPercent"]
+        memory_stats = stats.get("memory_stats", {})
+        memory_usage = memory_stats.get("usage", 0) / (1024 * 1024)
+        memory_limit = memory_stats.get("limit", 0) / (1024 * 1024)
+        network_stats = stats.get("networks", {})
+    else:
+        cpu_percent = 0.0
+        memory_usage = 0.0
+        memory_limit = 0.0
+        network_stats = {}
+
+    network_metrics = {}
+    for interface, metrics in network_stats.items():
+        network_metrics[interface] = {
+            "rx_bytes": metrics.get("rx_bytes", 0),
+            "rx_packets": metrics.get("rx_packets", 0),
+            "rx_errors": metrics.get("rx_errors", 0),
+            "rx_dropped": metrics.get("rx_dropped", 0),
+            "tx_bytes": metrics.get("tx_bytes", 0),
+            "tx_packets": metrics.get("tx_packets", 0),
+            "tx_errors": metrics.get("tx_errors", 0),
+            "tx_dropped": metrics.get("tx_dropped", 0),
+        }
+
+    return {
+        "id": container_id,
+        "name": container_name,
+        "state": container_state,
+        "uptime": format_uptime(uptime),
+        "cpuPercent": cpu_percent,
+        "memory": {
+            "usage": round(memory_usage, 2),
+            "limit": round(memory_limit, 2),
+        },
+        "network": network_metrics,
+        # Скорости за интервал между образцами (нули для первого образца и после перезапуска)
+        "networkRates": rates.get("network", dict.fromkeys(NETWORK_RATE_KEYS, 0.0)),
+        "blockIO": rates.get("blockIO", dict.fromkeys(BLOCK_IO_RATE_KEYS, 0.0)),
+        "stale": False,  # True — Docker не ответил вовремя, метрики от прошлого сбора (или нулевые)
+    }
+
+def container_name(container) -> str:
+    """Имя контейнера: после reload — из inspect, до него — из краткого списка (sparse)."""
+    return container.name or (container.attrs.get("Names") or [container.id[:12]])[0].lstrip("/")
+
+def stale_container_metrics(container) -> Dict[str, Any]:
+    """Метрики контейнера, не ответившего за STATS_TIMEOUT: прошлые, а если их нет — без статистики."""
+    metrics = last_container_metrics.get(container.id)
+    if metrics is None:
+        metrics = build_container_metrics(container.id, container_name(container), container.status, {"Status": container.status}, None)
+    return dict(metrics, stale=True)
+
+def collect_container(container) -> Dict[str, Any]:
+    """
+    Метрики одного контейнера. Блокирующая функция: выполняется в docker_pool.
+    """
+    # Список контейнеров запрошен без inspect (sparse), подробности загружаем здесь, параллельно
+    container.reload()
+    stats = container.stats(stream=False) if container.status == "running" else None
+    return build_container_metrics(container.id, container.name, container.status, container.attrs.get("State", {}), stats)
+
 async def get_container_metrics() -> List[Dict[str, Any]]:
     """
     Собирает метрики Docker-контейнеров.
     Возвращает список контейнеров с их метриками.
+
+    Статистика контейнеров запрашивается параллельно в docker_pool из
+    STATS_WORKERS потоков. Каждому запущенному контейнеру нужны reload и
+    stats(stream=False), поэтому при N контейнерах цикл сбора занимает
+    около ceil(N / STATS_WORKERS) ответов Docker подряд, но не больше
+    STATS_TIMEOUT: не успевшие контейнеры отдаются с прошлыми метриками и
+    stale=True. Цикл asyncio (API и бот) всё это время свободен.
     """
-    containers_metrics = []
+    loop = asyncio.get_running_loop()
     try:
-        containers = client.containers.list(all=True)
-        for container in containers:
-            container_info = container.attrs
-            container_id = container.id
-            container_name = container.name
-            container_state = container.status
-            state = container_info.get("State", {})
-            status = state.get("Status", "").capitalize()
-
-            uptime = None
-            if status.lower() == "running":
-                started_at = state.get("StartedAt")
-                if started_at:
-                    try:
-                        start_time = datetime.strptime(started_at[:19], "%Y-%m-%dT%H:%M:%S")
-                        uptime = (datetime.utcnow() - start_time).total_seconds()
-                    except ValueError as e:
-                        logger.error(f"Ошибка при парсинге времени запуска для контейнера {container_name}: {e}")
-
-            if container_state == "running":
-                stats = container.stats(stream=False)
-                cpu_stats = stats.get("cpu_stats", {})
-                cpu_usage = cpu_stats.get("cpu_usage", {})
-                cpu_percent = round(cpu_usage.get("total_usage", 0) / 10 ** 9, 2)
-                memory_stats = stats.get("memory_stats", {})
-                memory_usage = memory_stats.get("usage", 0) / (1024 * 1024)
-                memory_limit = memory_stats.get("limit", 0) / (1024 * 1024)
-                network_stats = stats.get("networks", {})
-            else:
-                cpu_percent = 0.0
-                memory_usage = 0.0
-                memory_limit = 0.0
-                network_stats = {}
-
-            network_metrics = {}
-            for interface, metrics in network_stats.items():
-                network_metrics[interface] = {
-                    "rx_bytes": metrics.get("rx_bytes", 0),
-                    "rx_packets": metrics.get("rx_packets", 0),
-                    "rx_errors": metrics.get("rx_errors", 0),
-                    "rx_dropped": metrics.get("rx_dropped", 0),
-                    "tx_bytes": metrics.get("tx_bytes", 0),
-                    "tx_packets": metrics.get("tx_packets", 0),
-                    "tx_errors": metrics.get("tx_errors", 0),
-                    "tx_dropped": metrics.get("tx_dropped", 0),
-                }
-
-            container_metrics = {
-                "id": container_id,
-                "name": container_name,
-                "state": container_state,
-                "uptime": format_uptime(uptime),
-                "cpuPercent": cpu_percent,
-                "memory": {
-                    "usage": round(memory_usage, 2),
-                    "limit": round(memory_limit, 2),
-                },
-                "network": network_metrics,
-            }
-            containers_metrics.append(container_metrics)
+        containers = await loop.run_in_executor(docker_pool, lambda: get_docker_client().containers.list(all=True, sparse=True))
     except Exception as e:
         logger.error(f"Ошибка при сборе метрик контейнеров: {e}")
+        return []
+
+    def finished(container_id, future):
+        if stats_in_flight.get(container_id) is future:
+            del stats_in_flight[container_id]
+
+    async def collect(container):
+        # Поток пула после таймаута не прерывается: пока прежний запрос не завершён,
+        # новый к этому контейнеру не ставится, чтобы медленный Docker не занял весь пул
+        future = stats_in_flight.get(container.id)
+        if future is None:
+            future = stats_in_flight[container.id] = docker_pool.submit(collect_container, container)
+            future.add_done_callback(functools.partial(finished, container.id))
+        try:
+            metrics = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), STATS_TIMEOUT)
+            last_container_metrics[container.id] = metrics
+            return metrics
+        except asyncio.TimeoutError:
+            logger.error(f"Контейнер {container_name(container)} не ответил за {STATS_TIMEOUT} сек, метрики устарели")
+        except Exception as e:
+            logger.error(f"Ошибка при сборе метрик контейнера {container_name(container)}: {e}")
+        return stale_container_metrics(container)
+
+    containers_metrics = await asyncio.gather(*(collect(container) for container in containers))
+    ids = {container.id for container in containers}
+    for container_id in [container_id for container_id in last_container_metrics if container_id not in ids]:
+        del last_container_metrics[container_id]
+    container_rates.prune(container.id for container in containers if container.status == "running")
+    return list(containers_metrics)
+
+def get_streamed_container_metrics() -> List[Dict[str, Any]]:
+    """
+    Метрики контейнеров из потоковых подписок: без обращений к Docker,
+    по последним полученным образцам.
+    """
+    records = docker_streams.records_snapshot()
+    containers_metrics = [
+        build_container_metrics(record.id, record.name, record.status, record.state, record.stats)
+        for record in records
+    ]
+    container_rates.prune(record.id for record in records if record.status == "running")
     return containers_metrics
 
+def start_docker_streams() -> None:
+    """
+    Запускает подписки на статистику и события Docker. Смена состояния
+    контейнера сразу запускает сборщик containers (снимок и проверку
+    остановленных контейнеров) в цикле asyncio, не дожидаясь его расписания.
+    """
+    global docker_streams
+    loop = asyncio.get_running_loop()
+
+    def schedule_refresh():
+        task = asyncio.create_task(refresh_docker_metrics())
+        refresh_tasks.add(task)
+        task.add_done_callback(refresh_tasks.discard)
+
+    def on_change(record):
+        loop.call_soon_threadsafe(schedule_refresh)
+
+    # Отдельный клиент: каждая подписка держит своё соединение
+    docker_streams = DockerStreams(docker.from_env(max_pool_size=256), on_change)
+    docker_streams.start()
+    logger.info("Метрики контейнеров собираются по подпискам Docker (режим stream)")
+
+async def refresh_docker_metrics() -> None:
+    await scheduler.refresh("containers")
+
+async def check_stopped_containers(docker_metrics: List[Dict[str, Any]]) -> None:
+    """Уведомляет об остановленных контейнерах (один раз до следующего запуска)."""
+    if not settings.notifications.container_stopped or not notifications_enabled:
+        return
+    for container in docker_metrics:
+        if container["state"] == "exited" and container["id"] not in stopped_notify:
+            # Отмечаем до отправки: проверка может выполняться параллельно из события и цикла
+            stopped_notify.append(container["id"])
+            await notify_container_stopped(container["name"])
+        elif container["state"] == "running" and container["id"] in stopped_notify:
+            stopped_notify.remove(container["id"])
+
+def record_history(system_metrics: Dict[str, Any], docker_metrics: List[Dict[str, Any]], timestamp: float) -> None:
+    """Добавляет значения цикла в историю метрик (проценты для системы, скорости для контейнеров)."""
+    values = {}
+    if system_metrics:
+        memory = system_metrics.get("memory", {})
+        disk = system_metrics.get("disk", {})
+        values["cpu"] = system_metrics.get("cpuPercent")
+        values["memory"] = memory.get("usage", 0) / memory["total"] * 100 if memory.get("total") else None
+        values["disk"] = disk.get("usage", 0) / disk["total"] * 100 if disk.get("total") else None
+        for device, io in system_metrics.get("diskIO", {}).items():
+            values[f"disk.{device}.util"] = io["utilPercent"]
+        for interface, rates in system_metrics.get("network", {}).get("interfaces", {}).items():
+            # veth контейнеров уже учтены в рядах контейнеров
+            if interface == "lo" or interface.startswith("veth"):
+                continue
+            values[f"net.{interface}.rx"] = rates["rxBytesPerSec"]
+            values[f"net.{interface}.tx"] = rates["txBytesPerSec"]
+    for container in docker_metrics:
+        if container["state"] != "running":
+            continue
+        prefix = f"container.{container['name']}"
+        values[f"{prefix}.cpu"] = container["cpuPercent"]
+        values[f"{prefix}.memory"] = container["memory"]["usage"]
+        values[f"{prefix}.rx"] = container["networkRates"]["rxBytesPerSec"]
+        values[f"{prefix}.tx"] = container["networkRates"]["txBytesPerSec"]
+    metrics_history.record(timestamp, values)
+
+def get_metrics_history(series: Optional[List[str]], since: float, until: float, step: Optional[int] = None) -> Dict[str, Any]:
+    """История выбранных рядов за интервал и список всех доступных рядов."""
+    available = metrics_history.names()
+    return {
+        "available": available,
+        "series": metrics_history.query(series or SYSTEM_SERIES, since, until, step),
+    }
+
+def flush_metrics_history() -> None:
+    """Сбрасывает отображённые в файлы буферы истории на диск (при завершении приложения)."""
+    try:
+        metrics_history.flush()
+    except Exception as e:
+        logger.error(f"Ошибка при сохранении истории метрик: {e}")
+
+async def get_host_metrics() -> Dict[str, Any]:
+    """
+    CPU, память, load average и аптайм хоста из procfs (без ожидания, по разнице
+    с прошлым сбором). Заполнение корневого диска собирает get_disk_metrics.
+    """
+    return get_host_collector().collect()
+
+async def get_disk_metrics() -> Dict[str, Any]:
+    """
+    Заполнение корневого диска и каждой точки монтирования и нагрузка на диски
+    (statvfs может зависнуть на сетевой ФС, поэтому в отдельном потоке).
+    """
+    mounts, disk_io, disk = await asyncio.to_thread(get_disk_collector().collect)
+    return {"disk": disk, "mounts": mounts, "diskIO": disk_io}
+
+async def get_network_metrics() -> Dict[str, Any]:
+    """Скорости интерфейсов и счётчики TCP хоста (очереди SYN и accept)."""
+    return get_network_collector().collect()
+
 async def get_system_metrics() -> Dict[str, Any]:
     """
     Собирает системные метрики (CPU, память, диск и т.д.).
@@ -116,74 +321,89 @@ async def get_system_metrics() -> Dict[str, Any]:
     """
     sys_metrics = {}
     try:
-        cpu_percent = psutil.cpu_percent(interval=0.1)
-        memory = psutil.virtual_memory()
-        memory_usage = memory.used / (1024 * 1024)
-        memory_total = memory.total / (1024 * 1024)
-        disk_path = "/host" if os.path.exists("/host") else "/"
-        disk = psutil.disk_usage(disk_path)
-        disk_usage = disk.used / (1024 * 1024)
-        disk_total = disk.total / (1024 * 1024)
-        uptime = (datetime.now().timestamp() - psutil.boot_time())
-
-        sys_metrics = {
-            "cpuPercent": cpu_percent,
-            "memory": {
-                "usage": round(memory_usage, 2),
-                "total": round(memory_total, 2),
-            },
-            "disk": {
-                "usage": round(disk_usage, 2),
-                "total": round(disk_total, 2),
-            },
-            "uptime": uptime,
-        }
+        sys_metrics = await get_host_metrics()
+        sys_metrics.update(await get_disk_metrics())
+        sys_metrics["network"] = await get_network_metrics()
     except Exception as e:
         logger.error(f"Ошибка при сборе системных метрик: {e}")
     return sys_metrics
 
+async def get_top_processes() -> Dict[str, Any]:
+    """
+    Сканирует процессы хоста в отдельном потоке и возвращает топ по CPU и по памяти.
+    """
+    return await asyncio.to_thread(get_process_collector().scan)
+
+async def collect_containers() -> List[Dict[str, Any]]:
+    """Метрики контейнеров: из подписок в режиме stream, иначе опросом Docker."""
+    if docker_streams is not None:
+        return get_streamed_container_metrics()
+    return await get_container_metrics()
+
+def scheduled(name: str, collect, on_result=None) -> ScheduledCollector:
+    """Сборщик с расписанием из settings.collectors."""
+    config = getattr(settings.collectors, name)
+    return ScheduledCollector(name, collect, config.interval, config.timeout, config.jitter, config.overrun, on_result)
+
+# Сборщики работают параллельно, каждый по своему расписанию
+scheduler = CollectorScheduler()
+scheduler.add(scheduled("system", get_host_metrics))
+scheduler.add(scheduled("containers", collect_containers, check_stopped_containers))
+scheduler.add(scheduled("disks", get_disk_metrics))
+scheduler.add(scheduled("network", get_network_metrics))
+scheduler.add(scheduled("processes", get_top_processes))
+
+SYSTEM_COLLECTORS = ("system", "disks", "network")  # Из них складывается снимок /server/metrics
+
+async def refresh_metrics(names, max_age: float) -> None:
+    """
+    Обновляет данные сборщиков, если они старше max_age секунд
+    (для клиентов, которым нужны данные свежее закэшированных).
+    """
+    await asyncio.gather(*(scheduler.refresh(name, max_age) for name in names))
+
 async def analyze_metrics() -> None:
     """
-    Запускает анализ метрик и обновляет глобальные переменные.
+    Запускает сборщики метрик и раз в ANALYSIS_INTERVAL проверяет пороговые
+    значения и пополняет историю по последним собранным данным.
     """
-    global latest_system_metrics, latest_docker_metrics, stopped_notify
     logger.info("Анализ метрик запущен")
-    while True:
-        try:
-            # Собираем метрики
-            docker_metrics = await get_container_metrics()
-            system_metrics = await get_system_metrics()
-
-            # Обновляем глобальные переменные
-            latest_docker_metrics = docker_metrics
-            latest_system_metrics = system_metrics
-
-            # Проверяем пороговые значения и отправляем уведомления
-            cpu_percent = system_metrics.get("cpuPercent", 0)
-            memory_usage = system_metrics.get("memory", {}).get("usage", 0)
-            memory_total = system_metrics.get("memory", {}).get("total", 1)
-            disk_usage = system_metrics.get("disk", {}).get("usage", 0)
-            disk_total = system_metrics.get("disk", {}).get("total", 1)
-
-            if cpu_percent >= settings.notifications.cpu.percent:
-                await notify_cpu_usage(cpu_percent)
-            if memory_usage / memory_total * 100 >= settings.notifications.ram.percent:
-                await notify_ram_usage(memory_usage / memory_total * 100)
-            if disk_usage / disk_total * 100 >= settings.notifications.storage.percent:
-                await notify_storage_usage(disk_usage / disk_total * 100)
-
-            # Проверяем остановленные контейнеры
-            if settings.notifications.container_stopped:
-                for container in docker_metrics:
-                    if container["state"] == "exited" and container["id"] not in stopped_notify:
-                        await notify_container_stopped(container["name"])
-                        stopped_notify.append(container["id"])
-                    elif container["state"] == "running" and container["id"] in stopped_notify:
-                        stopped_notify.remove(container["id"])
+    if COLLECTION_MODE == "stream":
+        start_docker_streams()
+    scheduler_task = asyncio.create_task(scheduler.run())
+    try:
+        while True:
+            await asyncio.sleep(ANALYSIS_INTERVAL)
+            try:
+                system_metrics = get_latest_system_metrics_sync()
+                processes = get_latest_processes_sync()
+                record_history(system_metrics, get_latest_docker_metrics_sync(), datetime.now().timestamp())
+                if not notifications_enabled:
+                    continue
 
-        except Exception as e:
-            logger.error(f"Ошибка в analyze_metrics: {e}")
-        await asyncio.sleep(ANALYSIS_INTERVAL)
+                # Проверяем пороговые значения и отправляем уведомления
+                cpu_percent = system_metrics.get("cpuPercent", 0)
+                memory_usage = system_metrics.get("memory", {}).get("usage", 0)
+                memory_total = system_metrics.get("memory", {}).get("total", 1)
+                disk_usage = system_metrics.get("disk", {}).get("usage", 0)
+                disk_total = system_metrics.get("disk", {}).get("total", 1)
+
+                if cpu_percent >= settings.notifications.cpu.percent:
+                    await notify_cpu_usage(cpu_percent, processes.get("byCpu"))
+                if memory_usage / memory_total * 100 >= settings.notifications.ram.percent:
+                    await notify_ram_usage(memory_usage / memory_total * 100, processes.get("byMemory"))
+                mounts = system_metrics.get("mounts")
+                if mounts:
+                    # Каждая точка монтирования сверяется со своим порогом (или общим)
+                    for mount in mounts:
+                        await notify_storage_usage(mount["percent"], mount["mountpoint"])
+                elif disk_usage / disk_total * 100 >= settings.notifications.storage.percent:
+                    await notify_storage_usage(disk_usage / disk_total * 100)
+
+            except Exception as e:
+                logger.error(f"Ошибка в analyze_metrics: {e}")
+    finally:
+        scheduler_task.cancel()
 
 def start_metrics_collection():
     """Запускает сбор метрик в фоновом режиме."""
@@ -193,12 +413,27 @@ def get_latest_docker_metrics_sync() -> List[Dict[str, Any]]:
     """
     Синхронно возвращает последние метрики Docker для использования в других модулях.
     """
-    global latest_docker_metrics
-    return latest_docker_metrics
+    if docker_streams is not None:
+        # В режиме stream отдаём последние образцы подписок, а не снимок цикла
+        return get_streamed_container_metrics()
+    return scheduler.value("containers", [])
 
 def get_latest_system_metrics_sync() -> Dict[str, Any]:
     """
     Синхронно возвращает последние системные метрики для использования в других модулях.
+    Снимок собирается из сборщиков system, disks и network; в collectors — длительность
+    последнего сбора и возраст данных каждого сборщика.
+    """
+    system_metrics = dict(scheduler.value("system", {}))
+    system_metrics.update(scheduler.value("disks", {}))
+    network = scheduler.value("network")
+    if network is not None:
+        system_metrics["network"] = network
+    system_metrics["collectors"] = scheduler.status()
+    return system_metrics
+
+def get_latest_processes_sync() -> Dict[str, Any]:
+    """
+    Синхронно возвращает последний топ процессов хоста.
     """
-    global latest_system_metrics
-    return latest_system_metrics
\ No newline at end of file
+    return scheduler.value("processes", {})
@@ -0,0 +1,131 @@
+# app/services/net_collector.py
+import os
+import time
+from typing import Dict, List, Optional
+
+from .host_collector import PROC_ROOT, ProcFile
+
+
+def resolve_net_dir(proc_root: str) -> str:
+    """
+    Каталог net пространства имён хоста. /proc/net указывает на сеть читающего
+    процесса (контейнера без network_mode: host), поэтому берём сеть init хоста.
+    """
+    path = f"{proc_root}/1/net"
+    return path if os.access(f"{path}/dev", os.R_OK) else f"{proc_root}/net"
+
+
+HOST_NET_DIR = resolve_net_dir(PROC_ROOT)  # Сетевые счётчики хоста
+LOCAL_NET_DIR = "/proc/self/net"  # Сетевые счётчики того пространства имён, где идёт захват
+
+# Столбцы /proc/net/dev: (индекс, ключ скорости)
+INTERFACE_RATES = (
+    (0, "rxBytesPerSec"), (1, "rxPacketsPerSec"), (2, "rxErrorsPerSec"), (3, "rxDropsPerSec"),
+    (8, "txBytesPerSec"), (9, "txPacketsPerSec"), (10, "txErrorsPerSec"), (11, "txDropsPerSec"),
+)
+
+# Счётчики TCP из snmp (Tcp) и netstat (TcpExt): (раздел, поле, ключ скорости)
+TCP_RATES = (
+    ("Tcp", "ActiveOpens", "activeOpensPerSec"),
+    ("Tcp", "PassiveOpens", "passiveOpensPerSec"),
+    ("Tcp", "AttemptFails", "attemptFailsPerSec"),
+    ("Tcp", "InErrs", "inErrorsPerSec"),
+    ("Tcp", "OutRsts", "outResetsPerSec"),
+    ("Tcp", "RetransSegs", "retransSegmentsPerSec"),
+    ("TcpExt", "ListenOverflows", "listenOverflowsPerSec"),  # Переполнение очереди accept
+    ("TcpExt", "ListenDrops", "listenDropsPerSec"),
+    ("TcpExt", "TCPReqQFullDrop", "synBacklogDropsPerSec"),  # SYN отброшен: очередь полуоткрытых соединений заполнена
+    ("TcpExt", "TCPReqQFullDoCookies", "synBacklogCookiesPerSec"),  # Очередь заполнена, ответ через SYN cookies
+    ("TcpExt", "SyncookiesSent", "synCookiesSentPerSec"),
+    ("TcpExt", "SyncookiesFailed", "synCookiesFailedPerSec"),
+)
+
+
+def parse_sections(data: bytes) -> Dict[str, Dict[str, int]]:
+    """Файлы snmp и netstat: пары строк «Раздел: имена» и «Раздел: значения»."""
+    sections: Dict[str, Dict[str, int]] = {}
+    lines = data.decode().split("\n")
+    for header, values in zip(lines[::2], lines[1::2]):
+        name, _, fields = header.partition(":")
+        sections[name] = dict(zip(fields.split(), (int(value) for value in values.partition(":")[2].split())))
+    return sections
+
+
+def counter_rate(current: int, previous: int, elapsed: float) -> float:
+    # Счётчик уменьшился — интерфейс пересоздан или счётчик переполнился
+    if current < previous or elapsed <= 0:
+        return 0.0
+    return round((current - previous) / elapsed, 1)
+
+
+class NetworkCollector:
+    """
+    Скорости сетевых интерфейсов и счётчики TCP по приросту /proc/net/dev,
+    /proc/net/snmp и /proc/net/netstat между вызовами. Файлы открыты один
+    раз и перечитываются через pread; первый вызов возвращает нули.
+    """
+
+    def __init__(self, net_dir: str = HOST_NET_DIR):
+        self.dev = ProcFile(f"{net_dir}/dev", 16384)
+        self.snmp = ProcFile(f"{net_dir}/snmp", 8192)
+        self.netstat = ProcFile(f"{net_dir}/netstat", 8192)
+        self.previous_dev: Dict[str, List[int]] = {}
+        self.dev_time: Optional[float] = None
+        self.previous_tcp: Dict[str, int] = {}
+        self.tcp_time: Optional[float] = None
+
+    @staticmethod
+    def _elapsed(previous: Optional[float], now: float) -> float:
+        return now - previous if previous is not None else 0.0
+
+    def read_interfaces(self) -> Dict[str, Dict[str, float]]:
+        now = time.monotonic()
+        elapsed = self._elapsed(self.dev_time, now)
+        current: Dict[str, List[int]] = {}
+        interfaces = {}
+        # Первые две строки — заголовок таблицы
+        for line in self.dev.read().split(b"\n")[2:]:
+            name, _, fields = line.partition(b":")
+            if not fields:
+                continue
+            name = name.strip().decode()
+            counters = [int(value) for value in fields.split()]
+            current[name] = counters
+            previous = self.previous_dev.get(name, counters) if elapsed else counters
+            interfaces[name] = {key: counter_rate(counters[index], previous[index], elapsed) for index, key in INTERFACE_RATES}
+        self.previous_dev = current
+        self.dev_time = now
+        return interfaces
+
+    def read_tcp(self) -> Dict[str, float]:
+        now = time.monotonic()
+        elapsed = self._elapsed(self.tcp_time, now)
+        sections = parse_sections(self.snmp.read())
+        sections.update(parse_sections(self.netstat.read()))
+        current = {}
+        tcp = {"currentEstablished": sections.get("Tcp", {}).get("CurrEstab", 0)}
+        for section, field, key in TCP_RATES:
+            value = sections.get(section, {}).get(field, 0)
+            current[key] = value
+            tcp[key] = counter_rate(value, self.previous_tcp.get(key, value) if elapsed else value, elapsed)
+        self.previous_tcp = current
+        self.tcp_time = now
+        return tcp
+
+    def collect(self) -> Dict[str, Dict]:
+        return {"interfaces": self.read_interfaces(), "tcp": self.read_tcp()}
+
+    def close(self) -> None:
+        for file in (self.dev, self.snmp, self.netstat):
+            file.close()
+
+
+_collector: Optional[NetworkCollector] = None
+
+
+def get_network_collector() -> NetworkCollector:
+    """Общий экземпляр для системных метрик: предыдущие значения счётчиков хранятся в нём."""
+    global _collector
+    if _collector is None:
+        _collector = NetworkCollector()
+    return _collector
@@ -1,8 +1,6 @@
 import asyncio
+import functools
 import time
-import ipaddress
-
-from collections import defaultdict
 
 from scapy.packet import Raw
 
@@ -11,77 +9,272 @@ from ..utils import logger
 from scapy.layers.inet import IP, TCP, UDP, ICMP
 from scapy.sendrecv import AsyncSniffer
 from app.config import settings
-from app.utils.data_handler import save_dos_data
+from app.utils.data_handler import enqueue_dos_data
+from app.utils.ip_prefix import PrefixMatcher, address_int, prefix_key, key_prefix
+from app.utils.ring import SpscRing
+from app.utils.stats import PipelineStats
+from app.utils.counters import WindowCounter, WindowSketchCounter
+from app.services.batch_capture import BatchSniffer, classify_batch, whitelist_tables, int_to_ip
+from app.services.fanout_capture import FanoutSniffer
+from app.services.incident_table import Incident, IncidentTable
+from app.services.net_collector import NetworkCollector, LOCAL_NET_DIR
+from app.services.raw_capture import RawSniffer, classify_packet, IPPROTO_TCP, SYN_FLOOD, HTTP_FLOOD, UDP_FLOOD
 
 # Конфигурация
 THRESHOLD_SYN = settings.threshold_syn  # SYN-пакетов в секунду с одного IP = атака
 THRESHOLD_HTTP = settings.threshold_http  # HTTP-запросов в секунду с одного IP = атака
 THRESHOLD_UDP = settings.threshold_udp  # UDP-запросов в секунду с одного IP = атака
-CLEANUP_INTERVAL = 60  # Сбрасываем счетчики каждые 60 сек
+RATE_WINDOW = settings.rate_window  # Окно (сек), по которому считается скорость пакетов с IP
 ATTACK_EXPIRY_TIME = settings.attack_expiry_time  # Время после которого атака считается завершенной
 INTERFACE = settings.interface  # Сетевой интерфейс
-WHITELIST = settings.whitelist_ip
+CAPTURE_BACKEND = settings.capture_backend  # Способ захвата пакетов: scapy, raw, batch или fanout
+WHITELIST = PrefixMatcher(settings.whitelist_ip)  # Белый список, скомпилированный один раз
+
+SUBNET_PREFIXES_V4 = settings.subnet_prefixes_v4 if settings.subnet_aggregation else []  # Уровни агрегации IPv4, от узкого к широкому
+SUBNET_PREFIXES_V6 = settings.subnet_prefixes_v6 if settings.subnet_aggregation else []  # Уровни агрегации IPv6
+SUBNET_THRESHOLD_FACTOR = settings.subnet_threshold_factor  # Множитель порога для уровней без своего значения
+# Уровни агрегации с множителями порога: ((длина префикса, множитель), ...)
+SUBNET_LEVELS_V4 = tuple((length, settings.subnet_threshold_factors_v4.get(length, SUBNET_THRESHOLD_FACTOR)) for length in SUBNET_PREFIXES_V4)
+SUBNET_LEVELS_V6 = tuple((length, settings.subnet_threshold_factors_v6.get(length, SUBNET_THRESHOLD_FACTOR)) for length in SUBNET_PREFIXES_V6)
+PREFIX_NAMES = {}  # Ключ подсети -> строка вида 203.0.113.0/24
+PREFIX_NAMES_LIMIT = 65536  # Сверх этого кэш строк подсетей очищается
+WHITELIST_TABLES = whitelist_tables(WHITELIST)  # IPv4-часть белого списка для векторной проверки
+
+if WHITELIST.invalid:
+    logger.error(f"Некорректные записи в белом списке пропущены: {WHITELIST.invalid}")
+
+def make_counter():
+    """Создаёт счётчик пакетов по IP за скользящее окно согласно настройке counter_mode."""
+    if settings.counter_mode == "sketch":
+        return WindowSketchCounter(settings.sketch_width, settings.sketch_depth, settings.sketch_top_k, RATE_WINDOW)
+    return WindowCounter(RATE_WINDOW)
 
 # Глобальные счетчики
-syn_count = defaultdict(int)
-http_count = defaultdict(int)
-udp_count = defaultdict(int)
-last_cleanup = time.time()
+syn_count = make_counter()
+http_count = make_counter()
+udp_count = make_counter()
 
-incidents = defaultdict(list)
+COUNTERS = {SYN_FLOOD: syn_count, HTTP_FLOOD: http_count, UDP_FLOOD: udp_count}
+THRESHOLDS = {SYN_FLOOD: THRESHOLD_SYN, HTTP_FLOOD: THRESHOLD_HTTP, UDP_FLOOD: THRESHOLD_UDP}
 
-# Функция для сброса счётчиков
-def reset_counters():
-    """Сброс счетчиков по таймеру"""
-    global last_cleanup
-    current_time = time.time()
-    if current_time - last_cleanup >= CLEANUP_INTERVAL:
-        syn_count.clear()
-        http_count.clear()
-        udp_count.clear()
-        last_cleanup = current_time
-        logger.debug("[*] Counters reset")
+# Счётчики подсетей (все уровни в одном счётчике на тип атаки, ключ — строка префикса)
+PREFIX_COUNTERS = {attack_type: make_counter() for attack_type in COUNTERS}
+
+# Кольцо событий от потока захвата к циклу asyncio
+EVENTS = SpscRing(settings.event_ring_size)
+DRAIN_INTERVAL = 0.05  # Как часто цикл забирает события из кольца (сек)
+DRAIN_CHUNK = 20000  # Сколько событий обрабатывать за раз, не отдавая управление циклу
+reported_drops = 0
+reported_kernel_drops = 0
+
+# Инструментация конвейера: счётчики, гистограммы задержек и текущий сниффер
+STATS = PipelineStats(COUNTERS)
+STATS_SAMPLE_MASK = 15  # Время обработчика замеряется у каждого 16-го пакета
+SATURATION_RING_FILL = 0.5  # Доля заполнения кольца, при которой детектор считается перегруженным
+SATURATION_BUSY = 0.9  # Доля времени потока захвата в обработчике, при которой он не успевает
+STARTED_AT = time.time()
+active_sniffer = None
+incident_listeners = []  # Функции, получающие новые и завершённые инциденты (режим агента)
+notifications_enabled = True  # Режим агента выключает уведомления: их отправляет центральный сервер
+
+# Усиленный режим: пока на интерфейсе спокойно, обработчики пакетов (scapy и raw)
+# разбирают только каждый SAMPLE_RATE-й пакет и учитывают его с весом SAMPLE_RATE.
+# Всплеск pps по счётчикам интерфейса или активный инцидент включают разбор каждого пакета.
+TRIGGER_PPS = settings.capture_trigger_pps  # Порог входящих пакетов/сек (0 = всегда разбирать каждый пакет)
+SAMPLE_RATE = max(1, settings.capture_sample_rate)  # Шаг выборки в спокойном режиме
+HEIGHTENED_HOLD = settings.capture_heightened_hold  # Сколько держать усиленный режим после спада (сек)
+sample_every = SAMPLE_RATE if TRIGGER_PPS else 1
+sample_skip = 0
+heightened_until = 0.0
+interface_pps = 0.0
+interface_counters = None
+
+# Активные инциденты по ключу (sourceIp, type) с кучей сроков истечения
+incidents = IncidentTable(ATTACK_EXPIRY_TIME)
 
 # Функция для получения активного инцидента (status=True)
 def get_active_incident(src_ip, typeI):
-    if incidents[src_ip]:  # Если есть инциденты для IP
-        for incident in incidents[src_ip]:
-            if incident["status"] is True and incident["type"] == typeI:  # Ищем активный инцидент
-                return incident
-    return None
+    return incidents.get(src_ip, typeI)
 
 # Функция для обновления или создания инцидента
-def update_or_create_incident(src_ip, attack_type, count):
-    current_time = time.time()
+def update_or_create_incident(src_ip, attack_type, count, window_count, rate, count_error=0, current_time=None):
+    """
+    count — новые пакеты, window_count — пакеты за всё окно (начальное значение
+    для нового инцидента), rate — текущая скорость пакетов в секунду.
+    """
+    if current_time is None:
+        current_time = time.time()
+    rate = round(rate, 1)
     active_incident = get_active_incident(src_ip, attack_type)
 
     if active_incident:
         # Обновляем существующий инцидент
-        active_incident["timeLastPacket"] = current_time
-        active_incident["count"] = count
+        active_incident.timeLastPacket = current_time
+        active_incident.count += count
+        active_incident.rate = rate
+        if rate > active_incident.peakRate:
+            active_incident.peakRate = rate
+        if count_error:
+            active_incident.countError = count_error
         logger.debug(f"Обновлён инцидент для {src_ip}: {active_incident}")
     else:
         # Создаём новый инцидент
-        new_incident = {
-            "sourceIp": src_ip,
-            "timeStart": current_time,
-            "timeLastPacket": current_time,
-            "notification": False,
-            "status": True,
-            "type": attack_type,
-            "count": count,
-        }
-        incidents[src_ip].append(new_incident)
+        new_incident = Incident(src_ip, attack_type, current_time, window_count, rate, count_error)
+        incidents.add(new_incident)
+        STATS.incidents[attack_type] += 1
         logger.debug(f"Создан новый инцидент для {src_ip}: {new_incident}")
 
 def is_whitelisted(ip):
     """Проверка IP в белом списке (Cloudflare, ваши серверы и т.д.)"""
-    for net in WHITELIST:
-        if ipaddress.IPv4Address(ip) in ipaddress.IPv4Network(net):
-            return True
+    return WHITELIST.match(ip) is not None
+
+def count_packet(src_ip, attack_type, count=1, now=None):
+    """
+    Учитывает пакеты источника в скользящем окне и создаёт/обновляет инцидент,
+    пока скорость выше порога. В режиме sketch с порогом сравнивается оценка
+    снизу, поэтому инцидент возможен только у источника из top-K.
+    """
+    if now is None:
+        now = time.time()
+    counter = COUNTERS[attack_type]
+    window_count = counter.add(src_ip, count, now)
+    rate = counter.lower_bound(src_ip, window_count) / RATE_WINDOW
+    if rate > THRESHOLDS[attack_type]:
+        update_or_create_incident(src_ip, attack_type, count, window_count, rate, counter.error(), now)
+    elif get_active_incident(src_ip, attack_type) is None:
+        count_prefixes(src_ip, attack_type, count, now)
+
+def count_prefixes(src_ip, attack_type, count, now):
+    """
+    Иерархическая агрегация по подсетям (/24, /16, IPv6 /64, /48) для
+    распределённых флудов, где каждый адрес по отдельности ниже порога.
+    Пакеты источников, уже попавших в инцидент, в подсеть не добавляются,
+    и подъём по уровням останавливается на первой подсети с инцидентом,
+    чтобы одна атака не дублировалась на всех уровнях.
+
+    Подсети считаются по целым ключам prefix_key, строка подсети нужна только
+    для инцидента. Порог уровня — порог для одного IP, умноженный на множитель
+    этой длины префикса (широкие подсети получают больший множитель).
+    """
+    levels = SUBNET_LEVELS_V6 if ":" in src_ip else SUBNET_LEVELS_V4
+    if not levels:
+        return
+    addr, version = address_int(src_ip)
+    counter = PREFIX_COUNTERS[attack_type]
+    threshold = THRESHOLDS[attack_type]
+    for length, factor in levels:
+        key = prefix_key(addr, length, version)
+        window_count = counter.add(key, count, now)
+        rate = counter.lower_bound(key, window_count) / RATE_WINDOW
+        if rate > threshold * factor:
+            update_or_create_incident(prefix_name(key), attack_type, count, window_count, rate, counter.error(), now)
+            return
+        # Пока активных инцидентов нет, строку подсети не строим
+        if incidents and get_active_incident(prefix_name(key), attack_type) is not None:
+            return
+
+def prefix_name(key):
+    """Строка подсети по ключу с кэшем: одна и та же подсеть встречается на каждом пакете атаки."""
+    name = PREFIX_NAMES.get(key)
+    if name is None:
+        if len(PREFIX_NAMES) >= PREFIX_NAMES_LIMIT:
+            PREFIX_NAMES.clear()
+        name = PREFIX_NAMES[key] = key_prefix(key)
+    return name
+
+def top_sources(limit=10):
+    """Самые активные источники по каждому типу атаки: (IP, пакетов за окно, погрешность)."""
+    now = time.time()
+    return {attack_type: counter.top(limit, now) for attack_type, counter in COUNTERS.items()}
+
+def drain_events(limit=None):
+    """
+    Забирает события из кольца и обновляет счётчики и инциденты.
+    Вызывается только из цикла asyncio, поэтому счётчики и инциденты
+    меняются в одном потоке с analyze_traffic.
+    """
+    events = EVENTS.drain(limit)
+    if not events:
+        return 0
+    started = time.perf_counter_ns()
+    hits = STATS.hits
+    for src_ip, attack_type, count, now in events:
+        hits[attack_type] += count
+        count_packet(src_ip, attack_type, count, now)
+    STATS.processed += len(events)
+    STATS.drain.record(time.perf_counter_ns() - started)
+    return len(events)
+
+def sampled(handler):
+    """
+    Учитывает пакеты, переданные обработчику, и замеряет его время
+    у каждого (STATS_SAMPLE_MASK + 1)-го пакета, чтобы замеры не стоили
+    заметной доли пропускной способности.
+    """
+    perf_counter_ns = time.perf_counter_ns
+    record = STATS.handler.record
+
+    @functools.wraps(handler)
+    def wrapper(*args, **kwargs):
+        STATS.handled += 1
+        if STATS.handled & STATS_SAMPLE_MASK:
+            return handler(*args, **kwargs)
+        started = perf_counter_ns()
+        try:
+            return handler(*args, **kwargs)
+        finally:
+            record(perf_counter_ns() - started)
+
+    return wrapper
+
+def skip_sample():
+    """В спокойном режиме пропускает все пакеты, кроме каждого sample_every-го."""
+    global sample_skip
+    sample_skip += 1
+    if sample_skip < sample_every:
+        return True
+    sample_skip = 0
     return False
 
+# Обработчики ниже работают в потоке захвата: они только классифицируют пакеты
+# и кладут компактные события (IP, тип атаки, количество, время) в кольцо
+@sampled
+def process_packet(src_ip, protocol, flags, dport, payload, now=None):
+    """Обработчик уже разобранного пакета (raw-захват и воспроизведение pcap)."""
+    if sample_every > 1 and skip_sample():
+        return
+
+    # Игнорируем белый список
+    if is_whitelisted(src_ip):
+        return
+
+    attack_type = classify_packet(protocol, flags, dport, payload)
+    if attack_type is not None:
+        EVENTS.push((src_ip, attack_type, sample_every, time.time() if now is None else now))
+
+def apply_deltas(deltas):
+    """Передаёт дельты счётчиков, присланные процессами захвата (fanout-режим)."""
+    now = time.time()
+    for attack_type, counts in deltas.items():
+        for src_ip, count in counts.items():
+            STATS.handled += count
+            EVENTS.push((src_ip, attack_type, count, now))
+
+def process_batch(batch):
+    """Обработчик пачки пакетов (batch-захват): одно событие на источник."""
+    started = time.perf_counter_ns()
+    STATS.handled += batch.length
+    for attack_type, now, sources, counts in classify_batch(batch, WHITELIST_TABLES):
+        for src, count in zip(sources.tolist(), counts.tolist()):
+            EVENTS.push((int_to_ip(src), attack_type, count, now))
+    STATS.batch.record(time.perf_counter_ns() - started)
+
+@sampled
 def analyze_packet(packet):
+    """Обработчик пакета scapy: извлекает поля заголовков и передаёт их общей логике."""
+    if sample_every > 1 and skip_sample():
+        return
+
     if not packet.haslayer(IP):
         return
 
@@ -92,87 +285,217 @@ def analyze_packet(packet):
         logger.debug(f"IP {src_ip} в белом списке, пропускаем")
         return
 
-    # Детектор HTTP-флуда
-    if packet.haslayer(TCP) and packet[TCP].dport in (80, 8080):
-        if packet.haslayer(Raw):
-            raw = packet[Raw].load.decode(errors="ignore")
-            if "GET" in raw or "POST" in raw:
-                http_count[src_ip] += 1
-                if http_count[src_ip] > THRESHOLD_HTTP:
-                    update_or_create_incident(src_ip, "HTTP Flood", http_count[src_ip])
-                    http_count[src_ip] = 0
-                    return
-        elif packet[TCP].flags == "S":
-            http_count[src_ip] += 1
-            if http_count[src_ip] > THRESHOLD_HTTP:
-                update_or_create_incident(src_ip, "HTTP Flood", http_count[src_ip])
-                http_count[src_ip] = 0
-                return
-
-    # Детектор SYN-флуда
-    elif packet.haslayer(TCP) and packet[TCP].flags == "S":
-        syn_count[src_ip] += 1
-        if syn_count[src_ip] > THRESHOLD_SYN:
-            update_or_create_incident(src_ip, "SYN Flood", syn_count[src_ip])
-            syn_count[src_ip] = 0
-            return
-
-    # Детектор UDP-флуда
+    if packet.haslayer(TCP):
+        tcp = packet[TCP]
+        payload = packet[Raw].load if packet.haslayer(Raw) else b""
+        attack_type = classify_packet(IPPROTO_TCP, int(tcp.flags), tcp.dport, payload)
     elif packet.haslayer(UDP):
-        udp_count[src_ip] += 1
-        if udp_count[src_ip] > THRESHOLD_UDP:
-            update_or_create_incident(src_ip, "UDP Flood", udp_count[src_ip])
-            udp_count[src_ip] = 0
-            return
+        attack_type = UDP_FLOOD
+    else:
+        return
+
+    if attack_type is not None:
+        EVENTS.push((src_ip, attack_type, sample_every, time.time()))
+
+def create_sniffer():
+    """
+    Создаёт сниффер согласно настройке capture_backend.
+    Если raw-сокет недоступен, используется scapy.
+    """
+    if CAPTURE_BACKEND == "fanout":
+        sniffer = FanoutSniffer(
+            iface=INTERFACE,
+            prn=apply_deltas,
+            whitelist=WHITELIST,
+            workers=settings.capture_workers,
+            flush_interval=settings.capture_flush_interval,
+        )
+        try:
+            sniffer.start()
+            return sniffer
+        except (OSError, AttributeError, ValueError) as e:
+            logger.error(f"Не удалось запустить процессы захвата, используется scapy: {e}")
+
+    if CAPTURE_BACKEND == "batch":
+        sniffer = BatchSniffer(
+            iface=INTERFACE,
+            prn=process_batch,
+            batch_size=settings.batch_size,
+            max_latency=settings.batch_max_latency,
+        )
+        try:
+            sniffer.start()
+            logger.info(f"Пакетный захват через raw-сокет на {INTERFACE}")
+            return sniffer
+        except (OSError, AttributeError) as e:
+            logger.error(f"Не удалось открыть raw-сокет, используется scapy: {e}")
+
+    if CAPTURE_BACKEND == "raw":
+        sniffer = RawSniffer(iface=INTERFACE, prn=process_packet)
+        try:
+            sniffer.start()
+            logger.info(f"Захват пакетов через raw-сокет на {INTERFACE}")
+            return sniffer
+        except (OSError, AttributeError) as e:
+            logger.error(f"Не удалось открыть raw-сокет, используется scapy: {e}")
+
+    sniffer = AsyncSniffer(iface=INTERFACE, prn=analyze_packet, store=False)
+    sniffer.start()
+    return sniffer
+
+def update_capture_mode(now):
+    """
+    Раз в секунду сверяет pps интерфейса с порогом: выше порога (или при активных
+    инцидентах) разбирается каждый пакет, через HEIGHTENED_HOLD секунд после
+    спада снова включается выборка.
+    """
+    global sample_every, heightened_until, interface_pps, interface_counters
+    if not TRIGGER_PPS or SAMPLE_RATE == 1:
+        return
+    try:
+        if interface_counters is None:
+            interface_counters = NetworkCollector(LOCAL_NET_DIR)
+        rates = interface_counters.read_interfaces().get(INTERFACE)
+    except OSError as e:
+        logger.error(f"Не удалось прочитать счётчики интерфейса {INTERFACE}: {e}")
+        return
+    if rates is None:
+        return
+    interface_pps = rates["rxPacketsPerSec"]
+    if interface_pps >= TRIGGER_PPS or len(incidents):
+        if sample_every > 1:
+            logger.warning(f"Всплеск трафика на {INTERFACE}: {interface_pps:.0f} пакетов/сек, анализируется каждый пакет")
+        sample_every = 1
+        heightened_until = now + HEIGHTENED_HOLD
+    elif sample_every == 1 and now >= heightened_until:
+        logger.info(f"Трафик на {INTERFACE} спал ({interface_pps:.0f} пакетов/сек), анализируется каждый {SAMPLE_RATE}-й пакет")
+        sample_every = SAMPLE_RATE
+
+def pipeline_counters():
+    """Накопительные счётчики конвейера от сокета захвата до разбора кольца."""
+    capture = active_sniffer.capture_stats() if hasattr(active_sniffer, "capture_stats") else {}
+    return {
+        # Для scapy счётчиков сокета нет, принятыми считаем пакеты, дошедшие до обработчика
+        "captured": capture.get("received", STATS.handled),
+        "kernelPackets": capture.get("kernelPackets", 0),
+        "kernelDrops": capture.get("kernelDrops", 0),
+        "handled": STATS.handled,
+        "queued": EVENTS.pushed,
+        "ringDrops": EVENTS.dropped,
+        "processed": STATS.processed,
+    }
+
+def saturation_reasons():
+    """Признаки того, что детектор не успевает за трафиком."""
+    reasons = []
+    rates = STATS.rates
+    if rates.get("kernelDrops", 0) > 0:
+        reasons.append("ядро отбрасывает пакеты: буфер сокета переполнен")
+    if rates.get("ringDrops", 0) > 0:
+        reasons.append("кольцо событий переполнено")
+    if len(EVENTS) > EVENTS.capacity * SATURATION_RING_FILL:
+        reasons.append("кольцо событий заполнено больше чем наполовину")
+    # Загрузка потока захвата: пакетов в секунду * среднее время обработки пакета
+    if STATS.batch.count and STATS.handled:
+        per_packet = STATS.batch.total / STATS.handled
+    elif STATS.handler.count:
+        per_packet = STATS.handler.total / STATS.handler.count
+    else:
+        per_packet = 0
+    busy = rates.get("handled", 0) * per_packet / 1e9
+    if busy > SATURATION_BUSY:
+        reasons.append(f"поток захвата занят обработкой {busy:.0%} времени")
+    if STATS.last_tick > 1e9:
+        reasons.append("тик analyze_traffic дольше секунды")
+    return reasons
+
+def pipeline_stats(limit=10):
+    """Сводка инструментации для /dos/stats."""
+    reasons = saturation_reasons()
+    return {
+        "backend": type(active_sniffer).__name__ if active_sniffer else None,
+        "uptime": round(time.time() - STARTED_AT, 1),
+        "counters": pipeline_counters(),
+        "ratesPerSecond": STATS.rates,
+        "ring": {"capacity": EVENTS.capacity, "backlog": len(EVENTS), "dropped": EVENTS.dropped},
+        "captureMode": {
+            "heightened": sample_every == 1,
+            "sampleRate": sample_every,
+            "interfacePps": interface_pps,
+            "triggerPps": TRIGGER_PPS,
+        },
+        "detectors": {
+            attack_type: {
+                "packets": STATS.hits[attack_type],
+                "incidents": STATS.incidents[attack_type],
+                "threshold": THRESHOLDS[attack_type],
+            }
+            for attack_type in COUNTERS
+        },
+        "activeIncidents": len(incidents),
+        "latency": {
+            "handler": STATS.handler.snapshot(),
+            "batch": STATS.batch.snapshot(),
+            "drain": STATS.drain.snapshot(),
+            "tick": STATS.tick.snapshot(),
+        },
+        "topSources": {
+            attack_type: [{"sourceIp": ip, "count": count, "error": error} for ip, count, error in entries]
+            for attack_type, entries in top_sources(limit).items()
+        },
+        "saturated": bool(reasons),
+        "saturationReasons": reasons,
+    }
 
 async def analyze_traffic():
+    global reported_drops, reported_kernel_drops
     current_time = time.time()
     temp_incidents = []
 
-    for src_ip in list(incidents.keys()):
-        for incident in incidents[src_ip][:]:
-            time_last_packet = incident["timeLastPacket"]
-
-            # Проверяем, прошло ли ATTACK_EXPIRY_TIME
-            if current_time - time_last_packet >= ATTACK_EXPIRY_TIME and incident["status"] is True:
-                incident["status"] = False
-                incident["notification"] = False
-                logger.debug(f"Инцидент для {src_ip} завершён: {incident}")
-
-                # Сбрасываем счётчики для этого IP
-                if incident["type"] == "SYN Flood":
-                    syn_count[src_ip] = 0
-                elif incident["type"] == "HTTP Flood":
-                    http_count[src_ip] = 0
-                elif incident["type"] == "UDP Flood":
-                    udp_count[src_ip] = 0
-
-                # Добавляем завершённый инцидент в temp_incidents
-                temp_incidents.append(incident)
-                incident["notification"] = True
-
-                # Сохраняем данные об инциденте
-                try:
-                    await save_dos_data(incident)
-                except Exception as e:
-                    logger.error(f"Ошибка при сохранении данных инцидента для {src_ip}: {e}")
-
-                # Удаляем завершённый инцидент из incidents
-                incidents[src_ip].remove(incident)
-
-            elif incident["status"] is True and incident["notification"] is False:
-                incident["notification"] = True
-                temp_incidents.append(incident)
-
-        # Если список инцидентов пуст, удаляем ключ
-        if not incidents[src_ip]:
-            del incidents[src_ip]
+    counters = pipeline_counters()
+    STATS.update_rates(counters, time.monotonic())
+    update_capture_mode(time.monotonic())
+
+    # Сообщаем об отброшенных ядром пакетах
+    if counters["kernelDrops"] != reported_kernel_drops:
+        logger.warning(f"Ядро отбросило пакетов (буфер сокета переполнен): {counters['kernelDrops'] - reported_kernel_drops}")
+        reported_kernel_drops = counters["kernelDrops"]
+
+    # Сообщаем о переполнении кольца событий
+    if EVENTS.dropped != reported_drops:
+        logger.warning(f"Кольцо событий переполнено, потеряно пакетов: {EVENTS.dropped - reported_drops}")
+        reported_drops = EVENTS.dropped
+
+    # Завершённые инциденты: с последнего пакета прошло ATTACK_EXPIRY_TIME
+    for incident in incidents.pop_expired(current_time):
+        incident.status = False
+        incident.notification = True
+        logger.debug(f"Инцидент для {incident.sourceIp} завершён: {incident}")
+
+        # Добавляем завершённый инцидент в temp_incidents
+        temp_incidents.append(incident)
+
+        # Ставим инцидент в очередь групповой записи, диск здесь не трогаем
+        try:
+            await enqueue_dos_data(incident.as_dict())
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении данных инцидента для {incident.sourceIp}: {e}")
+
+    # Новые инциденты, о которых ещё не уведомляли (завершённые уже добавлены выше)
+    for incident in incidents.pop_pending():
+        if incident.status is True:
+            incident.notification = True
+            temp_incidents.append(incident)
 
     # Отправляем уведомления после обработки всех инцидентов
     if temp_incidents:
         try:
+            temp_incidents = [incident.as_dict() for incident in temp_incidents]
             logger.info(temp_incidents)
-            await notify_dos_attack(temp_incidents)
+            for listener in incident_listeners:
+                listener(temp_incidents)
+            if notifications_enabled:
+                await notify_dos_attack(temp_incidents)
         except Exception as e:
             logger.error(f"Ошибка при отправке уведомления: {e}")
 
@@ -180,18 +503,28 @@ async def analyze_network() -> None:
     """
     Запускает анализ сетевого трафика.
     """
+    global active_sniffer
     logger.info("Анализ сетевого трафика запущен")
     sniffer = None
 
     try:
-        # Запускаем сниффер (не асинхронно, так как AsyncSniffer работает в отдельном потоке)
-        sniffer = AsyncSniffer(iface=INTERFACE, prn=analyze_packet, store=False)
-        sniffer.start()
+        # Запускаем сниффер (не асинхронно, так как сниффер работает в отдельном потоке)
+        sniffer = create_sniffer()
+        active_sniffer = sniffer
 
-        # Бесконечный цикл проверки
+        # Бесконечный цикл: часто забираем события из кольца, раз в секунду проверяем инциденты
+        next_analysis = time.monotonic()
         while True:
-            await analyze_traffic()  # Ваша функция анализа трафика
-            await asyncio.sleep(1)  # Добавляем небольшую задержку, чтобы не нагружать CPU
+            while drain_events(DRAIN_CHUNK) == DRAIN_CHUNK:
+                await asyncio.sleep(0)  # Даём поработать остальным задачам между пачками
+
+            if time.monotonic() >= next_analysis:
+                started = time.perf_counter_ns()
+                await analyze_traffic()  # Ваша функция анализа трафика
+                STATS.record_tick(time.perf_counter_ns() - started)
+                next_analysis = time.monotonic() + 1
+
+            await asyncio.sleep(DRAIN_INTERVAL)
 
     except asyncio.CancelledError:
         logger.info("Анализ сетевого трафика остановлен")
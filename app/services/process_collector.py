@@ -0,0 +1,159 @@
+# app/services/process_collector.py
+import heapq
+import os
+import time
+from operator import attrgetter
+from typing import Any, Dict, Optional
+
+from app.config import settings
+from .host_collector import PROC_ROOT
+
+MB = 1024 * 1024
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")  # Тиков процессорного времени в секунду (utime/stime в stat)
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")  # Размер страницы памяти (rss в stat в страницах)
+TOP_N = settings.process_top_n  # Сколько процессов в каждом топе
+COMMAND_LIMIT = 256  # Сколько байт командной строки показывать
+
+
+def read_file(path: str, size: int = 1024) -> bytes:
+    """Чтение короткого файла procfs одним системным вызовом, без файлового объекта Python."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        return os.read(fd, size)
+    finally:
+        os.close(fd)
+
+
+class ProcessState:
+    """Состояние процесса между циклами: накопленное время CPU и вычисленные значения."""
+
+    __slots__ = ("pid", "start", "name", "state", "ticks", "rss", "cpu", "command")
+
+    def __init__(self, pid: int, start: int, name: str):
+        self.pid = pid
+        self.start = start  # starttime из stat: отличает новый процесс с тем же PID
+        self.name = name
+        self.state = ""
+        self.ticks = 0
+        self.rss = 0
+        self.cpu = 0.0
+        self.command: Optional[str] = None
+
+
+class ProcessCollector:
+    """
+    Топ процессов хоста по CPU и по памяти из /proc/[pid]/stat.
+
+    Из stat берутся и время CPU (utime + stime), и размер резидентной памяти
+    (rss, то же значение, что второе поле statm), поэтому на процесс
+    приходится одно чтение. Состояние каждого PID сохраняется между вызовами
+    scan: CPU% считается по приросту тиков за интервал между сканированиями.
+    Процесс, которого не было в прошлом сканировании, запущен после него,
+    поэтому всё его время CPU приходится на этот интервал.
+
+    В топ попадают N процессов через кучу ограниченного размера (heapq.nlargest),
+    командная строка читается только для них. Сканирование блокирующее и
+    выполняется в отдельном потоке.
+    """
+
+    def __init__(self, proc_root: str = PROC_ROOT, top_n: int = TOP_N):
+        self.proc_root = proc_root
+        self.top_n = top_n
+        self.states: Dict[int, ProcessState] = {}
+        self.scanned_at: Optional[float] = None
+        self.memory_total = self._memory_total()
+        self.latest: Dict[str, Any] = {}
+
+    def _memory_total(self) -> int:
+        for line in read_file(f"{self.proc_root}/meminfo", 256).split(b"\n"):
+            if line.startswith(b"MemTotal:"):
+                return int(line.split()[1]) * 1024
+        return 0
+
+    def _read_stat(self, pid: int) -> Optional[tuple]:
+        try:
+            data = read_file(f"{self.proc_root}/{pid}/stat")
+        except OSError:
+            return None  # Процесс завершился во время сканирования
+        # Имя в скобках может содержать пробелы и скобки, поэтому ищем последнюю ')'
+        close = data.rfind(b")")
+        name = data[data.find(b"(") + 1:close]
+        fields = data[close + 2:].split()
+        # Поля после имени начинаются с 3-го: state, ..., utime (14), stime (15), starttime (22), rss (24)
+        return name, fields[0], int(fields[11]) + int(fields[12]), int(fields[19]), int(fields[21])
+
+    def _read_command(self, state: ProcessState) -> str:
+        if state.command is None:
+            try:
+                raw = read_file(f"{self.proc_root}/{state.pid}/cmdline", COMMAND_LIMIT)
+            except OSError:
+                raw = b""
+            # У потоков ядра командной строки нет — показываем имя в квадратных скобках
+            state.command = raw.rstrip(b"\0").replace(b"\0", b" ").decode(errors="replace") or f"[{state.name}]"
+        return state.command
+
+    def scan(self) -> Dict[str, Any]:
+        started = time.perf_counter()
+        now = time.monotonic()
+        elapsed = now - self.scanned_at if self.scanned_at is not None else 0.0
+        previous = self.states
+        states: Dict[int, ProcessState] = {}
+
+        with os.scandir(self.proc_root) as entries:
+            for entry in entries:
+                if not entry.name.isdigit():
+                    continue
+                pid = int(entry.name)
+                stat = self._read_stat(pid)
+                if stat is None:
+                    continue
+                name, status, ticks, start, rss = stat
+                state = previous.get(pid)
+                if state is None or state.start != start:
+                    # Новый процесс (или PID занят заново): отсчёт от нуля, кроме первого сканирования
+                    state = ProcessState(pid, start, name.decode(errors="replace"))
+                    base = 0 if elapsed else ticks
+                else:
+                    base = state.ticks
+                state.cpu = round((ticks - base) / CLOCK_TICKS / elapsed * 100, 1) if elapsed else 0.0
+                state.ticks = ticks
+                state.rss = rss * PAGE_SIZE
+                state.state = status.decode()
+                states[pid] = state
+
+        # Состояния завершившихся процессов отбрасываются вместе со старым словарём
+        self.states = states
+        self.scanned_at = now
+
+        by_cpu = heapq.nlargest(self.top_n, states.values(), key=attrgetter("cpu"))
+        by_memory = heapq.nlargest(self.top_n, states.values(), key=attrgetter("rss"))
+        self.latest = {
+            "time": time.time(),
+            "count": len(states),
+            "byCpu": [self._entry(state) for state in by_cpu],
+            "byMemory": [self._entry(state) for state in by_memory],
+            "scanMs": round((time.perf_counter() - started) * 1000, 2),
+        }
+        return self.latest
+
+    def _entry(self, state: ProcessState) -> Dict[str, Any]:
+        return {
+            "pid": state.pid,
+            "name": state.name,
+            "command": self._read_command(state),
+            "state": state.state,
+            "cpuPercent": state.cpu,
+            "memory": round(state.rss / MB, 2),
+            "memoryPercent": round(state.rss / self.memory_total * 100, 2) if self.memory_total else 0.0,
+        }
+
+
+_collector: Optional[ProcessCollector] = None
+
+
+def get_process_collector() -> ProcessCollector:
+    """Общий экземпляр: состояние процессов между циклами хранится в нём."""
+    global _collector
+    if _collector is None:
+        _collector = ProcessCollector()
+    return _collector
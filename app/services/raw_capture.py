@@ -0,0 +1,238 @@
+# app/services/raw_capture.py
+import ctypes
+import socket
+import struct
+import threading
+from typing import Callable, Optional, Tuple
+
+from ..utils import logger
+
+# Константы сокетов Linux, которых нет в модуле socket
+ETH_P_ALL = 0x0003
+SO_ATTACH_FILTER = 26
+PACKET_OUTGOING = 4
+SOL_PACKET = 263
+PACKET_STATISTICS = 6
+
+ETH_HLEN = 14
+IPPROTO_TCP = 6
+IPPROTO_UDP = 17
+TCP_SYN = 0x02
+HTTP_PORTS = (80, 8080)
+
+# Типы атак
+SYN_FLOOD = "SYN Flood"
+HTTP_FLOOD = "HTTP Flood"
+UDP_FLOOD = "UDP Flood"
+
+SNAPLEN = 2048  # Сколько байт кадра читаем (заголовков и начала HTTP-запроса достаточно)
+RCVBUF_SIZE = 4 * 1024 * 1024  # Буфер сокета, сглаживающий всплески во время флуда
+
+# Классический BPF (формат tcpdump -dd): пропускаем в userspace только
+# IPv4 UDP, TCP на порты 80/8080 и TCP-пакеты с одним флагом SYN.
+# Нефрагментированные пакеты и первые фрагменты, остальные отбрасываются в ядре.
+BPF_FILTER = (
+    (0x28, 0, 0, 0x0000000c),   # ldh [12]              ; EtherType
+    (0x15, 0, 12, 0x00000800),  # jeq #0x800            ; IPv4, иначе drop
+    (0x30, 0, 0, 0x00000017),   # ldb [23]              ; IP protocol
+    (0x15, 9, 0, 0x00000011),   # jeq #17 -> accept     ; UDP
+    (0x15, 0, 9, 0x00000006),   # jeq #6, иначе drop    ; TCP
+    (0x28, 0, 0, 0x00000014),   # ldh [20]              ; флаги и смещение фрагмента
+    (0x45, 7, 0, 0x00001fff),   # jset #0x1fff -> drop  ; не первый фрагмент
+    (0xb1, 0, 0, 0x0000000e),   # ldxb 4*([14]&0xf)     ; длина IP-заголовка
+    (0x48, 0, 0, 0x00000010),   # ldh [x + 16]          ; TCP dport
+    (0x15, 3, 0, 0x00000050),   # jeq #80 -> accept
+    (0x15, 2, 0, 0x00001f90),   # jeq #8080 -> accept
+    (0x50, 0, 0, 0x0000001b),   # ldb [x + 27]          ; TCP flags
+    (0x15, 0, 1, 0x00000002),   # jeq #0x02 -> accept   ; только SYN
+    (0x06, 0, 0, 0x00040000),   # accept (ret #262144)
+    (0x06, 0, 0, 0x00000000),   # drop (ret #0)
+)
+
+# (src_ip, protocol, tcp_flags, dport, payload)
+ParsedPacket = Tuple[str, int, int, int, memoryview]
+
+
+def attach_filter(sock: socket.socket, program=BPF_FILTER) -> None:
+    """Прикрепляет классический BPF-фильтр к сокету через SO_ATTACH_FILTER."""
+    insns = b"".join(struct.pack("HBBI", *insn) for insn in program)
+    buffer = ctypes.create_string_buffer(insns)
+    fprog = struct.pack("HL", len(program), ctypes.addressof(buffer))
+    sock.setsockopt(socket.SOL_SOCKET, SO_ATTACH_FILTER, fprog)
+
+
+def open_raw_socket(interface: str, timeout: float = 0.5) -> socket.socket:
+    """Открывает AF_PACKET сокет на интерфейсе с уже прикреплённым фильтром."""
+    sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_ALL))
+    try:
+        attach_filter(sock)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RCVBUF_SIZE)
+        sock.bind((interface, 0))
+        sock.settimeout(timeout)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def read_packet_statistics(sock: socket.socket) -> Tuple[int, int]:
+    """
+    Читает struct tpacket_stats сокета: (принято кадров, отброшено ядром).
+    Ядро обнуляет значения при каждом чтении, поэтому их нужно накапливать.
+    """
+    packets, drops = struct.unpack("II", sock.getsockopt(SOL_PACKET, PACKET_STATISTICS, 8))
+    return packets, drops
+
+
+class CaptureCounters:
+    """
+    Счётчики сокета захвата. received увеличивает только поток захвата,
+    kernel_packets и kernel_drops накапливаются из PACKET_STATISTICS в poll.
+    """
+
+    __slots__ = ("received", "kernel_packets", "kernel_drops")
+
+    def __init__(self):
+        self.received = 0
+        self.kernel_packets = 0
+        self.kernel_drops = 0
+
+    def poll(self, sock: Optional[socket.socket]) -> None:
+        if sock is None:
+            return
+        try:
+            packets, drops = read_packet_statistics(sock)
+        except OSError:
+            # Сокет уже закрыт — остаются накопленные значения
+            return
+        self.kernel_packets += packets
+        self.kernel_drops += drops
+
+    def as_dict(self) -> dict:
+        return {
+            "received": self.received,
+            "kernelPackets": self.kernel_packets,
+            "kernelDrops": self.kernel_drops,
+        }
+
+
+def parse_frame(frame: memoryview, length: int) -> Optional[ParsedPacket]:
+    """
+    Разбирает Ethernet/IPv4/TCP|UDP заголовки прямо из буфера без копирования.
+    Возвращает None для кадров, которые детекторам не интересны.
+    """
+    if length < ETH_HLEN + 20 or frame[12] != 0x08 or frame[13] != 0x00:
+        return None
+
+    ihl = (frame[ETH_HLEN] & 0x0F) * 4
+    total_length, frag = struct.unpack_from("!H2xH", frame, ETH_HLEN + 2)
+    if frag & 0x1FFF:
+        return None
+
+    protocol = frame[ETH_HLEN + 9]
+    src_ip = socket.inet_ntoa(frame[ETH_HLEN + 12:ETH_HLEN + 16])
+    l4 = ETH_HLEN + ihl
+    end = min(length, ETH_HLEN + total_length)
+
+    if protocol == IPPROTO_TCP:
+        if end < l4 + 20:
+            return None
+        dport = struct.unpack_from("!H", frame, l4 + 2)[0]
+        data_offset = (frame[l4 + 12] >> 4) * 4
+        return src_ip, protocol, frame[l4 + 13], dport, frame[l4 + data_offset:end]
+
+    if protocol == IPPROTO_UDP:
+        if end < l4 + 8:
+            return None
+        dport = struct.unpack_from("!H", frame, l4 + 2)[0]
+        return src_ip, protocol, 0, dport, frame[l4 + 8:end]
+
+    return None
+
+
+def classify_packet(protocol: int, flags: int, dport: int, payload) -> Optional[str]:
+    """
+    Определяет, к какому детектору относится пакет.
+    Общая логика для всех способов захвата, возвращает тип атаки или None.
+    """
+    if protocol == IPPROTO_TCP:
+        # Детектор HTTP-флуда
+        if dport in HTTP_PORTS:
+            if payload:
+                payload = bytes(payload)
+                if b"GET" in payload or b"POST" in payload:
+                    return HTTP_FLOOD
+                return None
+            return HTTP_FLOOD if flags == TCP_SYN else None
+
+        # Детектор SYN-флуда
+        return SYN_FLOOD if flags == TCP_SYN else None
+
+    # Детектор UDP-флуда
+    if protocol == IPPROTO_UDP:
+        return UDP_FLOOD
+    return None
+
+
+class RawSniffer:
+    """
+    Захват пакетов через AF_PACKET сокет с BPF-фильтром в отдельном потоке.
+    Интерфейс повторяет AsyncSniffer (start/stop), но вместо объекта scapy
+    обработчик получает уже разобранные поля заголовков.
+    """
+
+    def __init__(self, iface: str, prn: Callable[[str, int, int, int, memoryview], None], snaplen: int = SNAPLEN):
+        self.iface = iface
+        self.prn = prn
+        self.snaplen = snaplen
+        self.sock: Optional[socket.socket] = None
+        self.thread: Optional[threading.Thread] = None
+        self.running = False
+        self.counters = CaptureCounters()
+
+    def start(self) -> None:
+        self.sock = open_raw_socket(self.iface)
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="raw-sniffer", daemon=True)
+        self.thread.start()
+
+    def _run(self) -> None:
+        buffer = bytearray(self.snaplen)
+        frame = memoryview(buffer)
+        sock = self.sock
+        prn = self.prn
+        counters = self.counters
+
+        while self.running:
+            try:
+                length, address = sock.recvfrom_into(buffer)
+            except socket.timeout:
+                continue
+            except OSError as e:
+                if self.running:
+                    logger.error(f"Ошибка чтения raw-сокета: {e}")
+                break
+
+            # Собственный исходящий трафик не анализируем
+            if address[2] == PACKET_OUTGOING:
+                continue
+            counters.received += 1
+
+            parsed = parse_frame(frame, length)
+            if parsed is not None:
+                try:
+                    prn(*parsed)
+                except Exception as e:
+                    logger.error(f"Ошибка при обработке пакета: {e}")
+
+    def capture_stats(self) -> dict:
+        """Счётчики захвата вместе с отброшенными ядром кадрами."""
+        self.counters.poll(self.sock)
+        return self.counters.as_dict()
+
+    def stop(self) -> None:
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=2)
+        if self.sock:
+            self.sock.close()
@@ -0,0 +1,270 @@
+# app/services/replay.py
+"""
+Офлайн-прогон детектора DoS-атак без сети: pcap-файл или синтетический флуд
+подаются в тот же конвейер (parse_frame -> process_packet / process_batch)
+с максимальной скоростью. Время берётся из пакетов, поэтому скользящие окна
+и истечение инцидентов ведут себя так же, как при реальном захвате.
+
+Запуск из каталога app (как в Docker):
+    python -m app.services.replay --pcap dump.pcap
+    python -m app.services.replay --synthetic syn --packets 500000 --sources 200 --distribution zipf
+"""
+import argparse
+import ipaddress
+import json
+import random
+import resource
+import socket
+import struct
+import time
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from app.services import network_analyzer
+from app.services.batch_capture import PacketBatch
+from app.services.raw_capture import parse_frame, IPPROTO_TCP, IPPROTO_UDP, TCP_SYN
+
+# (время пакета, кадр Ethernet)
+Frame = Tuple[float, bytes]
+
+PCAP_MAGIC_USEC = 0xA1B2C3D4
+PCAP_MAGIC_NSEC = 0xA1B23C4D
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+ETHERNET_IPV4_HEADER = b"\x00" * 12 + b"\x08\x00"
+
+HTTP_REQUEST = b"GET / HTTP/1.1\r\nHost: target\r\n\r\n"
+
+
+def build_frame(src_ip: str, protocol: int, dport: int, flags: int = TCP_SYN, payload: bytes = b"", dst_ip: str = "10.0.0.1") -> bytes:
+    """Собирает Ethernet/IPv4/TCP|UDP кадр."""
+    if protocol == IPPROTO_TCP:
+        l4 = struct.pack("!HHIIBBHHH", 40000, dport, 0, 0, 5 << 4, flags, 65535, 0, 0) + payload
+    else:
+        l4 = struct.pack("!HHHH", 40000, dport, 8 + len(payload), 0) + payload
+    ip = struct.pack(
+        "!BBHHHBBH4s4s", 0x45, 0, 20 + len(l4), 0, 0, 64, protocol, 0,
+        socket.inet_aton(src_ip), socket.inet_aton(dst_ip),
+    )
+    return ETHERNET_IPV4_HEADER + ip + l4
+
+
+def read_pcap(path: str) -> Iterator[Frame]:
+    """Читает классический pcap (Ethernet или raw IP) без scapy."""
+    with open(path, "rb") as file:
+        header = file.read(24)
+        if len(header) < 24:
+            raise ValueError("Файл слишком короткий для pcap")
+
+        for endian in ("<", ">"):
+            magic, = struct.unpack(endian + "I", header[:4])
+            if magic in (PCAP_MAGIC_USEC, PCAP_MAGIC_NSEC):
+                break
+        else:
+            raise ValueError("Неизвестный формат файла (поддерживается только pcap, не pcapng)")
+
+        divisor = 1e9 if magic == PCAP_MAGIC_NSEC else 1e6
+        linktype, = struct.unpack(endian + "I", header[20:24])
+        if linktype not in (LINKTYPE_ETHERNET, LINKTYPE_RAW):
+            raise ValueError(f"Неподдерживаемый тип канального уровня: {linktype}")
+
+        record = struct.Struct(endian + "IIII")
+        while True:
+            raw = file.read(16)
+            if len(raw) < 16:
+                return
+            seconds, fraction, captured, _ = record.unpack(raw)
+            data = file.read(captured)
+            if len(data) < captured:
+                return
+            if linktype == LINKTYPE_RAW:
+                data = ETHERNET_IPV4_HEADER + data
+            yield seconds + fraction / divisor, data
+
+
+def make_sources(count: int, subnet: str = "") -> List[str]:
+    """Адреса источников: случайные или из заданной подсети (распределённый флуд)."""
+    if subnet:
+        network = ipaddress.IPv4Network(subnet, strict=False)
+        count = min(count, network.num_addresses)
+        base = int(network.network_address)
+        return [str(ipaddress.IPv4Address(base + offset)) for offset in random.sample(range(network.num_addresses), count)]
+    return [socket.inet_ntoa(struct.pack("!I", random.randint(0x01000000, 0xDFFFFFFF))) for _ in range(count)]
+
+
+def synthetic_flood(
+    kind: str = "syn",
+    packets: int = 100_000,
+    sources: int = 100,
+    distribution: str = "uniform",
+    pps: float = 50_000,
+    subnet: str = "",
+    start: float = 0.0,
+    seed: int = 1,
+) -> Iterator[Frame]:
+    """
+    Генерирует флуд типа syn, udp, http или mixed с заданной общей скоростью pps.
+    distribution: uniform (все источники равны), zipf (несколько тяжёлых источников
+    и длинный хвост) или single (один источник).
+    """
+    random.seed(seed)
+    addresses = make_sources(1 if distribution == "single" else sources, subnet)
+    weights = None
+    if distribution == "zipf":
+        weights = [1 / (rank ** 1.2) for rank in range(1, len(addresses) + 1)]
+
+    # Кадры собираем заранее для каждого источника, чтобы генератор не был узким местом
+    templates = {
+        "syn": lambda ip: build_frame(ip, IPPROTO_TCP, 443),
+        "udp": lambda ip: build_frame(ip, IPPROTO_UDP, 53, payload=b"\x00" * 32),
+        "http": lambda ip: build_frame(ip, IPPROTO_TCP, 80, flags=0x18, payload=HTTP_REQUEST),
+    }
+    kinds = list(templates) if kind == "mixed" else [kind]
+    frames = {k: [templates[k](ip) for ip in addresses] for k in kinds}
+
+    if not start:
+        start = time.time()
+    step = 1.0 / pps
+    chunk = 4096
+    for offset in range(0, packets, chunk):
+        size = min(chunk, packets - offset)
+        picks = random.choices(range(len(addresses)), weights=weights, k=size)
+        for i, index in enumerate(picks):
+            yield start + (offset + i) * step, frames[kinds[(offset + i) % len(kinds)]][index]
+
+
+def percentile(values: array, fraction: float) -> float:
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def replay(frames: Iterable[Frame], backend: str = "packet", batch_size: int = 4096) -> Dict[str, Any]:
+    """
+    Прогоняет кадры через детектор и возвращает отчёт: пропускная способность,
+    перцентили задержки обработки, пиковая память и полученные инциденты.
+    """
+    finished: List[Dict[str, Any]] = []
+    latencies = array("Q")
+    perf_counter_ns = time.perf_counter_ns
+    process_packet = network_analyzer.process_packet
+    drain_events = network_analyzer.drain_events
+    batch = PacketBatch(batch_size) if backend == "batch" else None
+    # Выборка спокойного режима (capture_trigger_pps) зависит от счётчиков живого
+    # интерфейса, при воспроизведении разбирается каждый пакет
+    network_analyzer.sample_every = 1
+
+    def flush_batch():
+        started = perf_counter_ns()
+        network_analyzer.process_batch(batch)
+        drain_events()
+        latencies.append(perf_counter_ns() - started)
+        batch.clear()
+
+    total = 0
+    next_tick = None
+    last_time = 0.0
+    wall_start = time.perf_counter()
+
+    for timestamp, data in frames:
+        total += 1
+        last_time = timestamp
+
+        # Раз в секунду времени пакетов снимаем завершённые инциденты, как analyze_traffic
+        if next_tick is None:
+            next_tick = int(timestamp) + 1
+        elif timestamp >= next_tick:
+            if batch is not None and batch.length:
+                flush_batch()
+            finished.extend(incident.as_dict() for incident in network_analyzer.incidents.pop_expired(timestamp))
+            network_analyzer.incidents.pop_pending()
+            next_tick = int(timestamp) + 1
+
+        if batch is not None:
+            batch.append_frame(data, len(data), timestamp)
+            if batch.full():
+                flush_batch()
+            continue
+
+        started = perf_counter_ns()
+        parsed = parse_frame(data, len(data))
+        if parsed is not None:
+            process_packet(*parsed, now=timestamp)
+            drain_events()
+        latencies.append(perf_counter_ns() - started)
+
+    if batch is not None and batch.length:
+        flush_batch()
+
+    elapsed = time.perf_counter() - wall_start
+
+    # Оставшиеся активные инциденты закрываем как после окончания трафика
+    for incident in network_analyzer.incidents.pop_expired(last_time + network_analyzer.ATTACK_EXPIRY_TIME):
+        finished.append(incident.as_dict())
+    for incident in finished:
+        incident["status"] = False
+
+    ordered = array("Q", sorted(latencies))
+    unit = "batch" if batch is not None else "packet"
+    return {
+        "backend": backend,
+        "packets": total,
+        "seconds": round(elapsed, 3),
+        "packetsPerSecond": round(total / elapsed) if elapsed else 0,
+        "latencyUnit": unit,
+        "latencyUs": {
+            "p50": round(percentile(ordered, 0.50) / 1000, 2),
+            "p90": round(percentile(ordered, 0.90) / 1000, 2),
+            "p99": round(percentile(ordered, 0.99) / 1000, 2),
+            "p999": round(percentile(ordered, 0.999) / 1000, 2),
+            "max": round((ordered[-1] if ordered else 0) / 1000, 2),
+        },
+        # ru_maxrss в Linux — килобайты
+        "peakMemoryMb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "incidents": finished,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Офлайн-прогон детектора DoS-атак")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--pcap", help="pcap-файл для воспроизведения")
+    source.add_argument("--synthetic", choices=("syn", "udp", "http", "mixed"), help="тип синтетического флуда")
+    parser.add_argument("--packets", type=int, default=200_000, help="количество синтетических пакетов")
+    parser.add_argument("--sources", type=int, default=100, help="количество источников")
+    parser.add_argument("--distribution", choices=("uniform", "zipf", "single"), default="uniform")
+    parser.add_argument("--pps", type=float, default=50_000, help="скорость синтетического потока (пакетов/сек)")
+    parser.add_argument("--subnet", default="", help="брать источники из подсети, например 203.0.113.0/24")
+    parser.add_argument("--backend", choices=("packet", "batch"), default="packet")
+    parser.add_argument("--batch-size", type=int, default=4096)
+    parser.add_argument("--json", action="store_true", help="вывести отчёт в JSON")
+    args = parser.parse_args()
+
+    if args.pcap:
+        frames = read_pcap(args.pcap)
+    else:
+        frames = synthetic_flood(args.synthetic, args.packets, args.sources, args.distribution, args.pps, args.subnet)
+
+    report = replay(frames, args.backend, args.batch_size)
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=4))
+        return
+
+    latency = report["latencyUs"]
+    print(f"Пакетов: {report['packets']} за {report['seconds']} сек ({report['packetsPerSecond']:,} пакетов/сек, {report['backend']})")
+    print(
+        f"Задержка на {report['latencyUnit']}, мкс: p50={latency['p50']} p90={latency['p90']} "
+        f"p99={latency['p99']} p99.9={latency['p999']} max={latency['max']}"
+    )
+    print(f"Пиковая память: {report['peakMemoryMb']} МБ")
+    print(f"Инцидентов: {len(report['incidents'])}")
+    for incident in report["incidents"]:
+        print(
+            f"  {incident['type']:<10} {incident['sourceIp']:<18} пакетов={incident['count']} "
+            f"пик={incident['peakRate']}/с длительность={incident['timeLastPacket'] - incident['timeStart']:.1f} с"
+        )
+
+
+if __name__ == "__main__":
+    main()
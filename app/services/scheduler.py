@@ -0,0 +1,182 @@
+# app/services/scheduler.py
+import asyncio
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from ..utils import logger
+
+OVERRUN_SKIP = "skip"  # Прошлый запуск ещё идёт — этот пропускается
+OVERRUN_QUEUE = "queue"  # Прошлый запуск ещё идёт — следующий начнётся сразу после него (не больше одного в очереди)
+
+
+class ScheduledCollector:
+    """Сборщик с собственным расписанием и результатом последнего успешного запуска."""
+
+    __slots__ = (
+        "name", "collect", "interval", "timeout", "jitter", "overrun", "on_result",
+        "value", "updated_at", "duration", "error", "runs", "failures", "overruns", "queued", "task",
+    )
+
+    def __init__(self, name: str, collect: Callable[[], Awaitable[Any]], interval: float, timeout: float,
+                 jitter: float = 0.0, overrun: str = OVERRUN_SKIP, on_result: Optional[Callable[[Any], Awaitable[None]]] = None):
+        if overrun not in (OVERRUN_SKIP, OVERRUN_QUEUE):
+            raise ValueError(f"Неизвестная политика пропуска для {name}: {overrun}")
+        self.name = name
+        self.collect = collect
+        self.interval = interval
+        self.timeout = timeout
+        self.jitter = jitter
+        self.overrun = overrun
+        self.on_result = on_result
+        self.value: Any = None
+        self.updated_at: Optional[float] = None  # Время последнего успешного сбора (unix time)
+        self.duration: Optional[float] = None  # Длительность последнего запуска (сек)
+        self.error: Optional[str] = None
+        self.runs = 0
+        self.failures = 0
+        self.overruns = 0
+        self.queued = False
+        self.task: Optional[asyncio.Task] = None
+
+    def staleness(self, now: Optional[float] = None) -> Optional[float]:
+        if self.updated_at is None:
+            return None
+        return (time.time() if now is None else now) - self.updated_at
+
+    def status(self, now: float) -> Dict[str, Any]:
+        staleness = self.staleness(now)
+        return {
+            "interval": self.interval,
+            "lastDuration": round(self.duration, 4) if self.duration is not None else None,
+            "updatedAt": self.updated_at,
+            "staleness": round(staleness, 2) if staleness is not None else None,
+            # Данные считаются устаревшими, если пропущено больше одного запуска
+            "stale": staleness is None or staleness > 2 * self.interval + self.timeout,
+            "running": self.task is not None and not self.task.done(),
+            "runs": self.runs,
+            "failures": self.failures,
+            "overruns": self.overruns,
+            "error": self.error,
+        }
+
+
+class CollectorScheduler:
+    """
+    Планировщик сборщиков метрик: у каждого свой интервал, таймаут, случайный
+    сдвиг (jitter) и политика на случай, когда прошлый запуск ещё не закончился.
+
+    Запуски идут по сетке start + k * interval независимо от длительности
+    сбора, и разные сборщики работают параллельно: медленный Docker не
+    задерживает системные метрики. refresh позволяет клиенту получить данные
+    свежее заданного возраста — текущий запуск переиспользуется, новый
+    начинается только если его нет.
+    """
+
+    def __init__(self):
+        self.collectors: Dict[str, ScheduledCollector] = {}
+        self.tasks = []
+
+    def add(self, collector: ScheduledCollector) -> ScheduledCollector:
+        self.collectors[collector.name] = collector
+        return collector
+
+    def value(self, name: str, default: Any = None) -> Any:
+        collector = self.collectors.get(name)
+        if collector is None or collector.value is None:
+            return default
+        return collector.value
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        now = time.time()
+        return {name: collector.status(now) for name, collector in self.collectors.items()}
+
+    def _start(self, collector: ScheduledCollector) -> asyncio.Task:
+        if collector.task is not None and not collector.task.done():
+            collector.overruns += 1
+            if collector.overrun == OVERRUN_QUEUE:
+                collector.queued = True
+            else:
+                logger.debug(f"Сборщик {collector.name} ещё работает, запуск пропущен")
+            return collector.task
+        collector.task = asyncio.create_task(self._run(collector))
+        return collector.task
+
+    async def _run(self, collector: ScheduledCollector) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            work = asyncio.ensure_future(collector.collect())
+            try:
+                value = await asyncio.wait_for(asyncio.shield(work), collector.timeout)
+                collector.value = value
+                collector.updated_at = time.time()
+                collector.error = None
+                if collector.on_result is not None:
+                    await collector.on_result(value)
+            except asyncio.TimeoutError:
+                collector.failures += 1
+                collector.error = f"не уложился в {collector.timeout} сек"
+                logger.error(f"Сборщик {collector.name} не уложился в {collector.timeout} сек")
+                # Таймаут не останавливает поток сбора (asyncio.to_thread): запуск считается
+                # идущим, пока поток не закончит, чтобы следующий сбор не шёл параллельно
+                # с ним по общему состоянию сборщика. Опоздавший результат отбрасывается.
+                await asyncio.wait({work})
+                if not work.cancelled():
+                    work.exception()
+            except asyncio.CancelledError:
+                work.cancel()
+                raise
+            except Exception as e:
+                collector.failures += 1
+                collector.error = str(e)
+                logger.error(f"Ошибка сборщика {collector.name}: {e}")
+            collector.duration = loop.time() - started
+            collector.runs += 1
+            if not collector.queued:
+                return
+            collector.queued = False
+
+    async def _schedule(self, collector: ScheduledCollector) -> None:
+        loop = asyncio.get_running_loop()
+        next_run = loop.time()
+        while True:
+            delay = next_run - loop.time()
+            if collector.jitter:
+                delay += random.uniform(0, collector.jitter)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._start(collector)
+            next_run += collector.interval
+            if next_run < loop.time():
+                # Цикл был занят дольше интервала — не догоняем пропущенные запуски пачкой
+                next_run = loop.time()
+
+    async def refresh(self, name: str, max_age: float = 0.0) -> Any:
+        """
+        Возвращает значение сборщика не старше max_age секунд: при необходимости
+        запускает сбор вне расписания (или дожидается уже идущего).
+        """
+        collector = self.collectors[name]
+        staleness = collector.staleness()
+        if staleness is not None and staleness <= max_age:
+            return collector.value
+        task = collector.task
+        if task is None or task.done():
+            task = collector.task = asyncio.create_task(self._run(collector))
+        # wait не отменяет общий запуск при отмене запроса клиента, а таймаут не даёт
+        # ждать запуск, который ещё дожидается зависшего потока сбора
+        await asyncio.wait({task}, timeout=collector.timeout)
+        return collector.value
+
+    async def run(self) -> None:
+        """Запускает расписания всех сборщиков и работает, пока не отменён."""
+        self.tasks = [asyncio.create_task(self._schedule(collector), name=f"collector-{name}") for name, collector in self.collectors.items()]
+        try:
+            await asyncio.gather(*self.tasks)
+        finally:
+            for task in self.tasks:
+                task.cancel()
+            for collector in self.collectors.values():
+                if collector.task is not None:
+                    collector.task.cancel()
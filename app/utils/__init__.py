@@ -1,12 +1,17 @@
 # app/utils/__init__.py
-from .data_handler import save_dos_data, load_dos_data, clear_dos_data
+from .data_handler import enqueue_dos_data, flush_dos_data, load_dos_data, clear_dos_data
 from .logger import AppLogger, logger
+from .ip_prefix import PrefixMatcher
+from .incident_store import IncidentStore
 
 # Экспортируем функции для удобного импорта
 __all__ = [
-    "save_dos_data",
+    "enqueue_dos_data",
+    "flush_dos_data",
     "load_dos_data",
     "clear_dos_data",
     "AppLogger",
-    "logger"
+    "logger",
+    "PrefixMatcher",
+    "IncidentStore"
 ]
\ No newline at end of file
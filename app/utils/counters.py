@@ -0,0 +1,289 @@
+# app/utils/counters.py
+import heapq
+import math
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+MASK64 = (1 << 64) - 1
+
+# Нечётные множители для multiply-shift хэширования строк скетча
+ROW_MULTIPLIERS = (
+    0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93,
+    0xFF51AFD7ED558CCD, 0xC4CEB9FE1A85EC53, 0x94D049BB133111EB, 0xBF58476D1CE4E5B9,
+)
+
+# (ключ, пакетов за окно, максимальная погрешность оценки)
+TopEntry = Tuple[str, int, int]
+
+
+class CountMinSketch:
+    """
+    Count-Min Sketch фиксированного размера width x depth.
+    Оценка никогда не меньше истинного значения и превышает его не более чем
+    на e / width * N с вероятностью 1 - e^-depth (N — сумма всех добавлений).
+    """
+
+    __slots__ = ("width", "depth", "shift", "rows", "total")
+
+    def __init__(self, width: int = 4096, depth: int = 4):
+        # Ширина округляется до степени двойки, чтобы индекс брался сдвигом
+        bits = max(1, math.ceil(math.log2(width)))
+        self.width = 1 << bits
+        self.depth = min(depth, len(ROW_MULTIPLIERS))
+        self.shift = 64 - bits
+        self.rows = [array("q", bytes(8 * self.width)) for _ in range(self.depth)]
+        self.total = 0
+
+    def indexes(self, key) -> List[int]:
+        h = hash(key) & MASK64
+        shift = self.shift
+        return [((h * ROW_MULTIPLIERS[i]) & MASK64) >> shift for i in range(self.depth)]
+
+    def add_at(self, indexes: List[int], count: int = 1) -> int:
+        """Добавляет count в заранее вычисленные ячейки и возвращает новую оценку."""
+        estimate = None
+        for row, index in zip(self.rows, indexes):
+            value = row[index] + count
+            row[index] = value
+            if estimate is None or value < estimate:
+                estimate = value
+        self.total += count
+        return estimate
+
+    def add(self, key, count: int = 1) -> int:
+        return self.add_at(self.indexes(key), count)
+
+    def estimate(self, key) -> int:
+        return min(row[index] for row, index in zip(self.rows, self.indexes(key)))
+
+    def subtract(self, other: "CountMinSketch") -> None:
+        """Вычитает другой скетч той же формы (используется при сдвиге окна)."""
+        if not other.total:
+            return
+        for row, other_row in zip(self.rows, other.rows):
+            for index, value in enumerate(other_row):
+                if value:
+                    row[index] -= value
+        self.total -= other.total
+
+    def error_bound(self) -> int:
+        """Максимальное завышение оценки (с вероятностью 1 - e^-depth)."""
+        return math.ceil(math.e / self.width * self.total)
+
+    def clear(self) -> None:
+        if not self.total:
+            return
+        zero = bytes(8 * self.width)
+        self.rows = [array("q", zero) for _ in range(self.depth)]
+        self.total = 0
+
+
+class WindowRecord:
+    """Кольцо секундных корзин одного источника."""
+
+    __slots__ = ("buckets", "second", "total")
+
+    def __init__(self, window: int, second: int):
+        self.buckets = [0] * window
+        self.second = second
+        self.total = 0
+
+    def advance(self, second: int) -> None:
+        """Освобождает корзины, вышедшие из окна к секунде second."""
+        elapsed = second - self.second
+        if elapsed <= 0:
+            return
+        buckets = self.buckets
+        window = len(buckets)
+        if elapsed >= window:
+            for index in range(window):
+                buckets[index] = 0
+            self.total = 0
+        else:
+            for step in range(self.second + 1, second + 1):
+                index = step % window
+                self.total -= buckets[index]
+                buckets[index] = 0
+        self.second = second
+
+
+class WindowCounter:
+    """
+    Точный счётчик пакетов за скользящее окно из секундных корзин.
+    Инкремент стоит O(1) амортизированно. Устаревшие записи удаляются лениво:
+    раз в окно текущее поколение словаря становится прошлым, а запись,
+    к которой обратились, переносится обратно. Источники, молчавшие два окна,
+    уходят вместе со старым поколением без обхода всего словаря.
+    """
+
+    __slots__ = ("window", "current", "previous", "generation")
+
+    def __init__(self, window: int = 5):
+        self.window = max(1, window)
+        self.current: Dict[str, WindowRecord] = {}
+        self.previous: Dict[str, WindowRecord] = {}
+        self.generation = 0
+
+    def _record(self, key, second: int) -> Optional[WindowRecord]:
+        generation = second // self.window
+        if generation != self.generation:
+            self.previous = self.current if generation == self.generation + 1 else {}
+            self.current = {}
+            self.generation = generation
+
+        record = self.current.get(key)
+        if record is None:
+            record = self.previous.pop(key, None)
+            if record is not None:
+                self.current[key] = record
+        return record
+
+    def add(self, key, count: int, now: float) -> int:
+        """Добавляет пакеты и возвращает их количество за окно."""
+        second = int(now)
+        record = self._record(key, second)
+        if record is None:
+            record = WindowRecord(self.window, second)
+            self.current[key] = record
+        elif record.second != second:
+            record.advance(second)
+        record.buckets[second % self.window] += count
+        record.total += count
+        return record.total
+
+    def get(self, key, now: float) -> int:
+        second = int(now)
+        record = self.current.get(key) or self.previous.get(key)
+        if record is None or second - record.second >= self.window:
+            return 0
+        if record.second != second:
+            record.advance(second)
+        return record.total
+
+    def error(self) -> int:
+        return 0
+
+    def lower_bound(self, key, count: int) -> int:
+        """Количество пакетов за окно, в котором счётчик уверен (для точного — само значение)."""
+        return count
+
+    def top(self, limit: int, now: float) -> List[TopEntry]:
+        second = int(now)
+        totals = []
+        for generation in (self.previous, self.current):
+            for key, record in list(generation.items()):
+                if second - record.second < self.window:
+                    record.advance(second)
+                    if record.total:
+                        totals.append((key, record.total))
+        return [(key, total, 0) for key, total in heapq.nlargest(limit, totals, key=lambda item: item[1])]
+
+    def __len__(self) -> int:
+        return len(self.current) + len(self.previous)
+
+
+class WindowSketchCounter:
+    """
+    Счётчик за скользящее окно с ограниченной памятью: кольцо Count-Min Sketch
+    по секундам плюс скетч-сумма всего окна. При сдвиге окна из суммы вычитается
+    только вышедшая секунда. Top-K кандидатов хранится на min-куче
+    (вытеснение как в Space-Saving), память не зависит от числа источников.
+    """
+
+    __slots__ = ("window", "buckets", "sum", "second", "top_k", "candidates", "heap")
+
+    def __init__(self, width: int = 4096, depth: int = 4, top_k: int = 100, window: int = 5):
+        self.window = max(1, window)
+        self.buckets = [CountMinSketch(width, depth) for _ in range(self.window)]
+        self.sum = CountMinSketch(width, depth)
+        self.second = 0
+        self.top_k = top_k
+        self.candidates: Dict[str, int] = {}
+        # Куча (оценка, ключ) с ленивым удалением устаревших записей
+        self.heap: List[Tuple[int, str]] = []
+
+    def _advance(self, second: int) -> None:
+        elapsed = second - self.second
+        if elapsed <= 0:
+            return
+        if elapsed >= self.window:
+            for bucket in self.buckets:
+                bucket.clear()
+            self.sum.clear()
+        else:
+            for step in range(self.second + 1, second + 1):
+                bucket = self.buckets[step % self.window]
+                self.sum.subtract(bucket)
+                bucket.clear()
+        self.second = second
+
+        # Раз в секунду обновляем оценки кандидатов, чтобы затихшие источники
+        # не занимали место в top-K
+        estimate = self.sum.estimate
+        self.candidates = {key: value for key in self.candidates if (value := estimate(key)) > 0}
+        self._rebuild()
+
+    def _rebuild(self) -> None:
+        self.heap = [(value, key) for key, value in self.candidates.items()]
+        heapq.heapify(self.heap)
+
+    def add(self, key, count: int, now: float) -> int:
+        """Добавляет пакеты и возвращает оценку их количества за окно (сверху)."""
+        second = int(now)
+        if second != self.second:
+            self._advance(second)
+
+        indexes = self.sum.indexes(key)
+        self.buckets[second % self.window].add_at(indexes, count)
+        estimate = self.sum.add_at(indexes, count)
+
+        candidates = self.candidates
+        heap = self.heap
+        if key in candidates:
+            candidates[key] = estimate
+            heapq.heappush(heap, (estimate, key))
+            if len(heap) > 4 * self.top_k:
+                self._rebuild()
+        elif len(candidates) < self.top_k:
+            candidates[key] = estimate
+            heapq.heappush(heap, (estimate, key))
+        else:
+            while heap and candidates.get(heap[0][1]) != heap[0][0]:
+                heapq.heappop(heap)
+            if heap and estimate > heap[0][0]:
+                _, evicted = heapq.heappop(heap)
+                del candidates[evicted]
+                candidates[key] = estimate
+                heapq.heappush(heap, (estimate, key))
+        return estimate
+
+    def get(self, key, now: float) -> int:
+        second = int(now)
+        if second != self.second:
+            self._advance(second)
+        return self.sum.estimate(key)
+
+    def error(self) -> int:
+        return self.sum.error_bound()
+
+    def lower_bound(self, key, count: int) -> int:
+        """
+        Оценка снизу для значения count, полученного из add/get: 0 для ключей
+        вне top-K, иначе оценка минус погрешность скетча. При миллионах
+        источников по несколько пакетов коллизии раздувают оценку каждого
+        выше порога, а оценка снизу остаётся нулевой.
+        """
+        if key not in self.candidates:
+            return 0
+        return max(0, count - self.sum.error_bound())
+
+    def top(self, limit: int, now: float) -> List[TopEntry]:
+        second = int(now)
+        if second != self.second:
+            self._advance(second)
+        error = self.error()
+        items = heapq.nlargest(limit, self.candidates.items(), key=lambda item: item[1])
+        return [(key, count, error) for key, count in items]
+
+    def __len__(self) -> int:
+        return len(self.candidates)
@@ -1,55 +1,182 @@
 # app/utils/data_handler.py
-import json
-import aiofiles
-from typing import List, Dict, Optional
+import asyncio
+import time
+from typing import List, Dict, Optional, Tuple
 from pathlib import Path
 
 from app.utils.logger import logger
+from app.utils.incident_store import IncidentStore
 
-# Путь к файлу data.json
+# Путь к базе инцидентов и к прежнему файлу data.json (переносится в базу один раз)
+DB_FILE = Path("../logs/incidents.db")
 DATA_FILE = Path("../logs/data.json")
 
-async def save_dos_data(incident: Dict[str, str]) -> None:
+# Отложенная запись: инциденты копятся в очереди и пишутся групповыми транзакциями
+WRITE_BATCH_SIZE = 500  # Максимум инцидентов в одной транзакции
+WRITE_FLUSH_INTERVAL = 0.5  # Максимальная задержка записи инцидента (сек)
+WRITE_QUEUE_LIMIT = 100_000  # Ёмкость очереди, при заполнении enqueue ждёт записи
+WRITE_RETRIES = 3  # Попыток записать пачку перед тем, как её отбросить
+
+_store: Optional[IncidentStore] = None
+_store_lock = asyncio.Lock()
+
+def open_store() -> IncidentStore:
+    """Открывает базу и переносит в неё data.json. Блокирующая функция: выполняется в потоке."""
+    store = IncidentStore(DB_FILE)
+    store.migrate_json(DATA_FILE)
+    return store
+
+async def get_store() -> IncidentStore:
     """
-    Сохраняет данные о DOS-атаке в файл data.json.
+    Открывает хранилище инцидентов при первом обращении. Открытие SQLite и
+    перенос всего data.json идут в потоке, чтобы не останавливать цикл asyncio
+    (API, бот и разбор событий захвата); одновременные первые обращения ждут
+    одного открытия.
     """
-    try:
-        # Читаем существующие данные
-        existing_data = await load_dos_data() or []
+    global _store
+    if _store is None:
+        async with _store_lock:
+            if _store is None:
+                _store = await asyncio.to_thread(open_store)
+    return _store
+
+class IncidentWriter:
+    """
+    Очередь отложенной записи с групповой фиксацией. Фоновая задача забирает
+    первый инцидент, добирает к нему всё, что пришло за WRITE_FLUSH_INTERVAL
+    (не больше WRITE_BATCH_SIZE), и записывает пачку одной транзакцией в пуле
+    потоков. Очередь ограничена: если база не успевает, enqueue ждёт, а не
+    копит инциденты в памяти без предела.
+    """
+
+    def __init__(self):
+        self.queue: Optional[asyncio.Queue] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def _ensure_started(self) -> None:
+        if self.task is None or self.task.done():
+            if self.queue is None:
+                self.queue = asyncio.Queue(maxsize=WRITE_QUEUE_LIMIT)
+            self.task = asyncio.create_task(self._run())
+
+    async def enqueue(self, incident: Dict[str, str]) -> None:
+        self._ensure_started()
+        await self.queue.put(incident)
+
+    async def _collect(self) -> List[Dict[str, str]]:
+        batch = [await self.queue.get()]
+        deadline = asyncio.get_running_loop().time() + WRITE_FLUSH_INTERVAL
+        while len(batch) < WRITE_BATCH_SIZE:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _write(self, batch: List[Dict[str, str]]) -> None:
+        for attempt in range(1, WRITE_RETRIES + 1):
+            try:
+                store = await get_store()
+                await asyncio.to_thread(store.insert_many, batch)
+                logger.info(f"Сохранено инцидентов: {len(batch)}")
+                return
+            except Exception as e:
+                logger.error(f"Ошибка при сохранении пачки инцидентов (попытка {attempt}): {e}")
+                await asyncio.sleep(attempt)
+        logger.error(f"Пачка из {len(batch)} инцидентов не сохранена: {batch}")
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect()
+            try:
+                await self._write(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def flush(self) -> None:
+        """Ждёт, пока все поставленные в очередь инциденты будут записаны."""
+        if self.queue is not None and self.task is not None and not self.task.done():
+            await self.queue.join()
+
+    async def close(self) -> None:
+        await self.flush()
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
 
-        # Добавляем новый инцидент
-        existing_data.append(incident)
+writer = IncidentWriter()
 
-        # Записываем обновленные данные в файл
-        async with aiofiles.open(DATA_FILE, mode="w", encoding="utf-8") as file:
-            await file.write(json.dumps(existing_data, indent=4, ensure_ascii=False))
+async def enqueue_dos_data(incident: Dict[str, str]) -> None:
+    """
+    Ставит завершённый инцидент в очередь групповой записи и сразу возвращается
+    (ждёт только при переполненной очереди).
+    """
+    await writer.enqueue(incident)
 
-        logger.info(f"Данные о DOS-атаке сохранены: {incident}")
+async def flush_dos_data() -> None:
+    """
+    Записывает накопленные в очереди инциденты и останавливает фоновую запись.
+    Вызывается при завершении приложения.
+    """
+    try:
+        await writer.close()
+        logger.info("Очередь записи инцидентов сброшена на диск")
     except Exception as e:
-        logger.error(f"Ошибка при сохранении данных: {e}")
+        logger.error(f"Ошибка при сбросе очереди инцидентов: {e}")
 
 async def load_dos_data() -> Optional[List[Dict[str, str]]]:
     """
-    Загружает данные о DOS-атаках из файла data.json.
+    Загружает данные о DOS-атаках из хранилища инцидентов.
     """
     try:
-        if not DATA_FILE.exists():
-            return []
-
-        async with aiofiles.open(DATA_FILE, mode="r", encoding="utf-8") as file:
-            content = await file.read()
-            return json.loads(content) if content else []
+        store = await get_store()
+        return await asyncio.to_thread(store.all)
     except Exception as e:
         logger.error(f"Ошибка при загрузке данных: {e}")
         return None
 
+async def query_dos_data(**filters) -> Tuple[List[Dict[str, str]], Optional[str]]:
+    """
+    Выборка инцидентов с фильтрами и постраничной выдачей (см. IncidentStore.query).
+    Возвращает записи и курсор следующей страницы.
+    """
+    store = await get_store()
+    return await asyncio.to_thread(store.query, **filters)
+
+async def compact_dos_data(
+    max_age: Optional[float], max_rows: Optional[int], hourly_max_age: Optional[float], max_bytes: Optional[int] = None
+) -> Tuple[int, int]:
+    """
+    Добавляет новые инциденты в сводки и применяет политику хранения.
+    Возвращает (инцидентов добавлено в сводки, инцидентов удалено).
+    """
+    store = await get_store()
+    rolled_up = await asyncio.to_thread(store.rollup)
+    deleted = await asyncio.to_thread(store.apply_retention, max_age, max_rows, hourly_max_age, time.time(), max_bytes)
+    return rolled_up, deleted
+
+async def load_dos_rollups(**filters) -> List[Dict[str, str]]:
+    """
+    Почасовые или посуточные сводки инцидентов (см. IncidentStore.rollups).
+    """
+    store = await get_store()
+    return await asyncio.to_thread(store.rollups, **filters)
+
 async def clear_dos_data() -> None:
     """
-    Очищает файл data.json.
+    Очищает историю инцидентов.
     """
     try:
-        async with aiofiles.open(DATA_FILE, mode="w", encoding="utf-8") as file:
-            await file.write(json.dumps([], indent=4, ensure_ascii=False))
-        logger.info("Файл data.json очищен.")
+        store = await get_store()
+        await asyncio.to_thread(store.clear)
+        logger.info("История инцидентов очищена.")
     except Exception as e:
-        logger.error(f"Ошибка при очистке данных: {e}")
\ No newline at end of file
+        logger.error(f"Ошибка при очистке данных: {e}")
@@ -0,0 +1,58 @@
+# app/utils/delta.py
+import json
+from typing import Any, Dict, List, Tuple
+
+
+def normalize(value: Any) -> Any:
+    """
+    Приводит значение к виду после JSON (кортежи — списки, ключи — строки),
+    чтобы база отправителя совпадала с тем, что восстановит получатель.
+    """
+    return json.loads(json.dumps(value))
+
+
+def diff(old: Dict[str, Any], new: Dict[str, Any]) -> Tuple[Dict[str, Any], List[List[str]]]:
+    """
+    Разница двух словарей: (изменения, удалённые пути). Вложенные словари
+    сравниваются рекурсивно, остальные значения (в том числе списки)
+    передаются целиком, если изменились.
+    """
+    changes: Dict[str, Any] = {}
+    removed: List[List[str]] = []
+    for key, value in new.items():
+        if key not in old:
+            changes[key] = value
+            continue
+        previous = old[key]
+        if isinstance(value, dict) and isinstance(previous, dict):
+            nested_changes, nested_removed = diff(previous, value)
+            if nested_changes:
+                changes[key] = nested_changes
+            removed.extend([key, *path] for path in nested_removed)
+        elif value != previous:
+            changes[key] = value
+    removed.extend([key] for key in old if key not in new)
+    return changes, removed
+
+
+def apply(base: Dict[str, Any], changes: Dict[str, Any], removed: List[List[str]]) -> Dict[str, Any]:
+    """Применяет результат diff к base на месте и возвращает base."""
+    for path in removed:
+        target = base
+        for key in path[:-1]:
+            target = target.get(key)
+            if not isinstance(target, dict):
+                break
+        else:
+            target.pop(path[-1], None)
+    merge(base, changes)
+    return base
+
+
+def merge(base: Dict[str, Any], changes: Dict[str, Any]) -> None:
+    for key, value in changes.items():
+        current = base.get(key)
+        if isinstance(value, dict) and isinstance(current, dict):
+            merge(current, value)
+        else:
+            base[key] = value
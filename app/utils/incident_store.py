@@ -0,0 +1,472 @@
+# app/utils/incident_store.py
+import base64
+import ipaddress
+import json
+import math
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.utils.logger import logger
+from app.utils.ip_prefix import source_prefix
+
+# Поля инцидента в порядке колонок таблицы
+FIELDS = (
+    "sourceIp", "type", "timeStart", "timeLastPacket", "status",
+    "notification", "count", "rate", "peakRate", "countError",
+    "sourceFirst", "sourceLast",
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS incidents (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sourceIp TEXT NOT NULL,
+    type TEXT NOT NULL,
+    timeStart REAL NOT NULL,
+    timeLastPacket REAL NOT NULL,
+    status INTEGER NOT NULL,
+    notification INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    rate REAL,
+    peakRate REAL,
+    countError INTEGER NOT NULL DEFAULT 0,
+    sourceFirst BLOB,
+    sourceLast BLOB
+);
+CREATE INDEX IF NOT EXISTS incidents_time_start ON incidents (timeStart);
+CREATE INDEX IF NOT EXISTS incidents_source_ip ON incidents (sourceIp);
+CREATE INDEX IF NOT EXISTS incidents_type ON incidents (type);
+
+CREATE TABLE IF NOT EXISTS incident_rollups (
+    period TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    prefix TEXT NOT NULL,
+    incidents INTEGER NOT NULL,
+    packets INTEGER NOT NULL,
+    peakRate REAL,
+    duration REAL NOT NULL,
+    PRIMARY KEY (period, bucket, type, prefix)
+);
+
+CREATE TABLE IF NOT EXISTS store_meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+# Диапазон адресов источника; создаётся после переноса старой таблицы (см. _migrate)
+SOURCE_RANGE_INDEX = "CREATE INDEX IF NOT EXISTS incidents_source_range ON incidents (sourceFirst)"
+
+RETENTION_SIZE_PASSES = 4  # Сколько раз за цикл обслуживания уточнять удаление по размеру базы
+
+# Периоды сводок: название -> длина в секундах (границы по UTC)
+ROLLUP_PERIODS = {"hour": 3600, "day": 86400}
+ROLLUP_PREFIX_V4 = 24  # Сводки группируются по подсетям источников
+ROLLUP_PREFIX_V6 = 64
+
+# Добавляет к сводкам инциденты с id в диапазоне (?, ?]
+ROLLUP_SQL = """
+INSERT INTO incident_rollups (period, bucket, type, prefix, incidents, packets, peakRate, duration)
+SELECT ?, CAST(timeStart / ? AS INTEGER) * ?, type, rollup_prefix(sourceIp),
+       COUNT(*), SUM(count), MAX(peakRate), SUM(timeLastPacket - timeStart)
+FROM incidents
+WHERE id > ? AND id <= ?
+GROUP BY 2, 3, 4
+ON CONFLICT (period, bucket, type, prefix) DO UPDATE SET
+    incidents = incidents + excluded.incidents,
+    packets = packets + excluded.packets,
+    peakRate = MAX(COALESCE(peakRate, 0), COALESCE(excluded.peakRate, 0)),
+    duration = duration + excluded.duration
+"""
+
+
+def incident_row(incident: Dict[str, Any]) -> tuple:
+    """Словарь инцидента -> кортеж значений колонок."""
+    return (
+        str(incident["sourceIp"]),
+        str(incident["type"]),
+        float(incident["timeStart"]),
+        float(incident.get("timeLastPacket", incident["timeStart"])),
+        int(bool(incident.get("status", False))),
+        int(bool(incident.get("notification", False))),
+        int(incident.get("count", 0)),
+        incident.get("rate"),
+        incident.get("peakRate"),
+        int(incident.get("countError", 0) or 0),
+        *source_columns(str(incident["sourceIp"])),
+    )
+
+
+def row_incident(row: sqlite3.Row) -> Dict[str, Any]:
+    """Строка таблицы -> словарь в прежнем формате data.json."""
+    incident = {
+        "sourceIp": row["sourceIp"],
+        "timeStart": row["timeStart"],
+        "timeLastPacket": row["timeLastPacket"],
+        "notification": bool(row["notification"]),
+        "status": bool(row["status"]),
+        "type": row["type"],
+        "count": row["count"],
+    }
+    # В записях, перенесённых из старого data.json, скорости может не быть
+    if row["rate"] is not None:
+        incident["rate"] = row["rate"]
+    if row["peakRate"] is not None:
+        incident["peakRate"] = row["peakRate"]
+    if row["countError"]:
+        incident["countError"] = row["countError"]
+    return incident
+
+
+def rollup_prefix(source_ip: str) -> str:
+    """Подсеть источника для сводок; инциденты подсетей остаются как есть."""
+    if "/" in source_ip:
+        return source_ip
+    try:
+        return source_prefix(source_ip, ROLLUP_PREFIX_V6 if ":" in source_ip else ROLLUP_PREFIX_V4)
+    except OSError:
+        return source_ip
+
+
+def packed_address(address) -> bytes:
+    """
+    Адрес в 16 байтах: IPv4 — как ::ffff:a.b.c.d, поэтому адреса обоих семейств
+    сравниваются побайтно в одном индексе.
+    """
+    if address.version == 4:
+        return b"\x00" * 10 + b"\xff\xff" + address.packed
+    return address.packed
+
+
+def source_range(source: str) -> Tuple[bytes, bytes]:
+    """Первый и последний адрес источника (адреса или подсети); ValueError, если это не адрес."""
+    network = ipaddress.ip_network(source, strict=False)
+    return packed_address(network.network_address), packed_address(network.broadcast_address)
+
+
+def source_columns(source_ip: str) -> Tuple[Optional[bytes], Optional[bytes]]:
+    """Значения колонок sourceFirst и sourceLast; NULL для записей без корректного адреса."""
+    try:
+        return source_range(source_ip)
+    except ValueError:
+        return None, None
+
+
+def encode_cursor(time_start: float, row_id: int) -> str:
+    """Непрозрачный курсор страницы: позиция последней выданной записи."""
+    return base64.urlsafe_b64encode(f"{time_start!r}:{row_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        time_start, row_id = raw.split(":")
+        return float(time_start), int(row_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Некорректный курсор: {cursor}") from e
+
+
+def source_condition(source: str) -> Tuple[str, list]:
+    """
+    Условие по источнику: точный адрес или подсеть в нотации CIDR.
+
+    Подсеть любой длины и любого семейства сводится к диапазону по индексу
+    sourceFirst (упакованный первый адрес источника). Инцидент подсети
+    вида '1.2.3.0/24' попадает в выборку, только если вся его подсеть лежит
+    внутри запрошенной: это проверяет sourceLast.
+    """
+    if "/" not in source:
+        return "sourceIp = ?", [str(ipaddress.ip_address(source))]
+    first, last = source_range(source)
+    return "sourceFirst >= ? AND sourceFirst <= ? AND sourceLast <= ?", [first, last, last]
+
+
+class IncidentStore:
+    """
+    История завершённых инцидентов в SQLite (режим WAL) с индексами по
+    timeStart, sourceIp, type и диапазону адресов источника. Запись инцидента — одна вставка в конец
+    таблицы и журнала, без перезаписи истории; после сбоя WAL
+    восстанавливает все зафиксированные транзакции.
+
+    Соединение одно на процесс и защищено блокировкой: методы синхронные
+    и вызываются из пула потоков, чтобы не блокировать цикл asyncio.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        # В WAL режим NORMAL не теряет целостность при сбое питания, только последние транзакции
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.create_function("rollup_prefix", 1, rollup_prefix, deterministic=True)
+        self.connection.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self) -> None:
+        """
+        Добавляет колонки диапазона адресов в базу, созданную до их появления,
+        и заполняет их для уже записанных инцидентов.
+        """
+        columns = {row["name"] for row in self.connection.execute("PRAGMA table_info(incidents)")}
+        if "sourceFirst" not in columns:
+            self.connection.create_function("source_first", 1, lambda value: source_columns(value)[0], deterministic=True)
+            self.connection.create_function("source_last", 1, lambda value: source_columns(value)[1], deterministic=True)
+            with self.connection:
+                self.connection.execute("ALTER TABLE incidents ADD COLUMN sourceFirst BLOB")
+                self.connection.execute("ALTER TABLE incidents ADD COLUMN sourceLast BLOB")
+                updated = self.connection.execute(
+                    "UPDATE incidents SET sourceFirst = source_first(sourceIp), sourceLast = source_last(sourceIp)"
+                ).rowcount
+            logger.info(f"База инцидентов дополнена диапазонами адресов: {updated} записей")
+        self.connection.execute(SOURCE_RANGE_INDEX)
+
+    def insert_many(self, incidents: Iterable[Dict[str, Any]]) -> int:
+        """Записывает инциденты одной транзакцией."""
+        rows = [incident_row(incident) for incident in incidents]
+        if not rows:
+            return 0
+        placeholders = ", ".join("?" * len(FIELDS))
+        with self.lock, self.connection:
+            self.connection.executemany(
+                f"INSERT INTO incidents ({', '.join(FIELDS)}) VALUES ({placeholders})", rows
+            )
+        return len(rows)
+
+    def insert(self, incident: Dict[str, Any]) -> None:
+        self.insert_many([incident])
+
+    def all(self) -> List[Dict[str, Any]]:
+        """Вся история в порядке начала инцидентов."""
+        with self.lock:
+            rows = self.connection.execute("SELECT * FROM incidents ORDER BY timeStart, id").fetchall()
+        return [row_incident(row) for row in rows]
+
+    def query(
+        self,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        source: Optional[str] = None,
+        attack_type: Optional[str] = None,
+        descending: bool = False,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Выборка по индексам с постраничной выдачей по ключу (timeStart, id).
+        Возвращает записи и курсор следующей страницы (None, если страница последняя).
+        Фильтра по status нет: в историю попадают только завершённые инциденты.
+        """
+        conditions, params = [], []
+        if since is not None:
+            conditions.append("timeStart >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("timeStart < ?")
+            params.append(until)
+        if attack_type:
+            conditions.append("type = ?")
+            params.append(attack_type)
+        if source:
+            condition, values = source_condition(source)
+            conditions.append(condition)
+            params.extend(values)
+        if cursor:
+            conditions.append("(timeStart, id) < (?, ?)" if descending else "(timeStart, id) > (?, ?)")
+            params.extend(decode_cursor(cursor))
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        order = "DESC" if descending else "ASC"
+        sql = f"SELECT * FROM incidents {where} ORDER BY timeStart {order}, id {order}"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+
+        with self.lock:
+            rows = self.connection.execute(sql, params).fetchall()
+        incidents = [row_incident(row) for row in rows]
+
+        next_cursor = None
+        if limit is not None and rows and len(rows) >= limit:
+            next_cursor = encode_cursor(rows[-1]["timeStart"], rows[-1]["id"])
+        return incidents, next_cursor
+
+    def rollup(self) -> int:
+        """
+        Добавляет в почасовые и посуточные сводки инциденты, записанные после
+        прошлого вызова. Позиция хранится в store_meta, поэтому каждый инцидент
+        учитывается ровно один раз, а сводки переживают удаление исходных записей.
+        """
+        with self.lock, self.connection:
+            done = self._meta("rolled_up_id")
+            last = self.connection.execute("SELECT COALESCE(MAX(id), 0) FROM incidents").fetchone()[0]
+            if last <= done:
+                return 0
+            for period, seconds in ROLLUP_PERIODS.items():
+                self.connection.execute(ROLLUP_SQL, (period, seconds, seconds, done, last))
+            self.connection.execute(
+                "INSERT OR REPLACE INTO store_meta (key, value) VALUES ('rolled_up_id', ?)", (last,)
+            )
+        return last - done
+
+    def apply_retention(
+        self,
+        max_age: Optional[float],
+        max_rows: Optional[int],
+        hourly_max_age: Optional[float],
+        now: float,
+        max_bytes: Optional[int] = None,
+    ) -> int:
+        """
+        Удаляет отдельные инциденты старше max_age секунд и самые старые сверх
+        max_rows, а также почасовые сводки старше hourly_max_age. Удаляются только
+        записи, уже попавшие в сводки. Посуточные сводки хранятся всегда.
+        Затем, если занятое место в базе больше max_bytes, удаляет самые старые
+        инциденты до этого предела (см. _trim_to_size).
+        """
+        deleted = 0
+        with self.lock, self.connection:
+            done = self._meta("rolled_up_id")
+            if max_age:
+                deleted += self.connection.execute(
+                    "DELETE FROM incidents WHERE timeStart < ? AND id <= ?", (now - max_age, done)
+                ).rowcount
+            if max_rows:
+                excess = self.connection.execute("SELECT COUNT(*) FROM incidents").fetchone()[0] - max_rows
+                if excess > 0:
+                    deleted += self.connection.execute(
+                        "DELETE FROM incidents WHERE id IN "
+                        "(SELECT id FROM incidents WHERE id <= ? ORDER BY timeStart, id LIMIT ?)",
+                        (done, excess),
+                    ).rowcount
+            if hourly_max_age:
+                self.connection.execute(
+                    "DELETE FROM incident_rollups WHERE period = 'hour' AND bucket < ?", (now - hourly_max_age,)
+                )
+        if deleted:
+            # Возвращаем место в основном файле и не даём журналу WAL расти
+            with self.lock:
+                self.connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        if max_bytes:
+            deleted += self._trim_to_size(max_bytes)
+        return deleted
+
+    def used_bytes(self) -> int:
+        """
+        Занятое место в базе: (page_count - freelist_count) * page_size.
+        Освобождённые страницы файл не уменьшают, но переиспользуются новыми
+        записями, поэтому при соблюдении предела файл перестаёт расти.
+        """
+        with self.lock:
+            page_count = self.connection.execute("PRAGMA page_count").fetchone()[0]
+            free = self.connection.execute("PRAGMA freelist_count").fetchone()[0]
+            page_size = self.connection.execute("PRAGMA page_size").fetchone()[0]
+        return (page_count - free) * page_size
+
+    def _trim_to_size(self, max_bytes: int) -> int:
+        """
+        Удаляет самые старые инциденты, уже попавшие в сводки, пока занятое место
+        больше max_bytes. Сколько удалить, оценивается по среднему размеру записи;
+        оценка уточняется за несколько проходов после контрольной точки WAL.
+        """
+        deleted = 0
+        for _ in range(RETENTION_SIZE_PASSES):
+            with self.lock:
+                self.connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            used = self.used_bytes()
+            rows = self.count()
+            if used <= max_bytes or not rows:
+                break
+            excess = max(1, math.ceil((used - max_bytes) / (used / rows)))
+            with self.lock, self.connection:
+                removed = self.connection.execute(
+                    "DELETE FROM incidents WHERE id IN "
+                    "(SELECT id FROM incidents WHERE id <= ? ORDER BY timeStart, id LIMIT ?)",
+                    (self._meta("rolled_up_id"), excess),
+                ).rowcount
+            if not removed:
+                break
+            deleted += removed
+        return deleted
+
+    def rollups(
+        self,
+        period: str = "hour",
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        attack_type: Optional[str] = None,
+        prefix: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Сводки за период по возрастанию времени (по первичному ключу)."""
+        if period not in ROLLUP_PERIODS:
+            raise ValueError(f"Неизвестный период сводок: {period}")
+        conditions, params = ["period = ?"], [period]
+        if since is not None:
+            conditions.append("bucket >= ?")
+            params.append(since - since % ROLLUP_PERIODS[period])
+        if until is not None:
+            conditions.append("bucket < ?")
+            params.append(until)
+        if attack_type:
+            conditions.append("type = ?")
+            params.append(attack_type)
+        if prefix:
+            conditions.append("prefix = ?")
+            params.append(prefix)
+        sql = f"SELECT * FROM incident_rollups WHERE {' AND '.join(conditions)} ORDER BY bucket, type, prefix"
+        with self.lock:
+            rows = self.connection.execute(sql, params).fetchall()
+        return [
+            {
+                "period": row["period"],
+                "time": row["bucket"],
+                "type": row["type"],
+                "prefix": row["prefix"],
+                "incidents": row["incidents"],
+                "packets": row["packets"],
+                "peakRate": row["peakRate"],
+                "duration": round(row["duration"], 1),
+            }
+            for row in rows
+        ]
+
+    def _meta(self, key: str) -> int:
+        row = self.connection.execute("SELECT value FROM store_meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+    def count(self) -> int:
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM incidents").fetchone()[0]
+
+    def clear(self) -> None:
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM incidents")
+            self.connection.execute("DELETE FROM incident_rollups")
+
+    def migrate_json(self, json_file: Path) -> int:
+        """
+        Однократный перенос истории из data.json. После успешного импорта файл
+        переименовывается в data.json.migrated, поэтому повторно не читается.
+        """
+        json_file = Path(json_file)
+        if not json_file.exists():
+            return 0
+        try:
+            content = json_file.read_text(encoding="utf-8")
+            incidents = json.loads(content) if content.strip() else []
+            imported = self.insert_many(
+                incident for incident in incidents if "sourceIp" in incident and "timeStart" in incident
+            )
+        except (ValueError, KeyError, TypeError) as e:
+            logger.error(f"Не удалось перенести {json_file} в базу инцидентов: {e}")
+            return 0
+        json_file.rename(json_file.with_name(json_file.name + ".migrated"))
+        logger.info(f"Перенесено инцидентов из {json_file}: {imported}")
+        return imported
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,114 @@
+# app/utils/ip_prefix.py
+import ipaddress
+import socket
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Разрядность адресов по семействам
+V4_BITS = 32
+V6_BITS = 128
+V6_KEY_FLAG = 1 << (V6_BITS + 8)  # Отличает ключи IPv6-подсетей от IPv4 в prefix_key
+
+
+def source_prefix(ip: str, length: int) -> str:
+    """Возвращает префикс заданной длины, содержащий адрес, например 203.0.113.0/24."""
+    if ":" in ip:
+        shift = V6_BITS - length
+        addr = int.from_bytes(socket.inet_pton(socket.AF_INET6, ip), "big") >> shift << shift
+        return f"{socket.inet_ntop(socket.AF_INET6, addr.to_bytes(16, 'big'))}/{length}"
+    shift = V4_BITS - length
+    addr = int.from_bytes(socket.inet_aton(ip), "big") >> shift << shift
+    return f"{socket.inet_ntoa(addr.to_bytes(4, 'big'))}/{length}"
+
+
+def address_int(ip: str) -> Tuple[int, int]:
+    """Адрес в виде (целое число, версия)."""
+    if ":" in ip:
+        return int.from_bytes(socket.inet_pton(socket.AF_INET6, ip), "big"), 6
+    return int.from_bytes(socket.inet_aton(ip), "big"), 4
+
+
+def prefix_key(addr: int, length: int, version: int = 4) -> int:
+    """
+    Целый ключ подсети для счётчиков: сетевая часть адреса, длина префикса
+    в младшем байте и признак IPv6. Дешевле строки source_prefix на каждом пакете.
+    """
+    shift = (V4_BITS if version == 4 else V6_BITS) - length
+    key = (addr >> shift) << 8 | length
+    return key if version == 4 else key | V6_KEY_FLAG
+
+
+def key_prefix(key: int) -> str:
+    """Строка подсети по ключу prefix_key, например 203.0.113.0/24."""
+    length = key & 0xFF
+    if key & V6_KEY_FLAG:
+        addr = ((key ^ V6_KEY_FLAG) >> 8) << (V6_BITS - length)
+        return f"{socket.inet_ntop(socket.AF_INET6, addr.to_bytes(16, 'big'))}/{length}"
+    addr = (key >> 8) << (V4_BITS - length)
+    return f"{socket.inet_ntoa(addr.to_bytes(4, 'big'))}/{length}"
+
+
+class PrefixMatcher:
+    """
+    Скомпилированный набор IPv4/IPv6 префиксов с поиском самого длинного совпадения.
+
+    Для каждой встречающейся длины префикса хранится хэш-таблица
+    "сетевая часть адреса -> префикс". Поиск проверяет длины от длинной
+    к короткой, поэтому стоимость ограничена числом различных длин (не больше
+    длины префикса) и не зависит от количества записей в списке.
+    Кэша вердиктов нет: поиск по таблицам дешевле, чем поддержка LRU.
+    """
+
+    __slots__ = ("_v4", "_v6", "invalid", "size")
+
+    def __init__(self, prefixes: Iterable[str]):
+        v4: Dict[int, Dict[int, str]] = {}
+        v6: Dict[int, Dict[int, str]] = {}
+        self.invalid: List[str] = []
+        self.size = 0
+
+        for prefix in prefixes:
+            try:
+                net = ipaddress.ip_network(str(prefix).strip(), strict=False)
+            except ValueError:
+                self.invalid.append(prefix)
+                continue
+            bits = V4_BITS if net.version == 4 else V6_BITS
+            tables = v4 if net.version == 4 else v6
+            shift = bits - net.prefixlen
+            tables.setdefault(shift, {})[int(net.network_address) >> shift] = str(net)
+            self.size += 1
+
+        # Сортируем по возрастанию сдвига, т.е. от самого длинного префикса к короткому
+        self._v4: Tuple[Tuple[int, Dict[int, str]], ...] = tuple(sorted(v4.items()))
+        self._v6: Tuple[Tuple[int, Dict[int, str]], ...] = tuple(sorted(v6.items()))
+
+    def v4_networks(self) -> List[Tuple[int, List[int]]]:
+        """Таблицы IPv4 в виде (сдвиг, отсортированные сетевые части) для векторной проверки."""
+        return [(shift, sorted(table)) for shift, table in self._v4]
+
+    def match_int(self, addr: int, version: int = 4) -> Optional[str]:
+        """Возвращает самый длинный префикс, содержащий адрес, заданный целым числом."""
+        for shift, table in (self._v4 if version == 4 else self._v6):
+            net = table.get(addr >> shift)
+            if net is not None:
+                return net
+        return None
+
+    def match_packed(self, addr: bytes) -> Optional[str]:
+        """Поиск по упакованному адресу (4 или 16 байт), как он лежит в заголовке пакета."""
+        return self.match_int(int.from_bytes(addr, "big"), 4 if len(addr) == 4 else 6)
+
+    def match(self, ip: str) -> Optional[str]:
+        """Поиск по строковому адресу; некорректный адрес не совпадает ни с чем."""
+        try:
+            if ":" in ip:
+                return self.match_packed(socket.inet_pton(socket.AF_INET6, ip))
+            return self.match_packed(socket.inet_aton(ip))
+        except OSError:
+            return None
+
+    def __contains__(self, ip: str) -> bool:
+        return self.match(ip) is not None
+
+    def __len__(self) -> int:
+        return self.size
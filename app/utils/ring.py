@@ -0,0 +1,58 @@
+# app/utils/ring.py
+from typing import Any, List, Optional
+
+
+class SpscRing:
+    """
+    Ограниченное кольцо для одного писателя и одного читателя без блокировок.
+
+    Писатель (поток захвата) меняет только head, читатель (цикл asyncio) —
+    только tail. Слот записывается до сдвига head, а в CPython присваивание
+    элемента списка и атрибута атомарны под GIL, поэтому читатель никогда не
+    увидит незаполненный слот. При переполнении событие отбрасывается и
+    учитывается в dropped, писатель никогда не ждёт.
+    """
+
+    __slots__ = ("capacity", "mask", "slots", "head", "tail", "pushed", "dropped")
+
+    def __init__(self, capacity: int = 65536):
+        # Ёмкость округляется до степени двойки, чтобы индекс брался маской
+        size = 1
+        while size < capacity:
+            size <<= 1
+        self.capacity = size
+        self.mask = size - 1
+        self.slots: List[Any] = [None] * size
+        self.head = 0
+        self.tail = 0
+        self.pushed = 0
+        self.dropped = 0
+
+    def push(self, item: Any) -> bool:
+        """Вызывается только из потока-писателя."""
+        head = self.head
+        if head - self.tail >= self.capacity:
+            self.dropped += 1
+            return False
+        self.slots[head & self.mask] = item
+        self.head = head + 1
+        self.pushed += 1
+        return True
+
+    def drain(self, limit: Optional[int] = None) -> List[Any]:
+        """Забирает накопленные события пачкой. Вызывается только из потока-читателя."""
+        tail = self.tail
+        head = self.head
+        if limit is not None and head - tail > limit:
+            head = tail + limit
+        slots = self.slots
+        mask = self.mask
+        items = []
+        for index in range(tail, head):
+            items.append(slots[index & mask])
+            slots[index & mask] = None
+        self.tail = head
+        return items
+
+    def __len__(self) -> int:
+        return self.head - self.tail
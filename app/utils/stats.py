@@ -0,0 +1,115 @@
+# app/utils/stats.py
+from array import array
+from typing import Any, Dict, Optional, Tuple
+
+# Подкорзин на каждую степень двойки: 8 даёт точность около 12%
+SUB_BITS = 3
+SUB_BUCKETS = 1 << SUB_BITS
+LINEAR_LIMIT = SUB_BUCKETS * 2
+MAX_EXPONENT = 40  # ~18 минут в наносекундах, всё что дольше попадает в последнюю корзину
+BUCKETS = LINEAR_LIMIT + MAX_EXPONENT * SUB_BUCKETS
+
+
+def bucket_index(value: int) -> int:
+    if value < LINEAR_LIMIT:
+        return max(value, 0)
+    exponent = value.bit_length() - SUB_BITS - 1
+    index = LINEAR_LIMIT + (exponent - 1) * SUB_BUCKETS + ((value >> exponent) - SUB_BUCKETS)
+    return min(index, BUCKETS - 1)
+
+
+def bucket_value(index: int) -> int:
+    """Середина диапазона значений корзины."""
+    if index < LINEAR_LIMIT:
+        return index
+    exponent = (index - LINEAR_LIMIT) // SUB_BUCKETS + 1
+    mantissa = (index - LINEAR_LIMIT) % SUB_BUCKETS + SUB_BUCKETS
+    return (mantissa << exponent) + (1 << exponent) // 2
+
+
+class LatencyHistogram:
+    """
+    Гистограмма задержек в стиле HDR: логарифмические диапазоны по степеням
+    двойки, каждый разбит на линейные подкорзины. Запись — несколько целочисленных
+    операций без выделения памяти, размер фиксирован. Пишет один поток,
+    читать можно из любого.
+    """
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = array("Q", bytes(8 * BUCKETS))
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, value_ns: int) -> None:
+        self.counts[bucket_index(value_ns)] += 1
+        self.count += 1
+        self.total += value_ns
+        if value_ns > self.max:
+            self.max = value_ns
+
+    def percentile(self, fraction: float) -> int:
+        if not self.count:
+            return 0
+        rank = self.count * fraction
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return min(bucket_value(index), self.max)
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Сводка в микросекундах."""
+        return {
+            "count": self.count,
+            "meanUs": round(self.total / self.count / 1000, 2) if self.count else 0,
+            "p50Us": round(self.percentile(0.50) / 1000, 2),
+            "p90Us": round(self.percentile(0.90) / 1000, 2),
+            "p99Us": round(self.percentile(0.99) / 1000, 2),
+            "p999Us": round(self.percentile(0.999) / 1000, 2),
+            "maxUs": round(self.max / 1000, 2),
+        }
+
+
+class PipelineStats:
+    """
+    Счётчики и гистограммы конвейера детектора. Каждое поле пишет ровно один
+    поток (handled и handler — поток захвата, остальное — цикл asyncio),
+    поэтому блокировки не нужны: читатель может увидеть значение на одно
+    событие старше, но никогда не испорченное.
+    """
+
+    __slots__ = ("handled", "processed", "hits", "incidents", "handler", "batch", "drain", "tick", "last_tick", "previous", "rates")
+
+    def __init__(self, detectors):
+        self.handled = 0  # Пакетов, переданных обработчику в потоке захвата
+        self.processed = 0  # Событий, забранных из кольца циклом asyncio
+        self.hits = {detector: 0 for detector in detectors}  # Пакетов по каждому детектору
+        self.incidents = {detector: 0 for detector in detectors}  # Открытых инцидентов по детектору
+        self.handler = LatencyHistogram()  # Время обработчика пакета (выборочно)
+        self.batch = LatencyHistogram()  # Время обработки пачки (batch-захват)
+        self.drain = LatencyHistogram()  # Время разбора кольца за один вызов
+        self.tick = LatencyHistogram()  # Длительность тика analyze_traffic
+        self.last_tick = 0  # Длительность последнего тика (нс)
+        self.previous: Optional[Tuple[float, Dict[str, int]]] = None
+        self.rates: Dict[str, float] = {}
+
+    def update_rates(self, totals: Dict[str, int], now: float) -> Dict[str, float]:
+        """Пересчитывает скорости (в секунду) по приращениям с прошлого вызова."""
+        if self.previous is not None:
+            previous_time, previous = self.previous
+            elapsed = now - previous_time
+            if elapsed > 0:
+                self.rates = {
+                    name: round((value - previous.get(name, 0)) / elapsed, 1)
+                    for name, value in totals.items()
+                }
+        self.previous = (now, dict(totals))
+        return self.rates
+
+    def record_tick(self, duration_ns: int) -> None:
+        self.tick.record(duration_ns)
+        self.last_tick = duration_ns
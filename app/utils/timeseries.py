@@ -0,0 +1,237 @@
+# app/utils/timeseries.py
+import mmap
+import re
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.utils.logger import logger
+
+# Уровни хранения по умолчанию: (шаг в секундах, количество интервалов)
+DEFAULT_TIERS: Tuple[Tuple[int, int], ...] = (
+    (10, 360),     # Сырые значения каждые 10 сек за час
+    (60, 1440),    # Средние и максимумы за минуту за сутки
+    (600, 4320),   # Средние и максимумы за 10 минут за 30 дней
+)
+
+# Байт на один интервал: номер интервала (q), сумма (d), количество (I), максимум (f)
+SLOT_SIZE = 8 + 8 + 4 + 4
+
+# Ряд без новых значений дольше этого (сек) может быть вытеснен, когда достигнут предел рядов
+# (например, ряды удалённого контейнера). Файл ряда на диске остаётся и доступен для чтения.
+IDLE_SERIES_TIMEOUT = 600
+
+
+def series_size(tiers: Sequence[Tuple[int, int]]) -> int:
+    return sum(capacity for _, capacity in tiers) * SLOT_SIZE
+
+
+class Tier:
+    """
+    Кольцо интервалов одного уровня поверх внешнего буфера. Интервал
+    определяется номером bucket = time // step, слот — bucket % capacity.
+    Если в слоте лежит другой номер, интервал устарел и перезаписывается,
+    поэтому очистка не нужна, а память фиксирована.
+    """
+
+    __slots__ = ("step", "capacity", "buckets", "sums", "counts", "maxes")
+
+    def __init__(self, step: int, capacity: int, buffer: memoryview):
+        self.step = step
+        self.capacity = capacity
+        offset = 0
+        self.buckets = buffer[offset:offset + capacity * 8].cast("q")
+        offset += capacity * 8
+        self.sums = buffer[offset:offset + capacity * 8].cast("d")
+        offset += capacity * 8
+        self.counts = buffer[offset:offset + capacity * 4].cast("I")
+        offset += capacity * 4
+        self.maxes = buffer[offset:offset + capacity * 4].cast("f")
+
+    def release(self) -> None:
+        for view in (self.buckets, self.sums, self.counts, self.maxes):
+            view.release()
+
+    def add(self, timestamp: float, value: float) -> None:
+        bucket = int(timestamp // self.step)
+        slot = bucket % self.capacity
+        if self.buckets[slot] != bucket:
+            self.buckets[slot] = bucket
+            self.sums[slot] = value
+            self.counts[slot] = 1
+            self.maxes[slot] = value
+            return
+        self.sums[slot] += value
+        self.counts[slot] += 1
+        if value > self.maxes[slot]:
+            self.maxes[slot] = value
+
+    def span(self) -> int:
+        return self.step * self.capacity
+
+    def points(self, since: float, until: float) -> List[Dict[str, float]]:
+        first = int(since // self.step)
+        last = int(until // self.step)
+        first = max(first, last - self.capacity + 1)
+        points = []
+        for bucket in range(first, last + 1):
+            slot = bucket % self.capacity
+            if self.buckets[slot] == bucket and self.counts[slot]:
+                points.append({
+                    "time": bucket * self.step,
+                    "avg": round(self.sums[slot] / self.counts[slot], 2),
+                    "max": round(self.maxes[slot], 2),
+                })
+        return points
+
+
+class MetricSeries:
+    """Ряд одной метрики: значения одновременно попадают во все уровни."""
+
+    __slots__ = ("name", "buffer", "tiers", "file", "updated")
+
+    def __init__(self, name: str, tiers: Sequence[Tuple[int, int]], buffer, file=None):
+        self.name = name
+        self.buffer = buffer
+        self.file = file
+        self.updated = time.monotonic()
+        view = memoryview(buffer)
+        self.tiers = []
+        offset = 0
+        for step, capacity in tiers:
+            size = capacity * SLOT_SIZE
+            self.tiers.append(Tier(step, capacity, view[offset:offset + size]))
+            offset += size
+
+    def add(self, timestamp: float, value: float) -> None:
+        self.updated = time.monotonic()
+        for tier in self.tiers:
+            tier.add(timestamp, value)
+
+    def close(self) -> None:
+        """Освобождает буфер (для mmap — сбрасывает страницы и закрывает файл)."""
+        for tier in self.tiers:
+            tier.release()
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.flush()
+            self.buffer.close()
+        if self.file is not None:
+            self.file.close()
+
+    def tier_for(self, since: float, now: float, step: Optional[int] = None) -> Tier:
+        """Уровень с заданным шагом или самый подробный, хранящий интервал от since."""
+        if step is not None:
+            for tier in self.tiers:
+                if tier.step == step:
+                    return tier
+            raise ValueError(f"Нет уровня с шагом {step} сек")
+        for tier in self.tiers:
+            if now - since <= tier.span():
+                return tier
+        return self.tiers[-1]
+
+
+class MetricHistory:
+    """
+    История метрик с фиксированной памятью: каждый ряд — кольцевые буферы
+    нескольких уровней (DEFAULT_TIERS), заполняемые по мере поступления значений.
+
+    Если задан каталог, буфер ряда отображается в файл через mmap, и история
+    переживает перезапуск: значения пишутся прямо в страницы файла.
+    Число записываемых рядов ограничено max_series: при достижении предела
+    вытесняется ряд, простаивающий дольше IDLE_SERIES_TIMEOUT, а если таких
+    нет, новый ряд не создаётся. Ряды, сохранённые на диске, но не открытые
+    для записи, читаются по запросу и в предел не входят.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_series: int = 256, tiers: Sequence[Tuple[int, int]] = DEFAULT_TIERS):
+        self.directory = Path(directory) if directory else None
+        self.max_series = max_series
+        self.tiers = tuple(tiers)
+        self.series: Dict[str, MetricSeries] = {}
+        self.rejected = set()
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, name: str) -> Path:
+        return self.directory / (re.sub(r"[^A-Za-z0-9_.-]", "_", name) + ".tsdb")
+
+    def _open(self, name: str) -> MetricSeries:
+        size = series_size(self.tiers)
+        if self.directory is None:
+            return MetricSeries(name, self.tiers, bytearray(size))
+        file = open(self._path(name), "a+b")
+        if file.seek(0, 2) != size:
+            # Новый файл или другая раскладка уровней — начинаем историю заново
+            file.truncate(0)
+            file.truncate(size)
+        return MetricSeries(name, self.tiers, mmap.mmap(file.fileno(), size), file)
+
+    def _open_stored(self, name: str) -> Optional[MetricSeries]:
+        """Ряд с диска только для чтения (не открытый для записи), None — если файла нет."""
+        if self.directory is None:
+            return None
+        path = self._path(name)
+        size = series_size(self.tiers)
+        if not path.is_file() or path.stat().st_size != size:
+            return None
+        with open(path, "rb") as file:
+            return MetricSeries(name, self.tiers, mmap.mmap(file.fileno(), size, access=mmap.ACCESS_READ))
+
+    def _evict_idle(self) -> bool:
+        """Закрывает ряд, дольше всех не получавший значений, если он простаивает."""
+        idle = min(self.series.values(), key=lambda series: series.updated, default=None)
+        if idle is None or time.monotonic() - idle.updated < IDLE_SERIES_TIMEOUT:
+            return False
+        del self.series[idle.name]
+        idle.close()
+        logger.info(f"Ряд истории метрик {idle.name} простаивает, закрыт для записи")
+        return True
+
+    def _get(self, name: str) -> Optional[MetricSeries]:
+        series = self.series.get(name)
+        if series is None:
+            if len(self.series) >= self.max_series and not self._evict_idle():
+                if name not in self.rejected:
+                    self.rejected.add(name)
+                    logger.warning(f"Достигнут предел рядов истории метрик ({self.max_series}), ряд {name} не сохраняется")
+                return None
+            self.rejected.discard(name)
+            series = self.series[name] = self._open(name)
+        return series
+
+    def record(self, timestamp: float, values: Dict[str, float]) -> None:
+        for name, value in values.items():
+            if value is None:
+                continue
+            series = self._get(name)
+            if series is not None:
+                series.add(timestamp, float(value))
+
+    def names(self) -> List[str]:
+        names = set(self.series)
+        if self.directory is not None:
+            # Ряды, сохранённые до перезапуска или вытесненные, доступны для чтения
+            names.update(path.stem for path in self.directory.glob("*.tsdb"))
+        return sorted(names)
+
+    def query(self, names: Iterable[str], since: float, until: float, step: Optional[int] = None) -> Dict[str, dict]:
+        result = {}
+        now = time.time()
+        for name in names:
+            series = self.series.get(name)
+            stored = series is None and (series := self._open_stored(name)) is not None
+            if series is None:
+                continue
+            try:
+                tier = series.tier_for(since, now, step)
+                result[name] = {"step": tier.step, "points": tier.points(since, until)}
+            finally:
+                if stored:
+                    series.close()
+        return result
+
+    def flush(self) -> None:
+        for series in self.series.values():
+            if isinstance(series.buffer, mmap.mmap):
+                series.buffer.flush()
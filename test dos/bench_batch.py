@@ -0,0 +1,82 @@
+import random
+import socket
+import struct
+import sys
+import time
+from pathlib import Path
+
+# Пути как в Docker: PYTHONPATH=/app и рабочий каталог /app/app
+ROOT = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT), str(ROOT / "app")]
+
+from scapy.layers.l2 import Ether
+
+from app.services import network_analyzer
+from app.services.batch_capture import PacketBatch
+from app.services.incident_table import IncidentTable
+from app.services.replay import build_frame
+
+# Настройки
+num_packets = 200_000  # Количество пакетов в потоке
+num_scapy_packets = 20_000  # scapy медленный, его прогоняем на части потока
+num_sources = 2_000    # Количество уникальных источников
+batch_size = 4096      # Размер пачки
+
+
+def make_traffic():
+    sources = [socket.inet_ntoa(struct.pack("!I", random.getrandbits(32))) for _ in range(num_sources)]
+    kinds = [(socket.IPPROTO_TCP, 443), (socket.IPPROTO_TCP, 80), (socket.IPPROTO_UDP, 53)]
+    frames = []
+    for _ in range(num_packets):
+        protocol, dport = random.choice(kinds)
+        frames.append(memoryview(build_frame(random.choice(sources), protocol, dport)))
+    return frames
+
+
+def reset_analyzer():
+    # Каждый прогон начинается с пустых счётчиков и таблицы инцидентов
+    for counters in (network_analyzer.COUNTERS, network_analyzer.PREFIX_COUNTERS):
+        for attack_type in counters:
+            counters[attack_type] = network_analyzer.make_counter()
+    network_analyzer.incidents = IncidentTable(network_analyzer.ATTACK_EXPIRY_TIME)
+    network_analyzer.EVENTS.drain()
+    network_analyzer.sample_every = 1
+
+
+def bench_scapy(frames):
+    # Как в AsyncSniffer: scapy разбирает кадр, затем вызывается analyze_packet
+    start = time.perf_counter()
+    for index, frame in enumerate(frames):
+        network_analyzer.analyze_packet(Ether(bytes(frame)))
+        if index % batch_size == 0:
+            network_analyzer.drain_events()
+    network_analyzer.drain_events()
+    return time.perf_counter() - start
+
+
+def bench_batch(frames):
+    batch = PacketBatch(batch_size)
+    start = time.perf_counter()
+    for frame in frames:
+        batch.append_frame(frame, len(frame), time.time())
+        if batch.full():
+            network_analyzer.process_batch(batch)
+            network_analyzer.drain_events()
+            batch.clear()
+    network_analyzer.process_batch(batch)
+    network_analyzer.drain_events()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    random.seed(1)
+    frames = make_traffic()
+
+    reset_analyzer()
+    per_packet = bench_scapy(frames[:num_scapy_packets])
+    print(f"scapy, analyze_packet по одному пакету: {num_scapy_packets / per_packet:,.0f} пакетов/сек")
+
+    reset_analyzer()
+    batched = bench_batch(frames)
+    print(f"Пакетный режим (NumPy): {num_packets / batched:,.0f} пакетов/сек")
+    print(f"Ускорение: {per_packet / num_scapy_packets * num_packets / batched:.1f}x")
@@ -0,0 +1,66 @@
+import asyncio
+import math
+import os
+import sys
+import time
+from pathlib import Path
+
+# Пути как в Docker: PYTHONPATH=/app и рабочий каталог /app/app
+ROOT = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT), str(ROOT / "app"), str(Path(__file__).resolve().parent)]
+
+from fake_docker import FakeDocker
+
+# Настройки
+num_containers = 40    # Контейнеров на поддельном Docker
+stats_delay = 1.0      # Ответ на запрос статистики (сек)
+slow_containers = (1, 2)  # Контейнеры, которые отвечают дольше таймаута
+slow_delay = 8.0
+stats_timeout = 3.0
+num_cycles = 4
+port = 23750
+
+fake = FakeDocker(num_containers, stats_delay, slow_containers, slow_delay, port)
+os.environ["DOCKER_HOST"] = fake.start()
+os.environ["DOCKER_STATS_TIMEOUT"] = str(stats_timeout)
+
+from app.services import metrics_collector
+
+
+async def measure_lag(stop, lags):
+    # Насколько цикл asyncio опаздывает к 10-миллисекундному таймеру во время сбора
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        started = loop.time()
+        await asyncio.sleep(0.01)
+        lags.append(loop.time() - started - 0.01)
+
+
+async def main():
+    # Каждый запущенный контейнер занимает поток пула на время ответа Docker, поэтому
+    # цикл длится ceil(запущенных / потоков) ответов, но не больше таймаута
+    running = sum(1 for index in range(num_containers) if index % 4)
+    rounds = math.ceil(running / metrics_collector.STATS_WORKERS)
+    print(f"Контейнеров: {num_containers} (запущено {running}), статистика за {stats_delay} сек, потоков: {metrics_collector.STATS_WORKERS}")
+    print(
+        f"Ожидаемая длительность цикла: {rounds} x {stats_delay} сек = {min(rounds * stats_delay, stats_timeout):.1f} сек, "
+        f"пока медленные контейнеры {list(slow_containers)} не ответили — таймаут {stats_timeout} сек"
+    )
+    for cycle in range(num_cycles):
+        stop, lags = asyncio.Event(), []
+        lag_task = asyncio.create_task(measure_lag(stop, lags))
+        started = time.perf_counter()
+        containers = await metrics_collector.get_container_metrics()
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await lag_task
+        stale = [container["name"] for container in containers if container["stale"]]
+        print(
+            f"Цикл {cycle + 1}: {elapsed:.2f} сек, контейнеров {len(containers)}, устаревших {stale}, "
+            f"запросов в работе {len(metrics_collector.stats_in_flight)}, задержка цикла asyncio до {max(lags) * 1000:.0f} мс"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
+    fake.stop()
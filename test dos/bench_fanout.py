@@ -0,0 +1,79 @@
+import multiprocessing
+import os
+import socket
+import sys
+import time
+from pathlib import Path
+
+# Пути как в Docker: PYTHONPATH=/app и рабочий каталог /app/app
+ROOT = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT), str(ROOT / "app")]
+
+from app.services.fanout_capture import FanoutSniffer
+from app.utils.ip_prefix import PrefixMatcher
+
+# Пропускная способность fanout-захвата в зависимости от числа процессов на loopback
+# (нужны права на raw-сокеты). Отправители шлют UDP-датаграммы с разных портов
+# источника, пока идёт замер; сколько пакетов посчитано и сколько отброшено ядром,
+# выводится для каждого числа процессов. Рост ограничен числом ядер: на loopback
+# отправители и процессы захвата делят одни и те же CPU.
+
+# Настройки
+interface = "lo"
+worker_counts = (1, 2, 4)
+num_senders = 2
+duration = 5.0
+flush_interval = 0.2
+
+counted = 0
+
+
+def on_deltas(deltas):
+    global counted
+    for counts in deltas.values():
+        counted += sum(counts.values())
+
+
+def sender(stop_at, sent):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    payload = b"x" * 32
+    count = 0
+    while time.monotonic() < stop_at:
+        for port in range(9000, 9064):
+            sock.sendto(payload, ("127.0.0.1", port))
+        count += 64
+    sent.value += count
+
+
+def measure(workers):
+    global counted
+    sniffer = FanoutSniffer(iface=interface, prn=on_deltas, whitelist=PrefixMatcher([]), workers=workers, flush_interval=flush_interval)
+    sniffer.start()
+    counted = 0
+    received, drops = sniffer.counters.received, sniffer.counters.kernel_drops
+
+    sent = multiprocessing.Value("q", 0)
+    stop_at = time.monotonic() + duration
+    senders = [multiprocessing.Process(target=sender, args=(stop_at, sent)) for _ in range(num_senders)]
+    for process in senders:
+        process.start()
+    for process in senders:
+        process.join()
+    # Ждём последних дельт от процессов захвата
+    time.sleep(flush_interval * 5)
+    sniffer.stop()
+
+    return sent.value, counted, sniffer.counters.received - received, sniffer.counters.kernel_drops - drops
+
+
+if __name__ == "__main__":
+    print(f"CPU: {os.cpu_count()}, отправителей: {num_senders}, замер {duration} сек")
+    baseline = None
+    for workers in worker_counts:
+        sent, total, received, drops = measure(workers)
+        pps = total / duration
+        baseline = baseline or pps
+        print(
+            f"Процессов {workers}: отправлено {sent}, посчитано {total} ({pps:,.0f} пакетов/сек, "
+            f"x{pps / baseline:.2f}), принято сокетами {received}, отброшено ядром {drops}"
+        )
@@ -0,0 +1,93 @@
+import asyncio
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Пути как в Docker: PYTHONPATH=/app и рабочий каталог /app/app
+ROOT = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT), str(ROOT / "app")]
+
+from app.services import agent as agent_module
+from app.services.agent import AgentClient
+from app.services.fleet import FleetServer
+
+# Настройки
+num_agents = 8          # Количество агентов на localhost
+num_containers = 40     # Контейнеров на каждом хосте
+num_snapshots = 60      # Снимков от каждого агента
+snapshot_interval = 0.02
+port = 17001
+
+
+def make_snapshot(containers, index):
+    # Меняется загрузка хоста и нескольких контейнеров, остальное остаётся прежним
+    for container in random.sample(list(containers.values()), 3):
+        container["cpuPercent"] = round(random.random() * 100, 2)
+    return {
+        "system": {"cpuPercent": round(random.random() * 100, 1), "memory": {"usage": 1000 + index, "total": 8000}, "disk": {"usage": 50, "total": 100}},
+        "containers": containers,
+        "dos": {"activeIncidents": index % 3},
+    }
+
+
+async def run_agent(name, spool_dir, incidents_sent):
+    client = AgentClient(f"127.0.0.1:{port}", name, token="secret", spool_path=f"{spool_dir}/{name}.ndjson", batch_interval=0.05)
+    containers = {f"{name}-{i}": {"id": f"{name}-{i}", "name": f"app{i}", "state": "running", "cpuPercent": 0.0, "memory": {"usage": 100, "limit": 512}} for i in range(num_containers)}
+    task = asyncio.create_task(client.run())
+    full_bytes = 0
+    for index in range(num_snapshots):
+        snapshot = make_snapshot(containers, index)
+        full_bytes += len(agent_module.encode(snapshot))
+        client.put("snapshot", snapshot)
+        if index % 10 == 0:
+            incident = {"sourceIp": f"10.0.0.{index}", "type": "SYN Flood", "timeStart": 1000 + index, "count": 500, "status": False}
+            client.put("incidents", [incident])
+            incidents_sent.append((name, incident["sourceIp"]))
+        await asyncio.sleep(snapshot_interval)
+    # Дожидаемся подтверждения всего отправленного
+    while client.pending or client.unacked or not client.connected:
+        await asyncio.sleep(0.05)
+    task.cancel()
+    return client, full_bytes, snapshot
+
+
+async def main():
+    agent_module.RECONNECT_MIN_DELAY = 0.2
+    server = FleetServer(token="secret")
+    await server.start("127.0.0.1", port)
+    incidents_sent = []
+    with tempfile.TemporaryDirectory() as spool_dir:
+        agents = asyncio.gather(*(run_agent(f"host{i}", spool_dir, incidents_sent) for i in range(num_agents)))
+
+        # Обрыв связи посередине: агенты копят данные в очереди на диске
+        await asyncio.sleep(num_snapshots * snapshot_interval / 3)
+        await server.close()
+        await asyncio.sleep(0.5)
+        spooled = sum(1 for path in Path(spool_dir).glob("*.ndjson") for _ in path.open())
+        await server.start("127.0.0.1", port)
+
+        started = time.perf_counter()
+        results = await agents
+        elapsed = time.perf_counter() - started
+    await server.close()
+
+    view = server.hosts_view()
+    received = {(incident["host"], incident["sourceIp"]) for incident in server.incidents_view(limit=100000)}
+    sent_bytes = sum(client.sent_bytes for client, _, _ in results)
+    full_bytes = sum(full for _, full, _ in results)
+    consistent = all(
+        json.loads(json.dumps(last)) == {**server.hosts[client.name].snapshot}
+        for client, _, last in results
+    )
+    print(f"Агентов: {num_agents}, снимков от каждого: {num_snapshots}, в очереди на диске во время обрыва: {spooled}")
+    print(f"Хостов на сервере: {view['totals']['hosts']}, инцидентов доставлено: {len(received)} из {len(set(incidents_sent))}")
+    print(f"Последний снимок совпадает на всех хостах: {consistent}")
+    print(f"Отправлено {sent_bytes / 1024:.0f} КБ вместо {full_bytes / 1024:.0f} КБ полными снимками ({sent_bytes / full_bytes:.1%})")
+    print(f"Досылка после восстановления связи: {elapsed:.2f} сек")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
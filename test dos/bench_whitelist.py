@@ -0,0 +1,74 @@
+import importlib.util
+import ipaddress
+import random
+import time
+from pathlib import Path
+
+# Загружаем модуль напрямую, чтобы не поднимать всё приложение (бот, настройки, сниффер)
+spec = importlib.util.spec_from_file_location(
+    "ip_prefix", Path(__file__).resolve().parent.parent / "app" / "utils" / "ip_prefix.py"
+)
+ip_prefix = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(ip_prefix)
+
+# Настройки: белый список как у типичной установки — диапазоны CDN и облаков,
+# подсети своих площадок и отдельные адреса серверов; в потоке в основном
+# внешние адреса, совпадения составляют небольшую долю
+num_provider_ranges = 30   # Широкие диапазоны (/12–/22)
+num_site_subnets = 500     # Подсети площадок (/24–/28)
+num_hosts = 2_000          # Отдельные адреса (/32)
+num_packets = 200_000      # Количество проверяемых адресов
+num_sources = 50_000       # Количество уникальных источников в потоке
+whitelisted_share = 0.05   # Доля пакетов от адресов из белого списка
+
+
+def random_network(lengths):
+    # Только публичные адреса: 11.0.0.0–223.255.255.255
+    addr = random.randint(0x0B000000, 0xDFFFFFFF)
+    return ipaddress.IPv4Network((addr, random.choice(lengths)), strict=False)
+
+
+def old_is_whitelisted(ip, whitelist):
+    # Прежняя реализация: новые объекты ipaddress на каждую запись для каждого пакета
+    for net in whitelist:
+        if ipaddress.IPv4Address(ip) in ipaddress.IPv4Network(net):
+            return True
+    return False
+
+
+def run(name, check, packets):
+    start = time.perf_counter()
+    hits = 0
+    for ip in packets:
+        if check(ip):
+            hits += 1
+    elapsed = time.perf_counter() - start
+    print(f"{name}: {len(packets) / elapsed:,.0f} пакетов/сек, совпадений {hits} из {len(packets)}")
+
+
+if __name__ == "__main__":
+    random.seed(1)
+    networks = (
+        [random_network((12, 13, 14, 16, 18, 20, 22)) for _ in range(num_provider_ranges)]
+        + [random_network((24, 25, 26, 27, 28)) for _ in range(num_site_subnets)]
+        + [random_network((32,)) for _ in range(num_hosts)]
+    )
+    whitelist = [str(net) for net in networks]
+    matcher = ip_prefix.PrefixMatcher(whitelist)
+
+    # Внешние источники, которые не входят в белый список, и источники из него
+    external = []
+    while len(external) < num_sources:
+        ip = str(ipaddress.IPv4Address(random.randint(0x0B000000, 0xDFFFFFFF)))
+        if ip not in matcher:
+            external.append(ip)
+    trusted = [str(net[random.randrange(net.num_addresses)]) for net in random.sample(networks, 1000)]
+    packets = [
+        random.choice(trusted) if random.random() < whitelisted_share else random.choice(external)
+        for _ in range(num_packets)
+    ]
+
+    print(f"Белый список: {len(whitelist)} записей, длин префиксов: {len(matcher._v4)}")
+    # Старую реализацию гоняем на малой выборке, иначе тест займёт десятки минут
+    run("До (линейный перебор)", lambda ip: old_is_whitelisted(ip, whitelist), packets[:200])
+    run("После (таблицы по длинам префикса)", lambda ip: ip in matcher, packets)
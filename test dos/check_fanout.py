@@ -0,0 +1,73 @@
+import os
+import signal
+import socket
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+# Пути как в Docker: PYTHONPATH=/app и рабочий каталог /app/app
+ROOT = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT), str(ROOT / "app")]
+
+from app.services import fanout_capture
+from app.services.fanout_capture import FanoutSniffer
+from app.utils.ip_prefix import PrefixMatcher
+
+# Проверка fanout-захвата на loopback (нужны права на raw-сокеты, например root):
+# все отправленные UDP-датаграммы должны быть посчитаны ровно один раз, и после
+# аварийного завершения процесса захвата его доля трафика снова учитывается.
+
+# Настройки
+interface = "lo"
+num_workers = 3
+num_datagrams = 1000
+flush_interval = 0.1
+
+counted = Counter()
+
+
+def on_deltas(deltas):
+    for counts in deltas.values():
+        counted.update(counts)
+
+
+def send_datagrams(count):
+    counted.clear()
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    for index in range(count):
+        # Разные порты источника — разные потоки, они расходятся по процессам
+        sender.sendto(b"x" * 32, ("127.0.0.1", 9000 + index % 50))
+    sender.close()
+    # Процесс отправляет дельты после очередного recv или таймаута сокета (0.5 сек)
+    deadline = time.monotonic() + 3
+    while sum(counted.values()) < count and time.monotonic() < deadline:
+        time.sleep(flush_interval)
+    time.sleep(flush_interval * 5)
+    return sum(counted.values())
+
+
+if __name__ == "__main__":
+    fanout_capture.RESTART_DELAY = 1
+
+    try:
+        FanoutSniffer(iface="no-such-iface0", prn=on_deltas, whitelist=PrefixMatcher([])).start()
+        print("Несуществующий интерфейс: ошибка не поднята")
+    except OSError as e:
+        print(f"Несуществующий интерфейс: OSError ({e})")
+
+    sniffer = FanoutSniffer(iface=interface, prn=on_deltas, whitelist=PrefixMatcher([]), workers=num_workers, flush_interval=flush_interval)
+    sniffer.start()
+    print(f"Процессов готово: {len(sniffer.ready)} из {num_workers}")
+    print(f"Отправлено {num_datagrams}, посчитано {send_datagrams(num_datagrams)}")
+
+    # Аварийно завершаем один процесс: агрегатор должен перезапустить его
+    victim = sniffer.processes[0]
+    os.kill(victim.pid, signal.SIGKILL)
+    deadline = time.monotonic() + fanout_capture.RESTART_DELAY + 10
+    while (sniffer.restarts == 0 or len(sniffer.ready) < num_workers) and time.monotonic() < deadline:
+        time.sleep(0.1)
+    print(f"После SIGKILL: перезапусков {sniffer.restarts}, процессов готово {len(sniffer.ready)} из {num_workers}")
+    print(f"Отправлено {num_datagrams}, посчитано {send_datagrams(num_datagrams)}")
+
+    sniffer.stop()
@@ -0,0 +1,11 @@
+import os
+import sys
+from pathlib import Path
+
+# Пути как в Docker: PYTHONPATH=/app и рабочий каталог /app/app
+ROOT = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT), str(ROOT / "app")]
+os.chdir(ROOT / "app")
+
+# Генераторы нагрузки работают бесконечно и запускаются вручную, не через pytest
+collect_ignore = ["test_http.py", "test_syn.py", "test_udp.py"]
@@ -0,0 +1,100 @@
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Поддельный Docker Engine API для проверки сбора метрик без Docker:
+# список контейнеров, inspect и разовая статистика (stream=false) с задержкой.
+# Каждый 4-й контейнер остановлен. Запуск отдельно: python fake_docker.py 40 1.0
+
+
+def container_id(index):
+    return f"c{index:03d}".ljust(64, "0")
+
+
+class FakeDocker:
+    def __init__(self, containers=40, delay=1.0, slow=(), slow_delay=10.0, port=2375):
+        self.containers = containers
+        self.delay = delay  # Ответ на запрос статистики (сек)
+        self.slow = set(slow)  # Номера контейнеров, отвечающих slow_delay секунд
+        self.slow_delay = slow_delay
+        self.port = port
+        self.usage = {}
+        self.server = None
+
+    def summary(self, index):
+        return {
+            "Id": container_id(index), "Names": [f"/svc{index}"], "Image": "img", "Labels": {},
+            "State": "running" if index % 4 else "exited", "Status": "Up",
+        }
+
+    def inspect(self, index):
+        data = self.summary(index)
+        data["Name"] = f"/svc{index}"
+        data["State"] = {"Status": data["State"], "Running": data["State"] == "running", "StartedAt": "2026-01-01T00:00:00.000Z"}
+        data["Config"] = {"Image": "img", "Labels": {}}
+        return data
+
+    def stats(self, index):
+        usage = self.usage[index] = self.usage.get(index, 0) + 10 ** 9
+        return {
+            "read": time.strftime("%Y-%m-%dT%H:%M:%S.000000000Z", time.gmtime()),
+            "cpu_stats": {"cpu_usage": {"total_usage": usage}, "system_cpu_usage": usage * 10, "online_cpus": 2},
+            "precpu_stats": {"cpu_usage": {"total_usage": usage - 10 ** 9}, "system_cpu_usage": usage * 10 - 10 ** 10, "online_cpus": 2},
+            "memory_stats": {"usage": 100 * 2 ** 20, "limit": 1000 * 2 ** 20},
+            "networks": {"eth0": {"rx_bytes": usage // 1000, "rx_packets": 10, "tx_bytes": 5, "tx_packets": 1}},
+            "blkio_stats": {"io_service_bytes_recursive": [{"major": 8, "minor": 0, "op": "read", "value": usage // 100}]},
+        }
+
+    def handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def send_json(self, data, status=200):
+                body = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                parts = self.path.split("?")[0].strip("/").split("/")
+                if parts and parts[0].startswith("v1"):
+                    parts = parts[1:]
+                if parts == ["version"]:
+                    return self.send_json({"ApiVersion": "1.43", "Version": "24.0"})
+                if parts == ["containers", "json"]:
+                    return self.send_json([fake.summary(index) for index in range(fake.containers)])
+                if len(parts) == 3 and parts[0] == "containers":
+                    index = int(parts[1][1:4])
+                    if parts[2] == "json":
+                        return self.send_json(fake.inspect(index))
+                    if parts[2] == "stats":
+                        time.sleep(fake.slow_delay if index in fake.slow else fake.delay)
+                        return self.send_json(fake.stats(index))
+                self.send_json({"message": "not found"}, 404)
+
+        return Handler
+
+    def start(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", self.port), self.handler())
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f"tcp://127.0.0.1:{self.port}"
+
+    def stop(self):
+        self.server.shutdown()
+
+
+if __name__ == "__main__":
+    containers = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    delay = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    print(f"Поддельный Docker API на {FakeDocker(containers, delay).start()}: {containers} контейнеров, статистика за {delay} сек")
+    threading.Event().wait()
@@ -0,0 +1,142 @@
+import pytest
+
+from app.services.container_rates import ContainerRates, sample_time
+
+# Скорости контейнера по двум синтетическим образцам docker stats
+
+
+def sample(read, cpu, system, rx=0, tx=0, rx_packets=0, tx_packets=0, blk_read=0, blk_write=0, online_cpus=2, precpu=(0, 0)):
+    return {
+        "read": read,
+        "cpu_stats": {"cpu_usage": {"total_usage": cpu}, "system_cpu_usage": system, "online_cpus": online_cpus},
+        "precpu_stats": {"cpu_usage": {"total_usage": precpu[0]}, "system_cpu_usage": precpu[1]},
+        "networks": {
+            "eth0": {"rx_bytes": rx, "tx_bytes": tx, "rx_packets": rx_packets, "tx_packets": tx_packets},
+        },
+        "blkio_stats": {
+            "io_service_bytes_recursive": [
+                {"major": 8, "minor": 0, "op": "Read", "value": blk_read},
+                {"major": 8, "minor": 0, "op": "Write", "value": blk_write},
+            ],
+        },
+    }
+
+
+T0 = "2024-05-01T12:00:00.000000000Z"
+T2 = "2024-05-01T12:00:02.000000000Z"
+
+BASE = sample(T0, cpu=1_000, system=100_000, rx=1_000, tx=500, rx_packets=10, tx_packets=5, blk_read=4096, blk_write=8192)
+
+
+@pytest.mark.parametrize(
+    "second, expected",
+    [
+        # CPU: 5000 из 100000 системных тиков на 2 ядрах = 10%, остальное — за 2 секунды
+        (
+            sample(T2, cpu=6_000, system=200_000, rx=3_000, tx=1_500, rx_packets=30, tx_packets=15, blk_read=8192, blk_write=16384),
+            {
+                "cpuPercent": 10.0,
+                "network": {"rxBytesPerSec": 1000.0, "txBytesPerSec": 500.0, "rxPacketsPerSec": 10.0, "txPacketsPerSec": 5.0},
+                "blockIO": {"readBytesPerSec": 2048.0, "writeBytesPerSec": 4096.0},
+            },
+        ),
+        # Простой: счётчики не изменились
+        (
+            sample(T2, cpu=1_000, system=200_000, rx=1_000, tx=500, rx_packets=10, tx_packets=5, blk_read=4096, blk_write=8192),
+            {
+                "cpuPercent": 0.0,
+                "network": {"rxBytesPerSec": 0.0, "txBytesPerSec": 0.0, "rxPacketsPerSec": 0.0, "txPacketsPerSec": 0.0},
+                "blockIO": {"readBytesPerSec": 0.0, "writeBytesPerSec": 0.0},
+            },
+        ),
+        # Контейнер перезапущен: счётчики пошли назад, скорости за интервал не считаются
+        (
+            sample(T2, cpu=200, system=200_000, rx=100, tx=50, rx_packets=1, tx_packets=1),
+            {"cpuPercent": 0.0},
+        ),
+        # Назад пошёл только один счётчик сети
+        (
+            sample(T2, cpu=6_000, system=200_000, rx=3_000, tx=100, rx_packets=30, tx_packets=15, blk_read=8192, blk_write=16384),
+            {"cpuPercent": 0.0},
+        ),
+        # Время образца не сдвинулось
+        (
+            sample(T0, cpu=6_000, system=200_000, rx=3_000, tx=1_500, rx_packets=30, tx_packets=15, blk_read=8192, blk_write=16384),
+            {"cpuPercent": 0.0},
+        ),
+    ],
+    ids=["rates", "idle", "counters-backwards", "one-counter-backwards", "same-time"],
+)
+def test_two_samples(second, expected):
+    rates = ContainerRates()
+    rates.update("c1", BASE)
+    assert rates.update("c1", second) == expected
+
+
+def test_reset_sample_becomes_new_baseline():
+    rates = ContainerRates()
+    rates.update("c1", BASE)
+    rates.update("c1", sample(T2, cpu=200, system=200_000))
+    third = rates.update("c1", sample("2024-05-01T12:00:04.000000000Z", cpu=10_200, system=300_000, rx=2_000))
+    assert third["cpuPercent"] == 20.0
+    assert third["network"]["rxBytesPerSec"] == 1000.0
+
+
+@pytest.mark.parametrize(
+    "cpu_stats, expected",
+    [
+        ({"online_cpus": 4}, 20.0),
+        ({"cpu_usage": {"percpu_usage": [0, 0, 0]}}, 15.0),
+        ({}, 5.0),
+    ],
+    ids=["online_cpus", "percpu_usage", "default-1"],
+)
+def test_first_sample_uses_precpu_and_cpu_count(cpu_stats, expected):
+    # 5000 из 100000 системных тиков относительно precpu_stats
+    stats = {
+        "read": T0,
+        "cpu_stats": {**cpu_stats, "cpu_usage": {"total_usage": 6_000, **cpu_stats.get("cpu_usage", {})}, "system_cpu_usage": 200_000},
+        "precpu_stats": {"cpu_usage": {"total_usage": 1_000}, "system_cpu_usage": 100_000},
+    }
+    assert ContainerRates().update("c1", stats) == {"cpuPercent": expected}
+
+
+def test_first_sample_without_precpu():
+    stats = sample(T0, cpu=6_000, system=200_000)
+    del stats["precpu_stats"]
+    # Без precpu_stats дельта равна всему счётчику
+    assert ContainerRates().update("c1", stats) == {"cpuPercent": 6.0}
+
+
+def test_same_sample_returns_cached_rates():
+    rates = ContainerRates()
+    rates.update("c1", BASE)
+    second = sample(T2, cpu=6_000, system=200_000, rx=1_000, tx=500, rx_packets=10, tx_packets=5, blk_read=4096, blk_write=8192)
+    first_result = rates.update("c1", second)
+    # Тот же объект образца не считается новым интервалом нулевой длины
+    assert rates.update("c1", second) is first_result
+    assert first_result["cpuPercent"] == 10.0
+    # Равный, но другой объект — новый образец с тем же временем, то есть сброс
+    assert rates.update("c1", dict(second)) == {"cpuPercent": 0.0}
+
+
+def test_prune_drops_stopped_containers():
+    rates = ContainerRates()
+    rates.update("c1", BASE)
+    rates.update("c2", BASE)
+    rates.prune(["c2"])
+    assert list(rates.states) == ["c2"]
+
+
+@pytest.mark.parametrize(
+    "read, expected",
+    [
+        ("2024-05-01T12:00:02.500000000Z", 1714564802.5),
+        ("2024-05-01T12:00:02Z", 1714564802.0),
+        ("0001-01-01T00:00:00Z", 42.0),
+        ("garbage", 42.0),
+        (None, 42.0),
+    ],
+)
+def test_sample_time(read, expected):
+    assert sample_time({"read": read}, 42.0) == pytest.approx(expected)
@@ -0,0 +1,176 @@
+import asyncio
+import json
+import time
+
+from app.config import settings
+from app.services import fleet
+from app.services.agent import PROTOCOL_VERSION, AgentClient, Spool, encode
+from app.services.fleet import FleetHost, FleetServer
+from app.utils.delta import apply, diff, normalize
+
+# Режим агента: разницы снимков, очередь на диске и приём пачек центральным сервером
+
+OLD = {
+    "system": {"cpuPercent": 10.0, "memory": {"usage": 100, "total": 1000}, "load": [1, 2, 3]},
+    "containers": {"a": {"state": "running"}, "b": {"state": "exited"}},
+    "dos": {"activeIncidents": 0},
+}
+NEW = {
+    "system": {"cpuPercent": 55.5, "memory": {"usage": 100, "total": 1000}, "load": [1, 2, 4]},
+    "containers": {"a": {"state": "running"}, "c": {"state": "running"}},
+    "dos": {"activeIncidents": 2},
+}
+
+
+def make_incident(source_ip, time_start=1000.0, status=True):
+    return {"sourceIp": source_ip, "type": "SYN Flood", "timeStart": time_start, "status": status, "count": 500}
+
+
+def test_diff_apply_round_trip():
+    changes, removed = diff(OLD, NEW)
+    assert changes == {
+        "system": {"cpuPercent": 55.5, "load": [1, 2, 4]},
+        "containers": {"c": {"state": "running"}},
+        "dos": {"activeIncidents": 2},
+    }
+    assert removed == [["containers", "b"]]
+    # Получатель восстанавливает новый снимок из старого и разницы, прошедших через JSON
+    base = normalize(OLD)
+    assert apply(base, *json.loads(json.dumps([changes, removed]))) == NEW
+    assert diff(NEW, NEW) == ({}, [])
+
+
+def test_diff_replaces_changed_types():
+    old = {"value": {"nested": 1}, "gone": {"x": 1}}
+    new = {"value": 5}
+    changes, removed = diff(old, new)
+    assert apply(normalize(old), changes, removed) == new
+
+
+def test_normalize_matches_receiver():
+    assert normalize({1: (1, 2)}) == {"1": [1, 2]}
+
+
+def test_spool_drops_snapshots_over_limit(tmp_path):
+    spool = Spool(str(tmp_path / "spool.ndjson"), max_bytes=200)
+    snapshot = {"kind": "snapshot", "time": 1.0, "full": True, "set": {"padding": "x" * 100}}
+    incidents = {"kind": "incidents", "data": [make_incident("1.2.3.4")]}
+    spool.append([snapshot, snapshot, incidents, snapshot])
+    # Снимки сверх лимита отброшены, инциденты записаны всегда
+    assert [item["kind"] for item in spool.read()] == ["snapshot", "incidents"]
+    assert spool.dropped == 2
+
+    with spool.path.open("ab") as file:
+        file.write(b'{"kind": "incid')  # Строка, оборванная при аварийном завершении
+    assert len(spool.read()) == 2
+    spool.clear()
+    assert spool.read() == [] and spool.dropped == 0
+
+
+def test_host_drops_repeated_incidents():
+    host = FleetHost("web-1")
+    first = host.add_incidents([make_incident("1.2.3.4"), make_incident("5.6.7.8")])
+    assert [incident["host"] for incident in first] == ["web-1", "web-1"]
+    # Повтор пачки после обрыва и завершение того же инцидента
+    again = host.add_incidents([make_incident("1.2.3.4"), make_incident("1.2.3.4", status=False)])
+    assert again == [dict(make_incident("1.2.3.4", status=False), host="web-1")]
+    assert len(host.incidents) == 3
+
+
+async def exchange(port, lines):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(encode({"type": "hello", "host": "web-1", "version": PROTOCOL_VERSION}))
+    replies = [json.loads(await reader.readline())]
+    for line in lines:
+        writer.write(encode(line))
+        await writer.drain()
+        reply = await reader.readline()
+        replies.append(json.loads(reply) if reply else None)
+    writer.close()
+    return replies
+
+
+def test_server_applies_batches_and_survives_malformed_data():
+    notified = []
+
+    async def on_incidents(incidents):
+        notified.extend(incidents)
+
+    async def scenario():
+        server = FleetServer(on_incidents=on_incidents)
+        await server.start("127.0.0.1", 0)
+        port = server.server.sockets[0].getsockname()[1]
+        changes, removed = diff(OLD, NEW)
+        replies = await exchange(port, [
+            {"type": "batch", "seq": 1, "items": [
+                {"kind": "snapshot", "time": 1000.0, "full": True, "set": OLD},
+                {"kind": "incidents", "data": [make_incident("1.2.3.4")]},
+            ]},
+            {"type": "batch", "seq": 2, "items": [
+                {"kind": "snapshot", "time": 1001.0, "set": changes, "unset": removed},
+                {"kind": "incidents", "data": [make_incident("1.2.3.4")]},
+            ]},
+        ])
+        # data не список инцидентов: соединение обрывается, сервер продолжает работу
+        broken = await exchange(port, [{"type": "batch", "seq": 3, "items": [{"kind": "incidents", "data": 5}]}])
+        host = server.hosts["web-1"]
+        for _ in range(100):
+            if not host.connections:
+                break
+            await asyncio.sleep(0.01)
+        await server.close()
+        return replies, broken, host
+
+    replies, broken, host = asyncio.run(scenario())
+    assert replies == [{"type": "welcome"}, {"type": "ack", "seq": 1}, {"type": "ack", "seq": 2}]
+    assert broken == [{"type": "welcome"}, None]
+    assert host.snapshot == NEW and host.snapshot_time == 1001.0
+    assert host.connections == 0 and host.batches == 3
+    assert [incident["sourceIp"] for incident in notified] == ["1.2.3.4"]
+
+
+def test_put_while_draining_spool_is_not_lost(tmp_path):
+    spooled, late = make_incident("1.2.3.4"), make_incident("5.6.7.8")
+
+    async def scenario():
+        server = FleetServer()
+        await server.start("127.0.0.1", 0)
+        port = server.server.sockets[0].getsockname()[1]
+        client = AgentClient(f"127.0.0.1:{port}", "web-1", spool_path=str(tmp_path / "spool.ndjson"), batch_interval=0.05)
+        client.put("incidents", [spooled])
+
+        loop = asyncio.get_running_loop()
+        read = client.spool.read
+
+        def slow_read():
+            # Инцидент приходит, пока очередь с диска читается в потоке
+            items = read()
+            loop.call_soon_threadsafe(client.put, "incidents", [late])
+            time.sleep(0.1)
+            return items
+
+        client.spool.read = slow_read
+        task = asyncio.create_task(client.run())
+        for _ in range(200):
+            host = server.hosts.get("web-1")
+            if host is not None and len(host.incidents) == 2:
+                break
+            await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await server.close()
+        return server.hosts["web-1"]
+
+    host = asyncio.run(scenario())
+    assert [incident["sourceIp"] for incident in host.incidents] == ["1.2.3.4", "5.6.7.8"]
+
+
+def test_fleet_refuses_network_listen_without_token(monkeypatch):
+    assert fleet.is_loopback("127.0.0.1") and fleet.is_loopback("::1") and fleet.is_loopback("localhost")
+    assert not fleet.is_loopback("0.0.0.0") and not fleet.is_loopback("example.org")
+
+    monkeypatch.setattr(settings, "fleet_token", "")
+    monkeypatch.setattr(fleet, "FLEET_LISTEN_HOST", "0.0.0.0")
+    monkeypatch.setattr(fleet, "FLEET_LISTEN_PORT", 0)
+    asyncio.run(fleet.serve_fleet())
+    assert fleet.fleet.server is None
@@ -0,0 +1,145 @@
+import sqlite3
+
+import pytest
+
+from app.utils.incident_store import IncidentStore, decode_cursor, encode_cursor, source_condition
+
+# Фильтры и постраничная выдача /dos/get-dos по ключу (timeStart, id)
+
+# Таблица incidents до появления колонок диапазона адресов
+OLD_SCHEMA = """
+CREATE TABLE incidents (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sourceIp TEXT NOT NULL,
+    type TEXT NOT NULL,
+    timeStart REAL NOT NULL,
+    timeLastPacket REAL NOT NULL,
+    status INTEGER NOT NULL,
+    notification INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    rate REAL,
+    peakRate REAL,
+    countError INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+SOURCES = ["10.0.0.1", "10.0.0.77", "10.0.1.5", "10.0.0.200", "192.168.1.1", "2001:db8::1"]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = IncidentStore(tmp_path / "incidents.db")
+    incidents = []
+    for index in range(30):
+        incidents.append({
+            "sourceIp": SOURCES[index % len(SOURCES)],
+            # Пары записей с одинаковым timeStart проверяют вторую часть ключа курсора
+            "timeStart": 1000.0 + index // 2,
+            "timeLastPacket": 1010.0 + index,
+            "status": index % 3 == 0,
+            "notification": True,
+            "type": "UDP Flood" if index % 2 else "SYN Flood",
+            "count": index,
+        })
+    store.insert_many(incidents)
+    yield store
+    store.close()
+
+
+def read_pages(store, limit, **filters):
+    pages, cursor = [], None
+    while True:
+        page, cursor = store.query(limit=limit, cursor=cursor, **filters)
+        pages.append([incident["count"] for incident in page])
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_pages_cover_history_without_gaps(store, descending):
+    pages = read_pages(store, 7, descending=descending)
+    assert [len(page) for page in pages] == [7, 7, 7, 7, 2]
+    flat = [count for page in pages for count in page]
+    assert flat == (list(range(29, -1, -1)) if descending else list(range(30)))
+
+
+def test_exact_page_size_ends_with_empty_page(store):
+    pages = read_pages(store, 10)
+    assert [len(page) for page in pages] == [10, 10, 10, 0]
+
+
+def test_filters(store):
+    incidents, cursor = store.query(since=1005.0, until=1007.0, attack_type="SYN Flood")
+    assert [incident["count"] for incident in incidents] == [10, 12]
+    assert cursor is None
+
+
+def test_source_filters(store):
+    exact, _ = store.query(source="10.0.0.1")
+    assert {incident["sourceIp"] for incident in exact} == {"10.0.0.1"}
+    subnet, _ = store.query(source="10.0.0.0/24")
+    assert {incident["sourceIp"] for incident in subnet} == {"10.0.0.1", "10.0.0.77", "10.0.0.200"}
+    # Префикс не по границе октета — тот же диапазон по индексу
+    unaligned, _ = store.query(source="10.0.0.64/26")
+    assert {incident["sourceIp"] for incident in unaligned} == {"10.0.0.77"}
+    ipv6, _ = store.query(source="2001:db8::/32")
+    assert {incident["sourceIp"] for incident in ipv6} == {"2001:db8::1"}
+
+
+def test_subnet_incidents_match_only_enclosing_queries(store):
+    store.insert_many([
+        {"sourceIp": "10.0.0.0/24", "type": "SYN Flood", "timeStart": 2000.0, "count": 1},
+        {"sourceIp": "10.0.0.0/16", "type": "SYN Flood", "timeStart": 2001.0, "count": 2},
+        {"sourceIp": "2001:db8:0:1::/64", "type": "SYN Flood", "timeStart": 2002.0, "count": 3},
+    ])
+    inside, _ = store.query(source="10.0.0.0/16", since=2000.0)
+    assert [incident["sourceIp"] for incident in inside] == ["10.0.0.0/24", "10.0.0.0/16"]
+    # /16 не лежит внутри /24, в выборку по /24 попадает только /24
+    narrow, _ = store.query(source="10.0.0.0/24", since=2000.0)
+    assert [incident["sourceIp"] for incident in narrow] == ["10.0.0.0/24"]
+    ipv6, _ = store.query(source="2001:db8::/32", since=2000.0)
+    assert [incident["sourceIp"] for incident in ipv6] == ["2001:db8:0:1::/64"]
+
+
+def test_ipv6_prefix_uses_range_index(store):
+    plan = store.connection.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM incidents WHERE " + source_condition("2001:db8::/32")[0],
+        source_condition("2001:db8::/32")[1],
+    ).fetchall()
+    assert any("incidents_source_range" in row["detail"] for row in plan)
+
+
+def test_old_database_is_migrated(tmp_path):
+    path = tmp_path / "incidents.db"
+    connection = sqlite3.connect(str(path))
+    connection.executescript(OLD_SCHEMA)
+    connection.execute(
+        "INSERT INTO incidents (sourceIp, type, timeStart, timeLastPacket, status, notification, count) "
+        "VALUES ('2001:db8::5', 'UDP Flood', 1000, 1010, 0, 1, 10), ('192.0.2.9', 'UDP Flood', 1001, 1011, 0, 1, 20)"
+    )
+    connection.commit()
+    connection.close()
+
+    store = IncidentStore(path)
+    ipv6, _ = store.query(source="2001:db8::/64")
+    ipv4, _ = store.query(source="192.0.2.0/24")
+    assert [incident["count"] for incident in ipv6] == [10]
+    assert [incident["count"] for incident in ipv4] == [20]
+    store.close()
+
+
+def test_invalid_source_is_rejected(store):
+    with pytest.raises(ValueError):
+        store.query(source="10.0.0.0/33")
+
+
+def test_subnet_filter_pages(store):
+    pages = read_pages(store, 2, source="10.0.0.0/25")
+    flat = [count for page in pages for count in page]
+    assert flat == [count for count in range(30) if SOURCES[count % len(SOURCES)] in ("10.0.0.1", "10.0.0.77")]
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(1000.25, 42)) == (1000.25, 42)
+    with pytest.raises(ValueError):
+        decode_cursor("bm90LWEtY3Vyc29y")
@@ -0,0 +1,46 @@
+from app.utils.incident_store import IncidentStore
+
+# Политика хранения: возраст, число записей и предел занятого места в базе
+
+
+def make_incidents(count, start=1000.0):
+    return [
+        {"sourceIp": f"10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256}", "type": "SYN Flood",
+         "timeStart": start + index, "timeLastPacket": start + index + 30, "count": 1000, "rate": 200.0, "peakRate": 250.0}
+        for index in range(count)
+    ]
+
+
+def test_age_and_row_limits_keep_unrolled_rows(tmp_path):
+    store = IncidentStore(tmp_path / "incidents.db")
+    store.insert_many(make_incidents(100))
+    store.rollup()
+    store.insert_many(make_incidents(10, start=0.0))  # Старые, но ещё не в сводках
+    assert store.apply_retention(max_age=1000, max_rows=None, hourly_max_age=None, now=2050.0) == 50
+    assert store.apply_retention(max_age=None, max_rows=20, hourly_max_age=None, now=2050.0) == 40
+    assert store.count() == 20
+    assert min(incident["timeStart"] for incident in store.all()) == 0.0
+    store.close()
+
+
+def test_size_limit(tmp_path):
+    store = IncidentStore(tmp_path / "incidents.db")
+    store.insert_many(make_incidents(20_000))
+    store.rollup()
+    full = store.used_bytes()
+    limit = full // 2
+
+    deleted = store.apply_retention(None, None, None, now=0.0, max_bytes=limit)
+    assert deleted > 0 and store.used_bytes() <= limit
+    # Удалены самые старые инциденты, сводки сохранились
+    assert store.all()[0]["timeStart"] == 1000.0 + deleted
+    assert store.rollups(period="day")
+
+    # Новые записи занимают освобождённые страницы: файл не растёт сверх прежнего
+    size = (tmp_path / "incidents.db").stat().st_size
+    store.insert_many(make_incidents(deleted // 2, start=100_000.0))
+    store.rollup()
+    store.apply_retention(None, None, None, now=0.0, max_bytes=limit)
+    assert store.used_bytes() <= limit
+    assert (tmp_path / "incidents.db").stat().st_size <= size
+    store.close()
@@ -0,0 +1,87 @@
+import asyncio
+import json
+import threading
+
+from app.utils import data_handler
+from app.utils.incident_store import IncidentStore
+
+# История инцидентов в SQLite: формат записей, сохранность после переоткрытия и перенос data.json
+
+
+def make_incident(source_ip, time_start, attack_type="SYN Flood", **fields):
+    incident = {
+        "sourceIp": source_ip, "timeStart": time_start, "timeLastPacket": time_start + 30,
+        "notification": True, "status": False, "type": attack_type, "count": 1000,
+    }
+    incident.update(fields)
+    return incident
+
+
+def test_round_trip_keeps_dict_format(tmp_path):
+    store = IncidentStore(tmp_path / "incidents.db")
+    full = make_incident("1.2.3.4", 1000.0, rate=120.5, peakRate=300.0, countError=7)
+    legacy = make_incident("5.6.7.8", 900.0)
+    assert store.insert_many([full, legacy]) == 2
+    # Порядок по timeStart; поля без значения (старый data.json) не появляются
+    assert store.all() == [legacy, full]
+    assert store.count() == 2
+
+
+def test_history_survives_reopen(tmp_path):
+    path = tmp_path / "incidents.db"
+    store = IncidentStore(path)
+    for index in range(10):
+        store.insert(make_incident(f"10.0.0.{index}", 1000.0 + index))
+    store.close()
+
+    reopened = IncidentStore(path)
+    assert [incident["sourceIp"] for incident in reopened.all()] == [f"10.0.0.{index}" for index in range(10)]
+    reopened.clear()
+    assert reopened.count() == 0
+
+
+def test_migrate_json_once(tmp_path):
+    data_file = tmp_path / "data.json"
+    data_file.write_text(json.dumps([make_incident("1.2.3.4", 1000.0), {"broken": True}]), encoding="utf-8")
+    store = IncidentStore(tmp_path / "incidents.db")
+
+    assert store.migrate_json(data_file) == 1
+    assert not data_file.exists()
+    assert (tmp_path / "data.json.migrated").exists()
+    assert store.migrate_json(data_file) == 0
+    assert store.count() == 1
+
+
+def test_migrate_json_keeps_unreadable_file(tmp_path):
+    data_file = tmp_path / "data.json"
+    data_file.write_text("{not json", encoding="utf-8")
+    store = IncidentStore(tmp_path / "incidents.db")
+    assert store.migrate_json(data_file) == 0
+    assert data_file.exists()
+
+
+def test_store_opens_once_off_the_event_loop(tmp_path, monkeypatch):
+    (tmp_path / "data.json").write_text(json.dumps([make_incident("1.2.3.4", 1000.0)]), encoding="utf-8")
+    monkeypatch.setattr(data_handler, "DB_FILE", tmp_path / "incidents.db")
+    monkeypatch.setattr(data_handler, "DATA_FILE", tmp_path / "data.json")
+    monkeypatch.setattr(data_handler, "_store", None)
+    monkeypatch.setattr(data_handler, "_store_lock", asyncio.Lock())
+    threads = []
+    open_store = data_handler.open_store
+
+    def recording_open_store():
+        threads.append(threading.current_thread())
+        return open_store()
+
+    monkeypatch.setattr(data_handler, "open_store", recording_open_store)
+
+    async def scenario():
+        stores = await asyncio.gather(*(data_handler.get_store() for _ in range(3)))
+        return stores, await data_handler.load_dos_data()
+
+    stores, incidents = asyncio.run(scenario())
+    # Одно открытие на все одновременные обращения, и не в потоке цикла asyncio
+    assert len(threads) == 1 and threads[0] is not threading.main_thread()
+    assert stores[0] is stores[1] is stores[2]
+    assert [incident["sourceIp"] for incident in incidents] == ["1.2.3.4"]
+    stores[0].close()
@@ -0,0 +1,48 @@
+from app.services.incident_table import Incident, IncidentTable
+
+# Таблица активных инцидентов: поиск по (sourceIp, type), истечение по куче сроков
+
+
+def test_add_and_get():
+    table = IncidentTable(expiry_time=60)
+    incident = Incident("1.2.3.4", "SYN Flood", 1000.0, count=500, rate=100.0)
+    table.add(incident)
+    assert table.get("1.2.3.4", "SYN Flood") is incident
+    assert table.get("1.2.3.4", "UDP Flood") is None
+    assert len(table) == 1
+    assert list(table) == [incident]
+
+
+def test_pending_returned_once():
+    table = IncidentTable(expiry_time=60)
+    first = Incident("1.2.3.4", "SYN Flood", 1000.0, 500, 100.0)
+    second = Incident("5.6.7.8", "UDP Flood", 1000.5, 700, 140.0)
+    table.add(first)
+    table.add(second)
+    assert table.pop_pending() == [first, second]
+    assert table.pop_pending() == []
+
+
+def test_expiry_after_last_packet():
+    table = IncidentTable(expiry_time=60)
+    quiet = Incident("1.2.3.4", "SYN Flood", 1000.0, 500, 100.0)
+    extended = Incident("5.6.7.8", "SYN Flood", 1000.0, 500, 100.0)
+    table.add(quiet)
+    table.add(extended)
+    extended.timeLastPacket = 1050.0
+
+    assert table.pop_expired(1059.0) == []
+    assert table.pop_expired(1060.0) == [quiet]
+    # Продлённый инцидент переложен в куче со сроком 1110
+    assert table.pop_expired(1109.0) == []
+    assert table.get("5.6.7.8", "SYN Flood") is extended
+    assert table.pop_expired(1110.0) == [extended]
+    assert len(table) == 0 and table.heap == []
+
+
+def test_as_dict_keeps_count_error_only_in_sketch_mode():
+    exact = Incident("1.2.3.4", "SYN Flood", 1000.0, 500, 100.0).as_dict()
+    sketch = Incident("1.2.3.4", "SYN Flood", 1000.0, 500, 100.0, count_error=12).as_dict()
+    assert "countError" not in exact
+    assert sketch["countError"] == 12
+    assert exact["peakRate"] == 100.0 and exact["status"] is True
@@ -0,0 +1,44 @@
+from app.utils.ip_prefix import PrefixMatcher, source_prefix
+
+# Проверки белого списка: самый длинный префикс, IPv6 и некорректные записи
+
+
+def test_longest_prefix_wins():
+    matcher = PrefixMatcher(["10.0.0.0/8", "10.1.0.0/16", "10.1.2.3"])
+    assert matcher.match("10.1.2.3") == "10.1.2.3/32"
+    assert matcher.match("10.1.2.4") == "10.1.0.0/16"
+    assert matcher.match("10.200.0.1") == "10.0.0.0/8"
+    assert matcher.match("11.0.0.1") is None
+
+
+def test_host_bits_are_masked():
+    # Записи вида 192.168.1.77/24 принимаются как сеть 192.168.1.0/24
+    matcher = PrefixMatcher(["192.168.1.77/24"])
+    assert "192.168.1.1" in matcher
+    assert "192.168.2.1" not in matcher
+
+
+def test_ipv6_and_families_do_not_mix():
+    matcher = PrefixMatcher(["2001:db8::/32", "0.0.0.0/0"])
+    assert matcher.match("2001:db8:1::1") == "2001:db8::/32"
+    assert matcher.match("2001:db9::1") is None
+    assert matcher.match("8.8.8.8") == "0.0.0.0/0"
+
+
+def test_packed_and_int_lookup():
+    matcher = PrefixMatcher(["203.0.113.0/24"])
+    assert matcher.match_packed(bytes([203, 0, 113, 9])) == "203.0.113.0/24"
+    assert matcher.match_int(0xCB007109) == "203.0.113.0/24"
+    assert matcher.match_int(0xCB007209) is None
+
+
+def test_invalid_entries_are_reported():
+    matcher = PrefixMatcher(["10.0.0.0/8", "not-an-ip", "10.0.0.0/33"])
+    assert matcher.invalid == ["not-an-ip", "10.0.0.0/33"]
+    assert len(matcher) == 1
+    assert matcher.match("garbage") is None
+
+
+def test_source_prefix():
+    assert source_prefix("203.0.113.77", 24) == "203.0.113.0/24"
+    assert source_prefix("2001:db8:1:2::5", 64) == "2001:db8:1:2::/64"
@@ -0,0 +1,105 @@
+import struct
+
+import pytest
+
+from app.services.raw_capture import (
+    ETH_HLEN, HTTP_FLOOD, IPPROTO_TCP, IPPROTO_UDP, SYN_FLOOD, TCP_SYN, UDP_FLOOD, classify_packet, parse_frame,
+)
+from app.services.replay import HTTP_REQUEST, build_frame
+
+# Разбор кадров из буфера и классификация по детекторам
+
+TCP_ACK = 0x10
+TCP_PSH_ACK = 0x18
+IPPROTO_ICMP = 1
+
+
+def parse(frame: bytes, length=None):
+    parsed = parse_frame(memoryview(frame), len(frame) if length is None else length)
+    if parsed is None:
+        return None
+    src_ip, protocol, flags, dport, payload = parsed
+    return src_ip, protocol, flags, dport, bytes(payload)
+
+
+@pytest.mark.parametrize(
+    "frame, expected, attack_type",
+    [
+        (build_frame("203.0.113.7", IPPROTO_TCP, 443), ("203.0.113.7", IPPROTO_TCP, TCP_SYN, 443, b""), SYN_FLOOD),
+        (build_frame("203.0.113.7", IPPROTO_TCP, 443, flags=TCP_ACK), ("203.0.113.7", IPPROTO_TCP, TCP_ACK, 443, b""), None),
+        (build_frame("198.51.100.2", IPPROTO_UDP, 53, payload=b"query"), ("198.51.100.2", IPPROTO_UDP, 0, 53, b"query"), UDP_FLOOD),
+        (
+            build_frame("192.0.2.10", IPPROTO_TCP, 80, flags=TCP_PSH_ACK, payload=HTTP_REQUEST),
+            ("192.0.2.10", IPPROTO_TCP, TCP_PSH_ACK, 80, HTTP_REQUEST),
+            HTTP_FLOOD,
+        ),
+        # SYN на HTTP-порт относится к HTTP-флуду, как и запрос
+        (build_frame("192.0.2.10", IPPROTO_TCP, 8080), ("192.0.2.10", IPPROTO_TCP, TCP_SYN, 8080, b""), HTTP_FLOOD),
+        # Данные на HTTP-порту без GET/POST и ACK без данных ни к чему не относятся
+        (
+            build_frame("192.0.2.10", IPPROTO_TCP, 80, flags=TCP_PSH_ACK, payload=b"\x16\x03\x01"),
+            ("192.0.2.10", IPPROTO_TCP, TCP_PSH_ACK, 80, b"\x16\x03\x01"),
+            None,
+        ),
+        (build_frame("192.0.2.10", IPPROTO_TCP, 80, flags=TCP_ACK), ("192.0.2.10", IPPROTO_TCP, TCP_ACK, 80, b""), None),
+    ],
+    ids=["syn", "ack", "udp", "http-get", "http-syn", "http-not-request", "http-ack"],
+)
+def test_parse_and_classify(frame, expected, attack_type):
+    parsed = parse(frame)
+    assert parsed == expected
+    assert classify_packet(*parsed[1:]) == attack_type
+
+
+def test_ethernet_padding_is_not_payload():
+    # Короткие кадры дополняются до 60 байт: граница данных берётся из длины IP-пакета
+    frame = build_frame("203.0.113.7", IPPROTO_TCP, 443) + b"\x00" * 6
+    assert len(frame) == 60
+    assert parse(frame)[4] == b""
+
+
+def test_payload_cut_by_snaplen():
+    frame = build_frame("192.0.2.10", IPPROTO_TCP, 80, flags=TCP_PSH_ACK, payload=HTTP_REQUEST)
+    length = len(frame) - 10
+    parsed = parse(frame, length)
+    assert parsed[4] == HTTP_REQUEST[:-10]
+    assert classify_packet(*parsed[1:]) == HTTP_FLOOD
+
+
+@pytest.mark.parametrize(
+    "protocol, cut",
+    [
+        # Меньше Ethernet + минимального IP-заголовка
+        (IPPROTO_TCP, ETH_HLEN + 19),
+        # IP-заголовок целый, TCP-заголовок обрезан
+        (IPPROTO_TCP, ETH_HLEN + 20 + 19),
+        # IP-заголовок целый, UDP-заголовок обрезан
+        (IPPROTO_UDP, ETH_HLEN + 20 + 7),
+        (IPPROTO_TCP, 0),
+    ],
+    ids=["short-ip", "short-tcp", "short-udp", "empty"],
+)
+def test_truncated_frame(protocol, cut):
+    frame = build_frame("203.0.113.7", protocol, 80)
+    assert parse_frame(memoryview(frame), cut) is None
+    # Из обрезанного буфера (как при recvfrom_into в буфер большего размера) тоже
+    assert parse(frame[:cut]) is None
+
+
+@pytest.mark.parametrize("ethertype", [0x86DD, 0x0806, 0x8100], ids=["ipv6", "arp", "vlan"])
+def test_non_ipv4_frame(ethertype):
+    frame = bytearray(build_frame("203.0.113.7", IPPROTO_TCP, 80))
+    struct.pack_into("!H", frame, 12, ethertype)
+    assert parse(bytes(frame)) is None
+
+
+def test_other_protocols_and_fragments():
+    icmp = bytearray(build_frame("203.0.113.7", IPPROTO_UDP, 0))
+    icmp[ETH_HLEN + 9] = IPPROTO_ICMP
+    assert parse(bytes(icmp)) is None
+    assert classify_packet(IPPROTO_ICMP, 0, 0, b"") is None
+
+    # Не первый фрагмент: заголовка L4 в нём нет
+    fragment = bytearray(build_frame("203.0.113.7", IPPROTO_UDP, 53))
+    struct.pack_into("!H", fragment, ETH_HLEN + 6, 185)
+    assert parse(bytes(fragment)) is None
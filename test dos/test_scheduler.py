@@ -0,0 +1,195 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.scheduler import OVERRUN_QUEUE, OVERRUN_SKIP, CollectorScheduler, ScheduledCollector
+
+# Планировщик сборщиков: политика пропуска, таймаут, refresh и устаревание данных
+
+
+class FakeCollector:
+    """Сборщик, который возвращает номер запуска и ждёт gate, пока тот не открыт."""
+
+    def __init__(self):
+        self.gate = asyncio.Event()
+        self.calls = 0
+        self.running = 0
+        self.max_running = 0
+
+    async def __call__(self):
+        self.calls += 1
+        call = self.calls
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await self.gate.wait()
+        finally:
+            self.running -= 1
+        return call
+
+
+def make(fake, overrun=OVERRUN_SKIP, interval=1.0, timeout=1.0):
+    scheduler = CollectorScheduler()
+    collector = scheduler.add(ScheduledCollector("fake", fake, interval=interval, timeout=timeout, overrun=overrun))
+    return scheduler, collector
+
+
+def test_unknown_overrun_policy():
+    with pytest.raises(ValueError):
+        ScheduledCollector("fake", FakeCollector(), 1.0, 1.0, overrun="later")
+
+
+def test_overrun_skip():
+    async def scenario():
+        fake = FakeCollector()
+        scheduler, collector = make(fake, OVERRUN_SKIP)
+        task = scheduler._start(collector)
+        await asyncio.sleep(0)
+        # Пока запуск идёт, следующие по расписанию пропускаются
+        assert scheduler._start(collector) is task
+        assert scheduler._start(collector) is task
+        fake.gate.set()
+        await task
+        return fake, collector
+
+    fake, collector = asyncio.run(scenario())
+    assert fake.calls == 1 and collector.runs == 1
+    assert collector.overruns == 2 and not collector.queued
+    assert collector.value == 1
+
+
+def test_overrun_queue_runs_once_more():
+    async def scenario():
+        fake = FakeCollector()
+        scheduler, collector = make(fake, OVERRUN_QUEUE)
+        task = scheduler._start(collector)
+        await asyncio.sleep(0)
+        scheduler._start(collector)
+        scheduler._start(collector)
+        assert collector.queued
+        fake.gate.set()
+        await task
+        return fake, collector
+
+    fake, collector = asyncio.run(scenario())
+    # Два пропущенных запуска сливаются в один, сразу после текущего и не параллельно с ним
+    assert fake.calls == 2 and collector.runs == 2
+    assert fake.max_running == 1
+    assert collector.overruns == 2 and not collector.queued
+    assert collector.value == 2
+
+
+def test_schedule_skips_runs_while_collect_is_slow():
+    async def scenario():
+        fake = FakeCollector()
+        scheduler, collector = make(fake, OVERRUN_SKIP, interval=0.02)
+        runner = asyncio.create_task(scheduler.run())
+        await asyncio.sleep(0.15)
+        fake.gate.set()
+        await asyncio.sleep(0.05)
+        runner.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await runner
+        return fake, collector
+
+    fake, collector = asyncio.run(scenario())
+    assert fake.max_running == 1
+    assert collector.overruns >= 3
+    assert collector.runs >= 2
+
+
+def test_timeout_discards_late_result():
+    async def scenario():
+        fake = FakeCollector()
+        scheduler, collector = make(fake, OVERRUN_SKIP, timeout=0.05)
+        task = scheduler._start(collector)
+        await asyncio.sleep(0.1)
+        assert collector.failures == 1 and "0.05" in collector.error
+        # Запуск считается идущим, пока сбор не закончится: новый не стартует параллельно
+        assert not task.done()
+        assert scheduler._start(collector) is task and fake.calls == 1
+
+        fake.gate.set()
+        await task
+        # Опоздавший результат не попадает в значение
+        assert collector.value is None and collector.updated_at is None
+        assert collector.runs == 1
+
+        # Следующий запуск укладывается в таймаут и обновляет значение
+        await scheduler._start(collector)
+        return collector
+
+    collector = asyncio.run(scenario())
+    assert collector.value == 2 and collector.error is None
+    assert collector.updated_at is not None
+
+
+def test_refresh_reuses_in_flight_run():
+    async def scenario():
+        fake = FakeCollector()
+        scheduler, collector = make(fake)
+        scheduler._start(collector)
+        await asyncio.sleep(0)
+        refreshes = [asyncio.create_task(scheduler.refresh("fake", max_age=0)) for _ in range(3)]
+        await asyncio.sleep(0)
+        fake.gate.set()
+        return fake, await asyncio.gather(*refreshes)
+
+    fake, values = asyncio.run(scenario())
+    assert fake.calls == 1
+    assert values == [1, 1, 1]
+
+
+def test_refresh_by_age():
+    async def scenario():
+        fake = FakeCollector()
+        fake.gate.set()
+        scheduler, collector = make(fake)
+        collector.value, collector.updated_at = "old", time.time() - 5
+        # Данные моложе max_age отдаются без сбора
+        assert await scheduler.refresh("fake", max_age=10) == "old"
+        assert fake.calls == 0
+        # Старше — запускается сбор вне расписания
+        assert await scheduler.refresh("fake", max_age=1) == 1
+        return fake
+
+    assert asyncio.run(scenario()).calls == 1
+
+
+def test_refresh_does_not_wait_past_timeout():
+    async def scenario():
+        fake = FakeCollector()
+        scheduler, collector = make(fake, timeout=0.05)
+        collector.value, collector.updated_at = "old", time.time() - 60
+        started = time.monotonic()
+        value = await scheduler.refresh("fake", max_age=1)
+        elapsed = time.monotonic() - started
+        fake.gate.set()
+        await collector.task
+        return value, elapsed
+
+    value, elapsed = asyncio.run(scenario())
+    assert value == "old"
+    assert elapsed < 0.5
+
+
+@pytest.mark.parametrize(
+    "updated_ago, stale",
+    [
+        (None, True),
+        (0.5, False),
+        # Порог — два интервала плюс таймаут: 2 * 1.0 + 0.5
+        (2.4, False),
+        (2.6, True),
+    ],
+)
+def test_staleness(updated_ago, stale):
+    collector = ScheduledCollector("fake", FakeCollector(), interval=1.0, timeout=0.5)
+    now = 1000.0
+    if updated_ago is not None:
+        collector.updated_at = now - updated_ago
+    status = collector.status(now)
+    assert status["stale"] is stale
+    assert status["staleness"] == (None if updated_ago is None else round(updated_ago, 2))
+    assert collector.staleness(now) == (None if updated_ago is None else pytest.approx(updated_ago))
@@ -0,0 +1,92 @@
+import random
+from collections import Counter
+
+import pytest
+
+from app.config import settings
+from app.services import network_analyzer, replay
+from app.services.incident_table import IncidentTable
+from app.utils.counters import CountMinSketch, WindowSketchCounter
+
+# Режим sketch: оценки не ниже истинных, инциденты только по оценке снизу для top-K
+
+
+def test_estimate_never_below_true_count():
+    random.seed(1)
+    sketch = CountMinSketch(width=64, depth=4)
+    counts = Counter(f"10.0.{random.randint(0, 255)}.{random.randint(0, 255)}" for _ in range(5000))
+    for key, count in counts.items():
+        sketch.add(key, count)
+    assert sketch.total == 5000
+    for key, count in counts.items():
+        estimate = sketch.estimate(key)
+        assert count <= estimate <= count + sketch.error_bound() * 2
+
+
+def test_subtract_and_clear():
+    first, second = CountMinSketch(64), CountMinSketch(64)
+    first.add("a", 5)
+    second.add("a", 3)
+    first.add("a", 3)
+    first.subtract(second)
+    assert first.estimate("a") == 5 and first.total == 5
+    first.clear()
+    assert first.estimate("a") == 0 and first.total == 0
+
+
+def test_window_sketch_expires_old_seconds():
+    counter = WindowSketchCounter(width=256, depth=4, top_k=10, window=5)
+    counter.add("1.1.1.1", 100, 1000.0)
+    counter.add("1.1.1.1", 50, 1003.5)
+    assert counter.get("1.1.1.1", 1004.9) == 150
+    # Секунда 1000 вышла из окна [1001, 1005]
+    assert counter.get("1.1.1.1", 1005.0) == 50
+    assert counter.get("1.1.1.1", 1009.0) == 0
+    assert len(counter) == 0
+
+
+def test_lower_bound_only_for_top_k():
+    counter = WindowSketchCounter(width=64, depth=4, top_k=2, window=5)
+    for index in range(200):
+        counter.add(f"10.0.0.{index}", 5, 1000.0)
+    heavy = counter.add("203.0.113.1", 5000, 1000.0)
+    light = counter.add("10.0.1.1", 1, 1000.0)
+
+    assert "203.0.113.1" in counter.candidates
+    assert counter.lower_bound("203.0.113.1", heavy) == heavy - counter.error() >= 5000 - counter.error()
+    # Вне top-K оценка снизу нулевая, как бы ни была раздута оценка сверху
+    assert "10.0.1.1" not in counter.candidates
+    assert counter.lower_bound("10.0.1.1", light) == 0
+    assert counter.top(1, 1000.0)[0][0] == "203.0.113.1"
+
+
+@pytest.fixture
+def sketch_mode(monkeypatch):
+    # Узкий скетч: при сотнях тысяч источников оценка сверху каждого выше порога
+    monkeypatch.setattr(settings, "counter_mode", "sketch")
+    monkeypatch.setattr(settings, "sketch_width", 256)
+    monkeypatch.setattr(network_analyzer, "sample_every", network_analyzer.sample_every)
+    monkeypatch.setattr(network_analyzer, "incidents", IncidentTable(network_analyzer.ATTACK_EXPIRY_TIME))
+    for counters in (network_analyzer.COUNTERS, network_analyzer.PREFIX_COUNTERS):
+        for attack_type in counters:
+            monkeypatch.setitem(counters, attack_type, network_analyzer.make_counter())
+    network_analyzer.EVENTS.drain()
+    yield
+    network_analyzer.EVENTS.drain()
+
+
+def test_replay_many_sources_raises_no_incidents(sketch_mode):
+    # 300 тыс. пакетов от 300 тыс. источников: ни один не превышает порог
+    frames = replay.synthetic_flood("syn", packets=300_000, sources=300_000, pps=100_000, start=1000.0)
+    report = replay.replay(frames, "batch")
+    assert report["packets"] == 300_000
+    assert report["incidents"] == []
+
+
+def test_replay_heavy_sources_still_detected(sketch_mode):
+    frames = replay.synthetic_flood("syn", packets=300_000, sources=1000, distribution="zipf", pps=100_000, start=1000.0)
+    report = replay.replay(frames, "batch")
+    sources = {incident["sourceIp"] for incident in report["incidents"] if "/" not in incident["sourceIp"]}
+    assert sources
+    # Инциденты подняты по оценке снизу, поэтому их источники действительно тяжёлые
+    assert all(incident["count"] > settings.threshold_syn for incident in report["incidents"])
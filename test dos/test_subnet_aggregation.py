@@ -0,0 +1,77 @@
+import pytest
+
+from app.config.settings import Settings
+from app.services import network_analyzer
+from app.services.incident_table import IncidentTable
+from app.services.raw_capture import SYN_FLOOD
+from app.utils.ip_prefix import address_int, key_prefix, prefix_key, source_prefix
+
+# Агрегация по подсетям: целые ключи подсетей и множители порога по длине префикса
+
+
+@pytest.mark.parametrize("ip, length", [
+    ("203.0.113.77", 24), ("203.0.113.77", 16), ("203.0.113.77", 32), ("10.1.2.3", 8),
+    ("2001:db8:1:2::5", 64), ("2001:db8:1:2::5", 48), ("::1", 128),
+])
+def test_prefix_key_round_trip(ip, length):
+    addr, version = address_int(ip)
+    assert key_prefix(prefix_key(addr, length, version)) == source_prefix(ip, length)
+
+
+def test_prefix_keys_are_distinct():
+    v4, _ = address_int("1.2.3.4")
+    keys = {prefix_key(v4, 24), prefix_key(v4, 16), prefix_key(v4 >> 8 << 8, 24, 6), prefix_key(v4, 16, 6)}
+    assert len(keys) == 4
+    assert prefix_key(v4, 24) == prefix_key(address_int("1.2.3.200")[0], 24)
+
+
+def test_aggregation_is_opt_in():
+    settings = Settings()
+    assert settings.subnet_aggregation is False
+    assert Settings(subnet_threshold_factors_v4={"16": 50}).subnet_threshold_factors_v4 == {16: 50.0}
+
+
+@pytest.fixture
+def analyzer(monkeypatch):
+    monkeypatch.setattr(network_analyzer, "SUBNET_LEVELS_V4", ((24, 10.0), (16, 100.0)))
+    monkeypatch.setattr(network_analyzer, "SUBNET_LEVELS_V6", ((64, 10.0),))
+    monkeypatch.setattr(network_analyzer, "incidents", IncidentTable(network_analyzer.ATTACK_EXPIRY_TIME))
+    monkeypatch.setitem(network_analyzer.THRESHOLDS, SYN_FLOOD, 100)
+    for counters in (network_analyzer.COUNTERS, network_analyzer.PREFIX_COUNTERS):
+        monkeypatch.setitem(counters, SYN_FLOOD, network_analyzer.make_counter())
+    return network_analyzer
+
+
+def flood(analyzer, sources, per_second, seconds=6, start=1000):
+    for second in range(seconds):
+        for ip in sources:
+            analyzer.count_packet(ip, SYN_FLOOD, per_second, start + second)
+    return sorted(incident.sourceIp for incident in analyzer.incidents)
+
+
+def test_distributed_flood_in_one_subnet(analyzer):
+    # 256 источников по 10 пакетов/сек: каждый ниже порога 100, /24 — 2560 > 100 * 10
+    assert flood(analyzer, [f"198.51.100.{index}" for index in range(256)], 10) == ["198.51.100.0/24"]
+
+
+def test_wide_prefix_uses_its_own_factor(analyzer):
+    # По одному источнику в 256 разных /24: /16 получает 2560 пакетов/сек, ниже 100 * 100
+    sources = [f"198.51.{index}.1" for index in range(256)]
+    assert flood(analyzer, sources, 10) == []
+    # При 50 пакетах/сек с каждого /16 набирает 12800 > 10000, а каждая /24 — только 50
+    assert flood(analyzer, sources, 50, start=2000) == ["198.51.0.0/16"]
+
+
+def test_heavy_source_is_not_counted_in_its_subnet(analyzer):
+    sources = ["198.51.100.1"] + [f"198.51.100.{index}" for index in range(2, 12)]
+    # Тяжёлый источник получает свой инцидент, остальные вместе ниже порога /24
+    counts = {ip: 5000 if ip == "198.51.100.1" else 50 for ip in sources}
+    for second in range(6):
+        for ip, count in counts.items():
+            analyzer.count_packet(ip, SYN_FLOOD, count, 1000 + second)
+    assert sorted(incident.sourceIp for incident in analyzer.incidents) == ["198.51.100.1"]
+
+
+def test_ipv6_subnet(analyzer):
+    sources = [f"2001:db8:0:1::{index:x}" for index in range(1, 201)]
+    assert flood(analyzer, sources, 10) == ["2001:db8:0:1::/64"]
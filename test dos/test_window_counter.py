@@ -0,0 +1,47 @@
+from app.utils.counters import WindowCounter
+
+# Точный счётчик за скользящее окно из секундных корзин
+
+
+def test_sliding_window_sum():
+    counter = WindowCounter(window=5)
+    assert counter.add("1.1.1.1", 10, 1000.2) == 10
+    assert counter.add("1.1.1.1", 5, 1000.9) == 15
+    assert counter.add("1.1.1.1", 7, 1002.0) == 22
+    assert counter.get("1.1.1.1", 1004.99) == 22
+    # В 1005 из окна вышла секунда 1000, в 1007 — секунда 1002
+    assert counter.get("1.1.1.1", 1005.0) == 7
+    assert counter.get("1.1.1.1", 1007.0) == 0
+
+
+def test_bucket_reused_after_full_window():
+    counter = WindowCounter(window=3)
+    counter.add("a", 4, 10.0)
+    # Та же корзина (10 % 3 == 13 % 3), но значение из прошлого окна сброшено
+    assert counter.add("a", 1, 13.0) == 1
+    assert counter.add("a", 2, 100.0) == 2
+
+
+def test_sources_are_independent():
+    counter = WindowCounter(window=5)
+    counter.add("a", 3, 1.0)
+    counter.add("b", 8, 2.0)
+    assert counter.get("a", 2.0) == 3
+    assert counter.get("b", 2.0) == 8
+    assert counter.get("c", 2.0) == 0
+    assert counter.top(1, 2.0) == [("b", 8, 0)]
+    assert counter.error() == 0
+    assert counter.lower_bound("a", 3) == 3
+
+
+def test_silent_sources_dropped_after_two_windows():
+    counter = WindowCounter(window=5)
+    for index in range(100):
+        counter.add(f"10.0.0.{index}", 1, 1000.0)
+    counter.add("active", 1, 1006.0)
+    # Через одно окно источники ещё лежат в прошлом поколении
+    assert len(counter) == 101
+    assert counter.get("10.0.0.1", 1006.0) == 0
+    counter.add("active", 1, 1011.0)
+    assert len(counter) == 1
+    assert counter.get("active", 1011.0) == 1